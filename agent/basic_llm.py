@@ -1,74 +1,264 @@
 import os
 import random
-from typing import Optional
-import openai
-from api.data import AgentArenaData
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+import pandas as pd
+from agent.journal import DONE, FAILED, SKIP, TAKE, RunJournal
+from agent.scheduler import RandomPolicy, SelectionPolicy
+from api.data import AgentArenaData, JobMetadata, METADATA_COLUMNS
+from utils.llm_backend import ModelBackend, OpenAIBackend
+from utils.llm_cache import ResponseCache
+from utils.llm_stream import CompletionStream
+from utils.prompt_budget import PromptBudget, Section
+
+# Run journal kept in the output directory, see process_jobs(resume=True)
+JOURNAL_FILENAME = 'run_journal.jsonl'
 
 class BasicLLMAgent:
-    def __init__(self, api_key: str, data: AgentArenaData):
+    def __init__(self, api_key: str, data: AgentArenaData, max_in_flight: int = 1, seed: Optional[int] = None,
+                 cache: Optional[ResponseCache] = None, stream: bool = False, stall_timeout: float = 30.0,
+                 min_chars_per_second: Optional[float] = None, backend: Optional[ModelBackend] = None,
+                 policy: Optional[SelectionPolicy] = None, max_total_tokens: int = 8000,
+                 model_name: str = "simpleLLM"):
         """
         Initialize the BasicLLMAgent with OpenAI API key and data handler.
         
         Args:
             api_key (str): OpenAI API key
             data (AgentArenaData): Instance of AgentArenaData for job processing
+            max_in_flight (int): Maximum number of taken jobs being worked on at once.
+                1 processes jobs strictly sequentially.
+            seed (int, optional): Seed for a private random generator used for job selection,
+                so decisions are reproducible even while worker threads use the global one.
+                If None, the global random module is used.
+            cache (ResponseCache, optional): Reuse completions for identical prompts from this cache.
+                Not used when streaming.
+            stream (bool): Stream completions into the submission as they are generated
+                instead of waiting for the whole text
+            stall_timeout (float): When streaming, seconds to wait for the first token or
+                between tokens before the generation is cancelled
+            min_chars_per_second (float, optional): When streaming, cancel generations slower than this
+            backend (ModelBackend, optional): Where completions come from. Defaults to the
+                OpenAI API with api_key.
+            policy (SelectionPolicy, optional): Decides which jobs to take and in what order,
+                e.g. agent.scheduler.ExpectedValuePolicy. Defaults to taking each job with
+                50% chance, drawn from the agent's generator.
+            max_total_tokens (int): Token budget of each request, prompt plus completion. Long
+                descriptions are trimmed to fit, and completions are capped at 1000 tokens.
+            model_name (str): Name submissions are saved under; must not contain underscores
+        
+        Raises:
+            ValueError: If model_name contains an underscore
         """
+        if '_' in model_name:
+            raise ValueError(f"Model name {model_name!r} can't contain underscores, see submission_filename")
         self.api_key = api_key
+        self.model_name = model_name
         self.data = data
-        openai.api_key = api_key
+        self.max_in_flight = max_in_flight
+        self.rng = random.Random(seed) if seed is not None else random
+        self.cache = cache
+        self.stream = stream
+        self.stall_timeout = stall_timeout
+        self.min_chars_per_second = min_chars_per_second
+        self.backend = backend if backend is not None else OpenAIBackend(api_key=api_key)
+        self.policy = policy if policy is not None else RandomPolicy(0.5, self.rng)
+        self.prompt_budget = PromptBudget("gpt-4o-mini", max_total_tokens=max_total_tokens, max_output_tokens=1000)
         
         # System prompt for job processing
         self.system_prompt = """You are a professional freelancer who has been given a job to complete.
         Your task is to provide a detailed response that solves this job.  Do your best to solve the job
         and give an output that is sufficient to finish the job.  You only have one shot."""
     
-    def process_jobs(self, output_dir: str = "output") -> None:
+    def _iter_jobs(self, jobs: Optional[Iterable[pd.DataFrame]]) -> Iterator[Tuple[int, JobMetadata, Optional[str], bool]]:
+        """Flatten the policy's scheduled batches into (job_id, metadata, description or None, take) tuples."""
+        if jobs is None:
+            jobs = self.data.iter_jobs(columns=['ID'] + METADATA_COLUMNS + self.policy.columns)
+        for batch, take in self.policy.schedule(jobs):
+            job_ids = batch['ID'].tolist()
+            records = map(JobMetadata._make, zip(*(batch[col].tolist() for col in METADATA_COLUMNS)))
+            descriptions = batch['DESCRIPTION'].tolist() if 'DESCRIPTION' in batch.columns else [None] * len(batch)
+            yield from zip(job_ids, records, descriptions, take.tolist())
+    
+    def process_jobs(self, output_dir: str = "output", jobs: Optional[Iterable[pd.DataFrame]] = None,
+                     max_in_flight: Optional[int] = None, resume: bool = False,
+                     journal_path: Optional[str] = None) -> None:
         """
-        Process all available jobs using a random selection process.
+        Process all available jobs, taking the ones chosen by the agent's selection policy.
+        
+        Decisions are made on the calling thread, in the order the policy schedules
+        jobs. Taken jobs are then worked on by a thread pool, so fetching descriptions,
+        calling the model and submitting overlap across up to max_in_flight jobs. Log
+        output is printed in scheduled order regardless of completion order.
+        
+        Every decision, completion and failure is appended to a run journal in
+        output_dir, so an interrupted run can be resumed.
         
         Args:
             output_dir (str): Directory to save job outputs
+            jobs (Iterable[pd.DataFrame], optional): Batches of jobs to consider, as yielded by
+                iter_jobs or AgentArenaData.iter_jobs. Batches need the ID and metadata columns,
+                plus any columns the policy lists, e.g. columns=['ID'] + METADATA_COLUMNS +
+                policy.columns; both iter_jobs derive DESCRIPTION_LENGTH. A DESCRIPTION column
+                is used when present instead of looking it up.
+                If None, every job in the data handler is considered.
+            max_in_flight (int, optional): Overrides the agent's max_in_flight for this run
+            resume (bool): Continue the run journaled in output_dir: recorded decisions are
+                replayed, completed jobs are skipped and failed or unfinished jobs are retried.
+                If False, a new journal is started.
+            journal_path (str, optional): Where to keep the run journal instead of
+                run_journal.jsonl in output_dir, e.g. when several runs share output_dir
         """
-        # Get all job metadata
-        jobs_metadata = self.data.get_jobs_metadata()
+        max_in_flight = max_in_flight or self.max_in_flight
+        journal = RunJournal(journal_path or os.path.join(output_dir, JOURNAL_FILENAME), resume=resume)
+        # Bounds submitted-but-unfinished jobs so a streamed job source is not drained ahead of the workers
+        slots = threading.BoundedSemaphore(max_in_flight)
+        pending: Deque[Tuple[List[str], Optional[Future]]] = deque()
         
-        for job_id, (title, sector, skills, exp_level, budget, country) in jobs_metadata.items():
-            # Randomly decide whether to take the job (50% chance)
-            if random.random() < 0.5:
-                print(f"Agent decided to take job {job_id}: {title}")
-                
-                # Get the job description
-                job_description = self.data.get_job_description(job_id)
-                
-                try:
-                    # Make API call to OpenAI
-                    response = openai.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": self.system_prompt},
-                            {"role": "user", "content": f"Job Title: {title}\nSector: {sector}\nSkills Required: {skills}\nExperience Level: {exp_level}\nBudget: ${budget:,.2f}\nCountry: {country}\n\nJob Description:\n{job_description}"}
-                        ],
-                        temperature=0.7,
-                        max_tokens=1000
-                    )
-                    
-                    # Extract the response
-                    output = response.choices[0].message.content
+        try:
+            with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+                for job_id, metadata, job_description, take in self._iter_jobs(jobs):
+                    # The policy decides even when replaying, so a seeded generator stays in
+                    # step with the original run; a recorded decision takes precedence.
+                    recorded = journal.decision(job_id)
+                    if recorded is None:
+                        journal.record(job_id, TAKE if take else SKIP)
+                    else:
+                        take = recorded
                     
-                    # Submit the job output
-                    saved_path = self.data.submit_job(
-                        save_dir=output_dir,
-                        model_name="simpleLLM",
-                        job_id=job_id,
-                        output=output
-                    )
-                    
-                    print(f"Successfully processed job {job_id}. Output saved to: {saved_path}")
-                    
-                except Exception as e:
-                    print(f"Error processing job {job_id}: {str(e)}")
-            else:
-                print(f"Agent decided not to take job {job_id}: {title}")
+                    if not take:
+                        pending.append(([f"Agent decided not to take job {job_id}: {metadata.title}"], None))
+                    elif journal.is_completed(job_id):
+                        pending.append(([f"Job {job_id} already completed, skipping: {metadata.title}"], None))
+                    else:
+                        slots.acquire()
+                        future = executor.submit(self._complete_job, job_id, metadata, job_description, output_dir, journal)
+                        future.add_done_callback(lambda _: slots.release())
+                        pending.append(([f"Agent decided to take job {job_id}: {metadata.title}"], future))
+                    self._print_completed(pending, wait=False)
+                self._print_completed(pending, wait=True)
+        finally:
+            journal.close()
+        if self.cache is not None:
+            print(f"LLM cache: {self.cache.stats()}")
+    
+    def _print_completed(self, pending: Deque[Tuple[List[str], Optional[Future]]], wait: bool) -> None:
+        """Print log lines of finished jobs from the front of the queue, keeping job order."""
+        while pending:
+            lines, future = pending[0]
+            if future is not None and not (wait or future.done()):
+                return
+            pending.popleft()
+            if future is not None:
+                lines = lines + future.result()
+            for line in lines:
+                print(line)
+    
+    def _build_messages(self, metadata: JobMetadata, job_description: str,
+                        job_id: Optional[int] = None) -> Tuple[List[dict], int]:
+        """
+        Build the chat messages asking the model to complete a job, within the prompt budget.
+        
+        Returns:
+            Tuple[List[dict], int]: The messages, with the description trimmed if the
+                prompt is over budget, and the max_tokens to request
+        """
+        title, sector, skills, exp_level, budget, country = metadata
+        system = {"role": "system", "content": self.system_prompt}
+        header = f"Job Title: {title}\nSector: {sector}\nSkills Required: {skills}\nExperience Level: {exp_level}\nBudget: ${budget:,.2f}\nCountry: {country}\n\nJob Description:\n"
+        description = Section('description', str(job_description), priority=0, min_tokens=512,
+                              key=(job_id, 'DESCRIPTION') if job_id is not None else None)
+        fitted = self.prompt_budget.fit([system], [description], fixed_text=header)
+        return [system, {"role": "user", "content": header + fitted.texts['description']}], fitted.max_tokens
+    
+    def _complete_job(self, job_id: int, metadata: JobMetadata, job_description: Optional[str], output_dir: str,
+                      journal: Optional[RunJournal] = None) -> List[str]:
+        """
+        Complete and submit a single taken job.
+        
+        Args:
+            job_id (int): ID of the job
+            metadata (JobMetadata): Metadata of the job
+            job_description (str, optional): Description of the job. Looked up if None.
+            output_dir (str): Directory to save job outputs
+            journal (RunJournal, optional): Journal to record the outcome in
+            
+        Returns:
+            List[str]: Log lines describing the outcome
+        """
+        try:
+            # Get the job description
+            if job_description is None:
+                job_description = self.data.get_job_description(job_id)
+            
+            if self.stream:
+                return self._complete_job_streaming(job_id, metadata, job_description, output_dir, journal)
+            
+            # Call the model through the shared rate limiter
+            messages, max_tokens = self._build_messages(metadata, job_description, job_id)
+            response = self.backend.complete(
+                cache=self.cache,
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=max_tokens
+            )
+            
+            # Extract the response
+            output = response.choices[0].message.content
+            
+            # Submit the job output
+            saved_path = self.data.submit_job(
+                save_dir=output_dir,
+                model_name=self.model_name,
+                job_id=job_id,
+                output=output
+            )
+            
+            if journal is not None:
+                journal.record(job_id, DONE, path=saved_path)
+            return [f"Successfully processed job {job_id}. Output saved to: {saved_path}"]
+            
+        except Exception as e:
+            if journal is not None:
+                journal.record(job_id, FAILED, error=str(e))
+            return [f"Error processing job {job_id}: {str(e)}"]
+
+    def _complete_job_streaming(self, job_id: int, metadata: JobMetadata, job_description: str, output_dir: str,
+                                journal: Optional[RunJournal]) -> List[str]:
+        """
+        Complete a job with a streamed completion written straight into the submission.
+        
+        The submission only becomes visible once the stream finishes; a stalled or
+        slow generation is cancelled and raises StreamStalled, leaving no output.
+        """
+        messages, max_tokens = self._build_messages(metadata, job_description, job_id)
+        response = self.backend.complete(
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            # Per-read timeout, so a connection that goes silent is cut off
+            timeout=self.stall_timeout
+        )
+        stream = CompletionStream(response, first_byte_timeout=self.stall_timeout, stall_timeout=self.stall_timeout,
+                                  min_chars_per_second=self.min_chars_per_second)
+        saved_path = self.data.submit_job(
+            save_dir=output_dir,
+            model_name=self.model_name,
+            job_id=job_id,
+            output=stream
+        )
+        
+        if journal is not None:
+            journal.record(job_id, DONE, path=saved_path, ttfb=stream.ttfb, chars_per_second=stream.chars_per_second,
+                           finish_reason=stream.finish_reason)
+        return [f"Successfully processed job {job_id}. Output saved to: {saved_path}",
+                f"Stream for job {job_id}: {stream.summary()}"]
 
 # Example usage
 if __name__ == "__main__":
@@ -80,7 +270,7 @@ if __name__ == "__main__":
     if not api_key:
         raise ValueError("Please set the OPENAI_API_KEY environment variable")
     
-    agent = BasicLLMAgent(api_key, data)
+    agent = BasicLLMAgent(api_key, data, max_in_flight=8)
     
     # Process all jobs
     agent.process_jobs()
@@ -0,0 +1,184 @@
+import hashlib
+import math
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+# Tiers of the cascade, cheapest first
+TIER_HEURISTICS = 'heuristics'
+TIER_CHEAP = 'cheap'
+TIER_JUDGE = 'judge'
+TIERS = (TIER_HEURISTICS, TIER_CHEAP, TIER_JUDGE)
+
+# Recorded as the verifier of verdicts decided without a model call
+HEURISTICS_VERIFIER = 'heuristics'
+
+# Refusals and apologies at the very start of an output
+REFUSAL_PATTERN = re.compile(
+    r"^\W*(?:I'?m sorry|I am sorry|sorry,? (?:but )?I|I apologi[sz]e|as an AI|unfortunately,? I|"
+    r"I (?:can ?not|can't|cannot|am unable to|'m unable to|won't be able to|do not have the ability))",
+    re.IGNORECASE)
+
+_WORD = re.compile(r"\w+")
+
+def shingles(text: str, n: int = 5) -> set:
+    """Returns the set of lowercased word n-grams of text."""
+    words = _WORD.findall(text.lower())
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+def description_overlap(output: str, job_description: str, n: int = 5) -> float:
+    """Fraction of the output's word n-grams that also occur in the job description."""
+    output_shingles = shingles(output, n)
+    if not output_shingles:
+        return 0.0
+    return len(output_shingles & shingles(job_description, n)) / len(output_shingles)
+
+def normalized_hash(text: str) -> str:
+    """Hash of text ignoring case and whitespace, to spot copies across models."""
+    return hashlib.sha256(' '.join(text.lower().split()).encode('utf-8')).hexdigest()
+
+class GradingCascade:
+    def __init__(self, cheap_model: str = 'gpt-4o-mini', min_chars: int = 80, max_refusal_chars: int = 1500,
+                 max_description_overlap: float = 0.8, reject_duplicates: bool = False,
+                 confidence_threshold: float = 0.9, audit_rate: float = 0.05, seed: int = 0):
+        """
+        Settings and statistics of the tiered grading used by SimpleVerifier(cascade=...).
+
+        Each output goes through the tiers in order and stops at the first that is sure:
+            heuristics  fail outputs with no API call: shorter than min_chars, starting
+                        with a refusal (when under max_refusal_chars), with an unclosed code
+                        block, or mostly copied from the job description; copies of another
+                        model's output for the same job share its verdict, or fail if
+                        reject_duplicates is set
+            cheap       cheap_model grades with the judge's prompt; its verdict stands when
+                        the probability of its answer, from the first token's logprobs, is
+                        at least confidence_threshold
+            judge       everything else goes to the verifier's model
+        A seeded audit_rate sample of outputs resolved early is also sent to the judge,
+        whose verdict is then used, to measure how often each tier agrees with it.
+
+        Args:
+            cheap_model (str): Model of the middle tier
+            min_chars (int): Shortest output, ignoring surrounding whitespace, that can pass
+            max_refusal_chars (int): Longest output still failed for opening with a refusal
+            max_description_overlap (float): Largest fraction of the output's word 5-grams
+                that may come from the job description
+            reject_duplicates (bool): Fail copies of another model's output instead of
+                giving them its verdict
+            confidence_threshold (float): Least probability of the cheap model's answer for
+                its verdict to stand
+            audit_rate (float): Fraction of early verdicts checked against the judge
+            seed (int): Seed of the audit sample
+        """
+        self.cheap_model = cheap_model
+        self.min_chars = min_chars
+        self.max_refusal_chars = max_refusal_chars
+        self.max_description_overlap = max_description_overlap
+        self.reject_duplicates = reject_duplicates
+        self.confidence_threshold = confidence_threshold
+        self.audit_rate = audit_rate
+        self.seed = seed
+        self.resolved = {tier: 0 for tier in TIERS}
+        self.audited = {tier: 0 for tier in TIERS[:-1]}
+        self.agreed = {tier: 0 for tier in TIERS[:-1]}
+        self.reasons: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def precheck(self, output: str, job_description: str) -> Optional[str]:
+        """Returns why an output obviously fails, or None if it needs grading."""
+        text = output.strip()
+        if len(text) < self.min_chars:
+            return 'too short'
+        if len(text) <= self.max_refusal_chars and REFUSAL_PATTERN.match(text):
+            return 'refusal'
+        if text.count('```') % 2:
+            return 'truncated code block'
+        if description_overlap(text, str(job_description)) > self.max_description_overlap:
+            return 'copies the job description'
+        return None
+
+    def find_duplicates(self, outputs: Dict[str, str]) -> Dict[str, str]:
+        """
+        Returns model name to the model whose identical output it copies, for every copy.
+
+        The first model in name order holding an output is treated as the original.
+        """
+        originals: Dict[str, str] = {}
+        duplicates = {}
+        for model_name in sorted(outputs):
+            digest = normalized_hash(outputs[model_name])
+            if digest in originals:
+                duplicates[model_name] = originals[digest]
+            else:
+                originals[digest] = model_name
+        return duplicates
+
+    def cheap_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """The judge's request adapted for the cheap model, asking for first-token logprobs."""
+        return {**request, 'model': self.cheap_model, 'max_tokens': 1, 'logprobs': True, 'top_logprobs': 5}
+
+    def cheap_verdict(self, response: Any) -> Optional[bool]:
+        """
+        Returns the cheap model's verdict, or None when it is not confident enough.
+
+        Without logprobs in the response, a plain YES or NO answer is taken as certain.
+        """
+        content = (response.choices[0].message.content or '').strip().upper()
+        logprobs = getattr(response.choices[0], 'logprobs', None)
+        entries = getattr(logprobs, 'content', None) if logprobs is not None else None
+        if not entries:
+            return {'YES': True, 'NO': False}.get(content)
+        probabilities = {'YES': 0.0, 'NO': 0.0}
+        for candidate in entries[0].top_logprobs or [entries[0]]:
+            token = candidate.token.strip().upper()
+            if token in probabilities:
+                probabilities[token] += math.exp(candidate.logprob)
+        total = probabilities['YES'] + probabilities['NO']
+        if total == 0:
+            return None
+        p_yes = probabilities['YES'] / total
+        if max(p_yes, 1 - p_yes) < self.confidence_threshold:
+            return None
+        return p_yes >= 0.5
+
+    def should_audit(self, model_name: str, job_id: int) -> bool:
+        """Whether an early verdict is also checked by the judge; the same outputs are picked on every run."""
+        digest = hashlib.sha256(f"{self.seed}:{model_name}:{job_id}".encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') / 2 ** 64 < self.audit_rate
+
+    def record(self, tier: str, reason: Optional[str] = None) -> None:
+        with self._lock:
+            self.resolved[tier] += 1
+            if reason is not None:
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def record_audit(self, tier: str, agreed: bool) -> None:
+        with self._lock:
+            self.audited[tier] += 1
+            self.agreed[tier] += agreed
+
+    def report(self) -> Dict[str, Any]:
+        """Fraction of outputs resolved at each tier, heuristic reasons, and audited agreement with the judge."""
+        with self._lock:
+            total = sum(self.resolved.values())
+            return {
+                'resolved': dict(self.resolved),
+                'fraction': {tier: count / total if total else 0.0 for tier, count in self.resolved.items()},
+                'reasons': dict(self.reasons),
+                'audited': dict(self.audited),
+                'agreement': {tier: self.agreed[tier] / self.audited[tier] if self.audited[tier] else None
+                              for tier in self.audited},
+            }
+
+    def summary(self) -> List[str]:
+        """Report lines for the end of a grading run."""
+        report = self.report()
+        lines = ["Grading cascade: " + ", ".join(
+            f"{tier} {report['resolved'][tier]:,} ({report['fraction'][tier]:.1%})" for tier in TIERS)]
+        if report['reasons']:
+            lines.append("Heuristic failures: " + ", ".join(f"{reason} {count:,}"
+                                                           for reason, count in sorted(report['reasons'].items())))
+        for tier, agreement in report['agreement'].items():
+            if agreement is not None:
+                lines.append(f"Agreement of {tier} with the judge: {agreement:.1%} of {report['audited'][tier]:,} audited")
+        return lines
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Set
+
+# Journal events, in the order they occur for a job
+TAKE = 'take'
+SKIP = 'skip'
+DONE = 'done'
+FAILED = 'failed'
+
+class RunJournal:
+    def __init__(self, path: str, resume: bool = True):
+        """
+        Append-only record of an agent run, one JSON line per event.
+
+        Each job gets a take or skip decision, and taken jobs later get a done or
+        failed entry. Lines are appended with a single O_APPEND write, so a crash
+        loses at most the line being written. On resume, a torn last line is cut off
+        before appending resumes, and lines that do not decode are skipped.
+
+        Args:
+            path (str): Path to the journal file
+            resume (bool): Load the existing journal and keep appending to it.
+                If False, any existing journal is discarded.
+        """
+        self.path = path
+        self.decisions: Dict[int, bool] = {}
+        self.completed: Set[int] = set()
+        self.failed: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if resume:
+            self._load()
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | (0 if resume else os.O_TRUNC)
+        self._fd = os.open(path, flags, 0o644)
+
+    def _load(self) -> None:
+        """
+        Fold the events of an existing journal into the decision and outcome state,
+        truncating a partial last line so the next append starts on a line of its own.
+        """
+        if not os.path.exists(self.path):
+            return
+        end = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Partial line from a crash mid-write
+                    break
+                end += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    print(f"Skipping unreadable line in {self.path}: {line[:80]!r}")
+                    continue
+                self._apply(entry)
+        if end < os.path.getsize(self.path):
+            os.truncate(self.path, end)
+
+    def _apply(self, entry: Dict) -> None:
+        job_id, event = entry['job_id'], entry['event']
+        if event in (TAKE, SKIP):
+            self.decisions[job_id] = event == TAKE
+        elif event == DONE:
+            self.completed.add(job_id)
+            self.failed.pop(job_id, None)
+        elif event == FAILED:
+            self.failed[job_id] = entry.get('error', '')
+
+    def record(self, job_id: int, event: str, **fields) -> None:
+        """
+        Append an event for a job.
+
+        Args:
+            job_id (int): ID of the job
+            event (str): One of TAKE, SKIP, DONE or FAILED
+            **fields: Extra JSON-serializable details, e.g. path or error
+        """
+        entry = {'job_id': int(job_id), 'event': event, 'time': time.time(), **fields}
+        line = (json.dumps(entry) + '\n').encode('utf-8')
+        with self._lock:
+            os.write(self._fd, line)
+            self._apply(entry)
+
+    def decision(self, job_id: int) -> Optional[bool]:
+        """Returns whether a job was taken, or None if no decision was recorded."""
+        return self.decisions.get(job_id)
+
+    def is_completed(self, job_id: int) -> bool:
+        """Returns whether a job was completed and submitted."""
+        return job_id in self.completed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
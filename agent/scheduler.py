@@ -0,0 +1,242 @@
+import glob
+import random
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from api.data import DESCRIPTION_LENGTH, AgentArenaData, text_lengths
+from api.leaderboard import job_value
+
+# Characters per token used for estimates, with text measured in UTF-8 bytes like
+# DESCRIPTION_LENGTH; close enough for English job posts
+CHARS_PER_TOKEN = 4
+
+class SelectionPolicy(ABC):
+    """
+    Decides which jobs an agent takes and in what order they are worked on.
+
+    schedule receives the agent's job batches and yields (batch, take) pairs, where
+    take is a boolean array with one decision per row. Rows are worked on in the
+    order they are yielded.
+    """
+
+    # Columns the policy needs in each batch, beyond ID and the metadata columns
+    columns: List[str] = []
+
+    @abstractmethod
+    def schedule(self, batches: Iterable[pd.DataFrame]) -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+        """Yield (batch, take) pairs covering every row of batches, in the order to work on them."""
+
+class RandomPolicy(SelectionPolicy):
+    def __init__(self, probability: float = 0.5, rng: Union[random.Random, None] = None):
+        """
+        Take each job independently with a fixed probability, in job order.
+
+        Args:
+            probability (float): Chance of taking a job
+            rng (random.Random, optional): Generator to draw from; defaults to the random module
+        """
+        self.probability = probability
+        self.rng = rng if rng is not None else random
+
+    def schedule(self, batches: Iterable[pd.DataFrame]) -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+        for batch in batches:
+            # One draw per job, in order, so a seeded generator reproduces earlier runs
+            yield batch, np.array([self.rng.random() < self.probability for _ in range(len(batch))], dtype=bool)
+
+def load_win_history(results_paths: Union[str, Sequence[str]], data: AgentArenaData) -> pd.DataFrame:
+    """
+    Count wins and graded attempts per SECTOR and EXPERIENCE_LEVEL from results.csv files.
+
+    Args:
+        results_paths (str or Sequence[str]): results.csv files written by SimpleVerifier,
+            or glob patterns matching them, e.g. "output*/results.csv"
+        data (AgentArenaData): Dataset the graded job IDs belong to
+
+    Returns:
+        pd.DataFrame: Columns SECTOR, EXPERIENCE_LEVEL, wins and trials
+    """
+    if isinstance(results_paths, str):
+        results_paths = [results_paths]
+    paths = [path for pattern in results_paths for path in sorted(glob.glob(pattern))]
+
+    frames = []
+    for path in paths:
+        results = pd.read_csv(path, index_col='jobID')
+        # One row per graded (job, model); blank cells were never graded
+        long = results.stack().rename('result').reset_index()
+        long = long[long['result'].isin(['win', 'fail'])]
+        frames.append(long[['jobID', 'result']])
+    if not frames:
+        return pd.DataFrame({'SECTOR': [], 'EXPERIENCE_LEVEL': [], 'wins': [], 'trials': []})
+    graded = pd.concat(frames, ignore_index=True)
+    graded = graded[graded['jobID'].map(data.has_job)]
+
+    jobs = data.get_jobs(graded['jobID'].unique().tolist(), columns=['ID', 'SECTOR', 'EXPERIENCE_LEVEL'])
+    graded = graded.merge(jobs, left_on='jobID', right_on='ID')
+    graded['win'] = graded['result'] == 'win'
+    history = graded.groupby(['SECTOR', 'EXPERIENCE_LEVEL'], dropna=False)['win'].agg(wins='sum', trials='count')
+    return history.reset_index()
+
+class ExpectedValuePolicy(SelectionPolicy):
+    # Descriptions are sized from the job store's offsets rather than decoded; taken
+    # jobs have theirs looked up when they are worked on
+    columns = [DESCRIPTION_LENGTH, 'HOURLY_LOW', 'HOURLY_HIGH']
+
+    def __init__(self, history: Optional[pd.DataFrame] = None, token_budget: Optional[float] = None,
+                 dollar_budget: Optional[float] = None, dollars_per_1k_tokens: float = 0.0006,
+                 output_tokens: int = 1000, prompt_overhead_tokens: int = 80, hourly_hours: float = 10.0,
+                 default_win_rate: float = 0.5, prior_strength: float = 10.0,
+                 agent_skills: Optional[Iterable[str]] = None, skill_weight: float = 0.5):
+        """
+        Take the jobs with the most expected earnings per token, within a budget.
+
+        All jobs are scored in one vectorized pass:
+            value     BUDGET, or for hourly jobs the mean of HOURLY_LOW/HIGH times hourly_hours
+            tokens    estimated prompt tokens plus output_tokens
+            p(win)    win rate of the job's SECTOR and EXPERIENCE_LEVEL in history, shrunk
+                      towards the sector's and then the overall rate by prior_strength
+                      pseudo-attempts, scaled by skill overlap with agent_skills
+            EV        p(win) * value - cost of the tokens
+        Jobs with positive EV are then taken from a priority queue ordered by EV per
+        token until the token or dollar budget runs out, and are worked on in that order.
+
+        Args:
+            history (pd.DataFrame, optional): Win counts from load_win_history
+            token_budget (float, optional): Most tokens to spend in total
+            dollar_budget (float, optional): Most dollars to spend in total
+            dollars_per_1k_tokens (float): Blended price of the agent's model
+            output_tokens (int): Expected completion tokens per job (the agent's max_tokens)
+            prompt_overhead_tokens (int): Tokens of the system prompt and field labels
+            hourly_hours (float): Hours assumed when valuing hourly jobs
+            default_win_rate (float): Win rate assumed without any history
+            prior_strength (float): Weight, in attempts, of the fallback rate
+            agent_skills (Iterable[str], optional): Skills the agent is good at; if None,
+                skill overlap is ignored
+            skill_weight (float): How much skill overlap scales p(win), from 0 (not at all) to 1
+        """
+        self.history = history
+        self.token_budget = token_budget
+        self.dollar_budget = dollar_budget
+        self.dollars_per_1k_tokens = dollars_per_1k_tokens
+        self.output_tokens = output_tokens
+        self.prompt_overhead_tokens = prompt_overhead_tokens
+        self.hourly_hours = hourly_hours
+        self.default_win_rate = default_win_rate
+        self.prior_strength = prior_strength
+        self.agent_skills = {skill.strip().lower() for skill in agent_skills} if agent_skills is not None else None
+        self.skill_weight = skill_weight
+
+    def _text_length(self, jobs: pd.DataFrame, name: str) -> np.ndarray:
+        if name not in jobs.columns:
+            return np.zeros(len(jobs))
+        return text_lengths(jobs[name]).astype(np.float64)
+
+    def estimate_value(self, jobs: pd.DataFrame) -> np.ndarray:
+        """Payout of each job if won: its budget, or the hourly midpoint over hourly_hours."""
+        return job_value(jobs, self.hourly_hours)
+
+    def estimate_tokens(self, jobs: pd.DataFrame) -> np.ndarray:
+        """Prompt plus completion tokens of each job, using DESCRIPTION_LENGTH when present."""
+        chars = sum(self._text_length(jobs, name) for name in ('TITLE', 'SKILLS_AND_EXPERTISE', 'SECTOR'))
+        if DESCRIPTION_LENGTH in jobs.columns:
+            chars = chars + jobs[DESCRIPTION_LENGTH].fillna(0).to_numpy(dtype=np.float64)
+        else:
+            chars = chars + self._text_length(jobs, 'DESCRIPTION')
+        return chars / CHARS_PER_TOKEN + self.prompt_overhead_tokens + self.output_tokens
+
+    def estimate_win_rate(self, jobs: pd.DataFrame) -> np.ndarray:
+        """Smoothed historical win rate of each job's SECTOR and EXPERIENCE_LEVEL."""
+        if self.history is None or self.history.empty:
+            return np.full(len(jobs), self.default_win_rate)
+        history = self.history
+        k = self.prior_strength
+        overall = (history['wins'].sum() + k * self.default_win_rate) / (history['trials'].sum() + k)
+
+        sector = history.groupby('SECTOR', dropna=False)[['wins', 'trials']].sum()
+        sector_rate = (sector['wins'] + k * overall) / (sector['trials'] + k)
+        prior = jobs['SECTOR'].map(sector_rate).fillna(overall).to_numpy(dtype=np.float64)
+
+        cells = history.set_index(['SECTOR', 'EXPERIENCE_LEVEL'])[['wins', 'trials']]
+        keys = pd.MultiIndex.from_arrays([jobs['SECTOR'], jobs['EXPERIENCE_LEVEL']])
+        matched = cells.reindex(keys)
+        wins = matched['wins'].fillna(0).to_numpy(dtype=np.float64)
+        trials = matched['trials'].fillna(0).to_numpy(dtype=np.float64)
+        return (wins + k * prior) / (trials + k)
+
+    def skill_overlap(self, jobs: pd.DataFrame) -> np.ndarray:
+        """Fraction of each job's listed skills the agent has; 1 when agent_skills is not set."""
+        if self.agent_skills is None or 'SKILLS_AND_EXPERTISE' not in jobs.columns:
+            return np.ones(len(jobs))
+        skills = (jobs['SKILLS_AND_EXPERTISE'].fillna('').astype(str).str.lower()
+                  .str.split(r'\s*[,;|]\s*', regex=True).explode().str.strip())
+        skills = skills[skills != '']
+        known = skills.isin(self.agent_skills).groupby(level=0).mean()
+        # Jobs without listed skills count as a full match
+        return known.reindex(jobs.index).fillna(1.0).to_numpy(dtype=np.float64)
+
+    def score(self, jobs: pd.DataFrame) -> pd.DataFrame:
+        """
+        Score every job.
+
+        Returns:
+            pd.DataFrame: Columns value, tokens, p_win, cost, ev and priority (EV per token), indexed like jobs
+        """
+        jobs = jobs.reset_index(drop=True)
+        value = self.estimate_value(jobs)
+        tokens = self.estimate_tokens(jobs)
+        overlap = self.skill_overlap(jobs)
+        p_win = self.estimate_win_rate(jobs) * (1 - self.skill_weight + self.skill_weight * overlap)
+        cost = tokens / 1000 * self.dollars_per_1k_tokens
+        ev = p_win * value - cost
+        return pd.DataFrame({'value': value, 'tokens': tokens, 'p_win': p_win, 'cost': cost,
+                             'ev': ev, 'priority': ev / tokens})
+
+    def select(self, jobs: pd.DataFrame) -> np.ndarray:
+        """
+        Returns the row positions of the jobs to take, highest priority first.
+        """
+        scores = self.score(jobs)
+        order = np.argsort(-scores['priority'].to_numpy(), kind='stable')
+        order = order[scores['ev'].to_numpy()[order] > 0]
+        # Drain the queue until the next job would overrun a budget
+        within = np.ones(len(order), dtype=bool)
+        if self.token_budget is not None:
+            within &= np.cumsum(scores['tokens'].to_numpy()[order]) <= self.token_budget
+        if self.dollar_budget is not None:
+            within &= np.cumsum(scores['cost'].to_numpy()[order]) <= self.dollar_budget
+        return order[np.cumprod(within).astype(bool)]
+
+    def _without_descriptions(self, batch: pd.DataFrame) -> pd.DataFrame:
+        if 'DESCRIPTION' not in batch.columns:
+            return batch
+        if DESCRIPTION_LENGTH not in batch.columns:
+            batch = batch.assign(**{DESCRIPTION_LENGTH: self._text_length(batch, 'DESCRIPTION')})
+        return batch.drop(columns='DESCRIPTION')
+
+    def schedule(self, batches: Iterable[pd.DataFrame]) -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+        # Ranking needs every job, so the batches are gathered first, keeping only the
+        # lengths of any descriptions so memory does not grow with their text
+        gathered = [self._without_descriptions(batch) for batch in batches]
+        if not gathered:
+            return
+        jobs = pd.concat(gathered, ignore_index=True)
+        if jobs.empty:
+            return
+        taken = self.select(jobs)
+        skipped = np.setdiff1d(np.arange(len(jobs)), taken)
+        yield jobs.iloc[taken], np.ones(len(taken), dtype=bool)
+        yield jobs.iloc[skipped], np.zeros(len(skipped), dtype=bool)
+
+# Example usage
+if __name__ == "__main__":
+    data = AgentArenaData("data/df_randomized_feasible_cleaned.csv")
+    history = load_win_history("output*/results.csv", data)
+    policy = ExpectedValuePolicy(history=history, dollar_budget=5.0)
+
+    jobs = data.get_jobs(data.query(), columns=['ID', 'TITLE', 'SECTOR', 'EXPERIENCE_LEVEL', 'SKILLS_AND_EXPERTISE',
+                                               'BUDGET'] + policy.columns)
+    scores = policy.score(jobs)
+    taken = scores.iloc[policy.select(jobs)]
+    print(f"Taking {len(taken):,} of {len(jobs):,} jobs: {taken['tokens'].sum():,.0f} tokens, "
+          f"${taken['cost'].sum():,.2f} cost, ${taken['ev'].sum():,.2f} expected earnings")
@@ -0,0 +1,205 @@
+import argparse
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import time
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from agent.journal import RunJournal
+from api.data import AgentArenaData, METADATA_COLUMNS
+from utils.rate_limiter import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, configure_limiter
+
+class AgentSpec(NamedTuple):
+    """
+    One tournament entrant.
+
+    agent_class is constructed as agent_class(api_key, data, model_name=name, **kwargs)
+    and must provide process_jobs(output_dir, jobs=..., journal_path=...), like
+    BasicLLMAgent. It may be given as "module:Class".
+    """
+    name: str
+    agent_class: Union[type, str]
+    kwargs: Dict[str, Any] = {}
+
+class TaskResult(NamedTuple):
+    """Outcome of one agent working through one shard."""
+    agent: str
+    shard: int
+    jobs: int
+    taken: int
+    submitted: int
+    failed: int
+    started: float
+    elapsed: float
+
+def shard_jobs(job_ids: Sequence[int], num_shards: int) -> List[np.ndarray]:
+    """
+    Split job IDs into num_shards contiguous, near-equal shards of the sorted IDs.
+
+    The assignment depends only on the set of IDs and num_shards, so every agent
+    sees the same shards on every run.
+    """
+    return np.array_split(np.sort(np.asarray(job_ids, dtype=np.int64)), num_shards)
+
+def _resolve_class(agent_class: Union[type, str]) -> type:
+    if isinstance(agent_class, str):
+        module, _, name = agent_class.partition(':')
+        return getattr(importlib.import_module(module), name)
+    return agent_class
+
+def shard_seed(agent_name: str, shard: int) -> int:
+    """Stable seed for an agent's shard, so random policies make the same choices every run."""
+    return zlib.crc32(f"{agent_name}:{shard}".encode('utf-8'))
+
+# Worker state. With the fork start method these are set in the parent before the pool
+# starts, so workers share the loaded dataset copy-on-write; otherwise each worker opens it
+# once, which for a .arena store is a shared mmap of the same page cache.
+_data: Optional[AgentArenaData] = None
+_specs: Sequence[AgentSpec] = ()
+_shards: List[np.ndarray] = []
+_settings: Dict[str, Any] = {}
+
+def _init_worker(data_path: str, specs: Sequence[AgentSpec], shards: List[np.ndarray], settings: Dict[str, Any]) -> None:
+    global _data, _specs, _shards, _settings
+    if _data is None:
+        _data = AgentArenaData(data_path)
+        _specs, _shards, _settings = specs, shards, settings
+    # Limiters are per process, so each worker gets its share of the account's limits
+    for model, limits in settings['limits'].items():
+        configure_limiter(model, **limits)
+
+def _run_task(task: Tuple[int, int]) -> TaskResult:
+    """Run one agent over one shard, logging to its own file."""
+    spec_index, shard = task
+    spec = _specs[spec_index]
+    output_dir = _settings['output_dir']
+    job_ids = _shards[shard]
+    kwargs = dict(spec.kwargs)
+    kwargs.setdefault('seed', shard_seed(spec.name, shard))
+    agent = _resolve_class(spec.agent_class)(_settings['api_key'], _data, model_name=spec.name, **kwargs)
+
+    journal_path = os.path.join(output_dir, 'journals', f"{spec.name}-{shard}.jsonl")
+    log_path = os.path.join(output_dir, 'logs', f"{spec.name}-{shard}.log")
+    columns = ['ID'] + METADATA_COLUMNS + list(getattr(getattr(agent, 'policy', None), 'columns', []))
+    jobs = [_data.get_jobs(job_ids.tolist(), columns=list(dict.fromkeys(columns)))] if len(job_ids) else []
+
+    started = time.time()
+    with open(log_path, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        agent.process_jobs(output_dir, jobs=jobs, resume=_settings['resume'], journal_path=journal_path)
+    elapsed = time.time() - started
+
+    journal = RunJournal(journal_path, resume=True)
+    journal.close()
+    taken = sum(journal.decisions.values())
+    return TaskResult(spec.name, shard, len(job_ids), taken, len(journal.completed), len(journal.failed),
+                      started, elapsed)
+
+def run_tournament(data_path: str, agents: Sequence[AgentSpec], output_dir: str = "output",
+                   processes: Optional[int] = None, shards_per_agent: Optional[int] = None,
+                   job_ids: Optional[Sequence[int]] = None, api_key: Optional[str] = None,
+                   resume: bool = False, models: Sequence[str] = ('gpt-4o-mini',),
+                   requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                   tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE) -> pd.DataFrame:
+    """
+    Run several agents over the same jobs on a process pool.
+
+    The jobs are split into shards_per_agent deterministic shards, and every
+    (agent, shard) pair is a task. Submissions land in output_dir in the usual
+    layout, so SimpleVerifier.process_outputs grades the whole tournament at once.
+    Each task's log and run journal are kept under output_dir/logs and
+    output_dir/journals; with resume=True, finished work is skipped.
+
+    Args:
+        data_path (str): Cleaned CSV or .arena job store. A store is shared by all
+            workers through the page cache; a CSV is loaded once and shared
+            copy-on-write where fork is available.
+        agents (Sequence[AgentSpec]): The entrants; names must be unique
+        output_dir (str): Directory to save submissions to
+        processes (int, optional): Worker processes; defaults to the CPU count
+        shards_per_agent (int, optional): Shards the jobs are split into; defaults to processes
+        job_ids (Sequence[int], optional): Jobs to play; defaults to every job
+        api_key (str, optional): Passed to each agent; defaults to OPENAI_API_KEY
+        resume (bool): Resume the journaled tasks of an interrupted tournament
+        models (Sequence[str]): Models the agents call; their rate limits are split
+            evenly between the worker processes
+        requests_per_minute (float): Account-wide request limit per model
+        tokens_per_minute (float): Account-wide token limit per model
+
+    Returns:
+        pd.DataFrame: Per-agent jobs, taken, submitted, failed, wall time and submissions per second
+
+    Raises:
+        ValueError: If agent names are not unique
+    """
+    global _data, _specs, _shards, _settings
+    names = [spec.name for spec in agents]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Agent names must be unique: {names}")
+
+    processes = processes or os.cpu_count() or 1
+    shards_per_agent = shards_per_agent or processes
+    os.makedirs(os.path.join(output_dir, 'journals'), exist_ok=True)
+    os.makedirs(os.path.join(output_dir, 'logs'), exist_ok=True)
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    data = AgentArenaData(data_path)
+    if job_ids is None:
+        job_ids = data.query()
+    shards = shard_jobs(job_ids, shards_per_agent)
+    settings = {'output_dir': output_dir, 'api_key': api_key or os.getenv('OPENAI_API_KEY'), 'resume': resume,
+                'limits': {model: {'requests_per_minute': requests_per_minute / processes,
+                                   'tokens_per_minute': tokens_per_minute / processes} for model in models}}
+    if context.get_start_method() == 'fork':
+        _data, _specs, _shards, _settings = data, agents, shards, settings
+
+    # Largest shards first so stragglers are small; each agent's shards are interleaved with the others'
+    tasks = [(spec_index, shard) for shard in np.argsort([-len(s) for s in shards], kind='stable').tolist()
+             for spec_index in range(len(agents))]
+    print(f"Running {len(agents)} agents over {len(job_ids):,} jobs in {len(tasks)} tasks on {processes} processes")
+    start = time.time()
+    results = []
+    try:
+        with context.Pool(processes, initializer=_init_worker, initargs=(data_path, agents, shards, settings)) as pool:
+            for result in pool.imap_unordered(_run_task, tasks):
+                results.append(result)
+                print(f"[{len(results)}/{len(tasks)}] {result.agent} shard {result.shard}: "
+                      f"{result.submitted}/{result.taken} submitted in {result.elapsed:.1f}s")
+    finally:
+        _data, _specs, _shards, _settings = None, (), [], {}
+    print(f"Tournament finished in {time.time() - start:.1f}s")
+    return summarize_results(results)
+
+def summarize_results(results: Sequence[TaskResult]) -> pd.DataFrame:
+    """Per-agent totals and throughput: submissions per second over the agent's wall-clock span."""
+    frame = pd.DataFrame(results, columns=TaskResult._fields)
+    frame['finished'] = frame['started'] + frame['elapsed']
+    summary = frame.groupby('agent').agg(jobs=('jobs', 'sum'), taken=('taken', 'sum'), submitted=('submitted', 'sum'),
+                                         failed=('failed', 'sum'), started=('started', 'min'),
+                                         finished=('finished', 'max'), busy_seconds=('elapsed', 'sum'))
+    summary['wall_seconds'] = summary['finished'] - summary['started']
+    summary['submissions_per_second'] = summary['submitted'] / summary['wall_seconds'].where(summary['wall_seconds'] > 0)
+    return summary.drop(columns=['started', 'finished'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a tournament of agents over the job set")
+    parser.add_argument('data_path', help="Path to the cleaned CSV file or .arena job store")
+    parser.add_argument('config', help='JSON list of {"name": ..., "class": "module:Class", "kwargs": {...}}')
+    parser.add_argument('--output-dir', default='output')
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--shards', type=int, help="Shards per agent; defaults to the number of processes")
+    parser.add_argument('--limit', type=int, help="Only play the first LIMIT jobs")
+    parser.add_argument('--resume', action='store_true')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        specs = [AgentSpec(entry['name'], entry.get('class', 'agent.basic_llm:BasicLLMAgent'), entry.get('kwargs', {}))
+                 for entry in json.load(f)]
+    job_ids = AgentArenaData(args.data_path).query(limit=args.limit) if args.limit else None
+    summary = run_tournament(args.data_path, specs, args.output_dir, args.processes, args.shards,
+                             job_ids=job_ids, resume=args.resume)
+    print(summary.to_string())
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from typing import Collection, Dict, Optional, Tuple, Union
+
+# Verdict log kept next to results.csv in the output directory
+VERDICTS_FILENAME = 'verdicts.jsonl'
+
+class VerdictStore:
+    def __init__(self, path: str):
+        """
+        Append-only record of grading verdicts, one JSON line per verdict.
+
+        Each verdict is stored with the model, job ID, sha256 of the graded output,
+        the verifier model and the prompt version. A stored verdict is reused only
+        while all of these still match, so a changed output, verifier model or
+        rubric is graded again. The latest line for a submission wins, and the log
+        is compacted on open once superseded lines outnumber the live ones. A line
+        torn by a crash is cut off on open, before any verdict is appended, and lines
+        that do not decode are skipped.
+
+        Args:
+            path (str): Path to the verdict log
+        """
+        self.path = path
+        self.verdicts: Dict[Tuple[str, int], Dict] = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lines = self._load()
+        if lines > 2 * len(self.verdicts):
+            self._compact()
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def _load(self) -> int:
+        """
+        Load the latest verdict per submission, truncating a partial last line so the
+        next append starts on a line of its own; returns the number of lines read.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        lines = end = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Partial line from a crash mid-write
+                    break
+                end += len(line)
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    print(f"Skipping unreadable line in {self.path}: {line[:80]!r}")
+                    continue
+                self.verdicts[(entry['model'], entry['job_id'])] = entry
+        if end < os.path.getsize(self.path):
+            os.truncate(self.path, end)
+        return lines
+
+    def _compact(self) -> None:
+        """Rewrite the log with only the latest verdict per submission."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.verdicts.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def get(self, model_name: str, job_id: int, content_hash: str, verifier_model: Union[str, Collection[str]],
+            prompt_version: int) -> Optional[str]:
+        """
+        Returns the stored result for a submission, or None if it has to be graded.
+
+        Args:
+            model_name (str): Model that produced the output
+            job_id (int): ID of the job
+            content_hash (str): sha256 of the output as it is now
+            verifier_model (str or Collection[str]): Model that would grade it, or every
+                verifier whose verdicts are accepted
+            prompt_version (int): Version of the grading prompt that would be used
+        """
+        entry = self.verdicts.get((model_name, int(job_id)))
+        accepted = (verifier_model,) if isinstance(verifier_model, str) else verifier_model
+        if (entry is None or entry['sha256'] != content_hash or entry['verifier_model'] not in accepted
+                or entry['prompt_version'] != prompt_version):
+            return None
+        return entry['result']
+
+    def record(self, model_name: str, job_id: int, content_hash: str, verifier_model: str,
+               prompt_version: int, result: str, votes: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Append the verdict for a submission, superseding any earlier one.
+
+        With votes, the (YES, NO) counts of a majority vote are stored too, along with
+        the share of votes for the verdict as its confidence.
+        """
+        entry = {'model': model_name, 'job_id': int(job_id), 'sha256': content_hash,
+                 'verifier_model': verifier_model, 'prompt_version': prompt_version, 'result': result,
+                 'time': time.time()}
+        if votes is not None:
+            yes, no = votes
+            entry['votes'] = {'yes': yes, 'no': no}
+            entry['confidence'] = (yes if result == 'win' else no) / (yes + no) if yes + no else None
+        line = (json.dumps(entry) + '\n').encode('utf-8')
+        with self._lock:
+            os.write(self._fd, line)
+            self.verdicts[(model_name, int(job_id))] = entry
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
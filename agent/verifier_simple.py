@@ -1,21 +1,105 @@
+import argparse
+import hashlib
 import os
+import random
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 import pandas as pd
-from typing import Dict, List, Set
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from agent.grading_cascade import HEURISTICS_VERIFIER, TIER_CHEAP, TIER_HEURISTICS, TIER_JUDGE, GradingCascade
+from agent.verdicts import VERDICTS_FILENAME, VerdictStore
 from api.data import AgentArenaData
-from openai import OpenAI
+from api.results import ResultsStore
+from api.submissions import detect_submission_stores, parse_submission_filename, submission_filename
+from utils.llm_backend import ModelBackend, OpenAIBackend
+from utils.llm_batch import BatchRunner
+from utils.llm_cache import ResponseCache
+from utils.prompt_budget import PromptBudget, Section
+from utils.rate_limiter import RateLimitExceeded, is_retryable
+
+# Model that grades outputs
+VERIFIER_MODEL = "gpt-4o"
+
+# Version of the grading prompt; bump it when the prompt or rubric changes so stored verdicts are regraded
+PROMPT_VERSION = 1
+
+# Candidate labels used by listwise grading, which also caps its sub-batches
+CANDIDATE_LABELS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# One verdict line of a listwise response, e.g. "A: YES", "Candidate B - no" or "**C**: Yes."
+_LISTWISE_VERDICT = re.compile(r"^\W*(?:candidate\s*)?([A-Z])\W*?\s*[:.)\-=]?\s*\W*(YES|NO)\b",
+                               re.IGNORECASE | re.MULTILINE)
+
+class VerificationFailed(Exception):
+    """Raised when the verifier could not answer for an output; it is left ungraded, not failed."""
+
+class LoadedSubmission(NamedTuple):
+    """A submission after the read stage; reused holds its stored result when it needs no grading."""
+    content_hash: str
+    reused: Optional[str]
+    output: Optional[str] = None
+    job_title: Optional[str] = None
+    job_description: Optional[str] = None
 
 class SimpleVerifier:
-    def __init__(self, openai_api_key: str, data: AgentArenaData):
+    def __init__(self, openai_api_key: str, data: AgentArenaData, cache: Optional[ResponseCache] = None,
+                 backend: Optional[ModelBackend] = None, max_total_tokens: int = 16000, max_in_flight: int = 16,
+                 read_ahead: int = 4, listwise: bool = False, max_batch_outputs: int = 4, seed: int = 0,
+                 cascade: Optional[GradingCascade] = None, votes: int = 1, vote_temperature: float = 0.7,
+                 vote_with_n: Optional[bool] = None):
         """
         Initialize the SimpleVerifier with OpenAI API key and AgentArenaData.
         
         Args:
             openai_api_key (str): OpenAI API key for potential model-based verification
             data (AgentArenaData): The AgentArenaData object containing job information
+            cache (ResponseCache, optional): Reuse verdicts for identical outputs and jobs from this cache
+            backend (ModelBackend, optional): Where completions come from. Defaults to the
+                OpenAI API with openai_api_key.
+            max_total_tokens (int): Token budget of each grading request; longer outputs
+                and descriptions are trimmed to fit
+            max_in_flight (int): Maximum number of outputs graded concurrently
+            read_ahead (int): Threads reading outputs and job context ahead of grading
+            listwise (bool): Grade all models' outputs for a job in one call, sending the
+                job description once, instead of one call per output
+            max_batch_outputs (int): Most outputs per listwise call; larger groups are
+                split into sub-batches
+            seed (int): Seed of the per-job candidate order in listwise calls
+            cascade (GradingCascade, optional): Resolve obvious failures with heuristics
+                and clear cases with a cheap model, sending only the rest to gpt-4o
+            votes (int): Grade each output graded on its own by majority of up to this
+                many samples, stopping once the majority is decided; 1 asks once
+            vote_temperature (float): Sampling temperature of the votes
+            vote_with_n (bool, optional): Ask for a round's votes in one call with n; by
+                default, when the backend supports it
         """
+        if votes < 1:
+            raise ValueError(f"votes must be at least 1, got {votes}")
         self.openai_api_key = openai_api_key
-        self.client = OpenAI(api_key=openai_api_key)
+        self.backend = backend if backend is not None else OpenAIBackend(api_key=openai_api_key)
         self.data = data
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.read_ahead = read_ahead
+        # The verdict is a single word, so only a few completion tokens are needed
+        self.prompt_budget = PromptBudget(VERIFIER_MODEL, max_total_tokens=max_total_tokens, max_output_tokens=5,
+                                          min_output_tokens=5)
+        self.listwise = listwise
+        self.max_batch_outputs = max(1, min(max_batch_outputs, len(CANDIDATE_LABELS)))
+        self.seed = seed
+        self.cascade = cascade
+        self.votes = votes
+        self.vote_temperature = vote_temperature
+        self.vote_with_n = self.backend.supports_n if vote_with_n is None else vote_with_n
+        # Verdicts that can be reused from the verdict store
+        self.accepted_verifiers = ((VERIFIER_MODEL,) if cascade is None
+                                   else (VERIFIER_MODEL, HEURISTICS_VERIFIER, cascade.cheap_model))
+        # A verdict line per candidate
+        self.listwise_budget = PromptBudget(VERIFIER_MODEL, max_total_tokens=max_total_tokens,
+                                            max_output_tokens=8 * self.max_batch_outputs,
+                                            min_output_tokens=8 * self.max_batch_outputs)
         
     def _read_output_file(self, filepath: str) -> str:
         """Read the contents of an output file."""
@@ -25,23 +109,18 @@ class SimpleVerifier:
     def _parse_filename(self, filename: str) -> tuple[str, int]:
         """Parse the model name and job ID from filename."""
         # Expected format: output_{model_name}_{jobID}.txt
-        parts = filename.replace('.txt', '').split('_')
-        if len(parts) != 3 or parts[0] != 'output':
-            raise ValueError(f"Invalid filename format: {filename}")
-        return parts[1], int(parts[2])
+        return parse_submission_filename(filename)
     
-    def _verify_output(self, output: str, job_description: str) -> bool:
+    def _verification_request(self, output: str, job_description: str, job_id: Optional[int] = None) -> Dict[str, Any]:
         """
-        Verify if the output satisfies the job description using GPT-4.
+        Build the chat request grading one output, within the prompt budget.
+        
+        Over-budget prompts are trimmed, the job description before the output.
         
-        Args:
-            output (str): The model's output to verify
-            job_description (str): The job description to compare against
-            
         Returns:
-            bool: True if the output is sufficient to get paid, False otherwise
+            Dict[str, Any]: Keyword arguments for chat.completions.create
         """
-        prompt = f"""You are a job verification expert. Your task is to determine if the provided output is sufficient to warrant payment for the job.
+        prompt_template = """You are a job verification expert. Your task is to determine if the provided output is sufficient to warrant payment for the job.
 
 Job Description:
 {job_description}
@@ -56,97 +135,625 @@ Please analyze if this output is sufficient to warrant payment for the job. Cons
 
 Respond with only "YES" if the output is sufficient to warrant payment, or "NO" if it is not.
 """
+        system = {"role": "system", "content": "You are a job verification expert. Respond with only YES or NO."}
+        fitted = self.prompt_budget.fit([system], [
+            Section('job_description', str(job_description), priority=0, min_tokens=512,
+                    key=(job_id, 'DESCRIPTION') if job_id is not None else None),
+            Section('output', str(output), priority=1, min_tokens=2048),
+        ], fixed_text=prompt_template.format(job_description='', output=''))
+        prompt = prompt_template.format(**fitted.texts)
+        return dict(
+            model=VERIFIER_MODEL,
+            messages=[system, {"role": "user", "content": prompt}],
+            temperature=0.1,  # Low temperature for more consistent results
+            max_tokens=fitted.max_tokens
+        )
+    
+    def _verify_output(self, output: str, job_description: str, job_id: Optional[int] = None) -> bool:
+        """
+        Verify if the output satisfies the job description using GPT-4.
         
+        Args:
+            output (str): The model's output to verify
+            job_description (str): The job description to compare against
+            job_id (int, optional): ID of the job, to reuse its description's token count
+            
+        Returns:
+            bool: True if the output is sufficient to get paid, False otherwise
+            
+        Raises:
+            RateLimitExceeded: If the call is still throttled after all retries
+            VerificationFailed: If the call failed for any other reason
+        """
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a job verification expert. Respond with only YES or NO."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1  # Low temperature for more consistent results
-            )
+            response = self.backend.complete(cache=self.cache,
+                                             **self._verification_request(output, job_description, job_id))
             
             result = response.choices[0].message.content.strip().upper()
             return result == "YES"
             
+        except RateLimitExceeded:
+            # Throttling says nothing about the output, so don't record it as a failure
+            raise
         except Exception as e:
-            print(f"Error during verification: {str(e)}")
-            return False  # Fail safe: if there's an error, consider it a failure
+            if is_retryable(e):
+                # Neither do transient errors; the output is left for a later run
+                raise RateLimitExceeded(f"Transient error: {e}") from e
+            # Nor do other errors; a failure verdict would be stored and reused
+            raise VerificationFailed(f"Error during verification: {e}") from e
     
-    def process_outputs(self, output_dir: str) -> None:
+    def _vote_output(self, output: str, job_description: str, job_id: Optional[int] = None) -> Tuple[bool, int, int]:
         """
-        Process all output files and generate results.csv
+        Verify an output by majority of up to self.votes sampled answers, stopping once decided.
+        
+        Each round asks for just enough votes to settle the majority if they agree, e.g.
+        two of three, and another round follows only if they split. A round's votes come
+        from one call with n when vote_with_n is set, or one call each. Calls after the
+        first are seeded with their round, so they are sampled, and cached, separately.
+        Answers other than YES or NO are not counted, and an output without a majority
+        when the votes run out fails, unless a call errored and cost it a vote.
+        
+        Returns:
+            Tuple[bool, int, int]: Whether the output is sufficient, and the YES and NO votes
+            
+        Raises:
+            RateLimitExceeded: If a call is still throttled or failing transiently after all retries
+            VerificationFailed: If a call failed otherwise and no majority was reached without it
+        """
+        request = {**self._verification_request(output, job_description, job_id), 'temperature': self.vote_temperature}
+        majority = self.votes // 2 + 1
+        yes = no = asked = rounds = 0
+        error = None
+        while max(yes, no) < majority and asked < self.votes:
+            wanted = min(majority - max(yes, no), self.votes - asked) if self.vote_with_n else 1
+            sample = dict(request)
+            if wanted > 1:
+                sample['n'] = wanted
+            if rounds:
+                sample['seed'] = rounds
+            asked += wanted
+            rounds += 1
+            try:
+                response = self.backend.complete(cache=self.cache, **sample)
+            except RateLimitExceeded:
+                raise
+            except Exception as e:
+                if is_retryable(e):
+                    raise RateLimitExceeded(f"Transient error: {e}") from e
+                print(f"Error during verification vote: {str(e)}")
+                error = e
+                continue
+            answers = [(choice.message.content or '').strip().upper() for choice in response.choices[:wanted]]
+            yes += answers.count('YES')
+            no += answers.count('NO')
+        if error is not None and max(yes, no) < majority:
+            raise VerificationFailed(f"Error during verification vote: {error}") from error
+        return yes > no, yes, no
+    
+    def _verify_outputs_listwise(self, outputs: Dict[str, str], job_description: str,
+                                 job_id: Optional[int] = None) -> Dict[str, bool]:
+        """
+        Verify several models' outputs for the same job in one call.
+        
+        The job description is sent once, followed by the outputs labelled A, B, ...
+        in the given order; model names are not shown. Over-budget prompts are trimmed,
+        the job description before the outputs. Candidates missing from the response
+        are left out of the result.
         
         Args:
-            output_dir (str): Directory containing output files
+            outputs (Dict[str, str]): Model name to output, in the order to present them
+            job_description (str): The job description to compare against
+            job_id (int, optional): ID of the job, to reuse its description's token count
+            
+        Returns:
+            Dict[str, bool]: Model name to whether its output is sufficient to get paid
+            
+        Raises:
+            RateLimitExceeded: If the call is still throttled or failing transiently after all retries
+            VerificationFailed: If the call failed for any other reason
+        """
+        prompt_template = """You are a job verification expert. Several candidate outputs were submitted for the same job. For each candidate, determine whether it is sufficient to warrant payment for the job.
+
+Job Description:
+{job_description}
+
+{candidates}
+For each candidate, consider:
+1. Does it address the key requirements of the job?
+2. Is it complete and well-formed?
+3. Does it provide value to the client?
+
+Judge every candidate on its own merits, not against the other candidates. Respond with one line per candidate, "YES" if it is sufficient to warrant payment or "NO" if it is not, in the form:
+A: YES
+B: NO
+"""
+        labels = dict(zip(CANDIDATE_LABELS, outputs))
+        system = {"role": "system", "content": "You are a job verification expert. Respond with one YES or NO line per candidate."}
+        sections = [Section('job_description', str(job_description), priority=0, min_tokens=512,
+                            key=(job_id, 'DESCRIPTION') if job_id is not None else None)]
+        sections += [Section(label, str(outputs[model_name]), priority=1, min_tokens=1024)
+                     for label, model_name in labels.items()]
+        candidate_template = ''.join(f"Candidate {label}:\n{{{label}}}\n\n" for label in labels)
+        fitted = self.listwise_budget.fit([system], sections, fixed_text=prompt_template.format(
+            job_description='', candidates=candidate_template.format(**{label: '' for label in labels})))
+        prompt = prompt_template.format(job_description=fitted.texts['job_description'],
+                                        candidates=candidate_template.format(**fitted.texts))
+        
+        try:
+            response = self.backend.complete(
+                cache=self.cache,
+                model=VERIFIER_MODEL,
+                messages=[system, {"role": "user", "content": prompt}],
+                temperature=0.1,  # Low temperature for more consistent results
+                max_tokens=fitted.max_tokens
+            )
+            content = response.choices[0].message.content or ''
+        except RateLimitExceeded:
+            # Throttling says nothing about the outputs, so don't record them as failures
+            raise
+        except Exception as e:
+            if is_retryable(e):
+                raise RateLimitExceeded(f"Transient error: {e}") from e
+            # Neither do other errors; the outputs are left ungraded, as in _verify_output
+            raise VerificationFailed(f"Error during verification: {e}") from e
+        
+        verdicts = {}
+        for label, verdict in _LISTWISE_VERDICT.findall(content):
+            model_name = labels.get(label.upper())
+            # The first verdict for a candidate counts
+            if model_name is not None and model_name not in verdicts:
+                verdicts[model_name] = verdict.upper() == 'YES'
+        return verdicts
+    
+    def _grade_job(self, job_id: int, outputs: Dict[str, str],
+                   job_description: str) -> Tuple[Dict[str, bool], Dict[str, Exception]]:
+        """
+        Grade every output for a job listwise, in sub-batches of max_batch_outputs.
+        
+        Candidates are shuffled with a generator seeded by the job ID, so positions are
+        unrelated to model names but stable across runs. Single outputs, and candidates
+        whose verdict could not be parsed, are graded on their own. Outputs whose call
+        failed are left ungraded, without a per-output retry.
+        
+        Returns:
+            Tuple[Dict[str, bool], Dict[str, Exception]]: Model name to verdict, and model
+                name to the VerificationFailed of each output left ungraded
+        """
+        model_names = sorted(outputs)
+        random.Random(f"{self.seed}:{job_id}").shuffle(model_names)
+        verdicts: Dict[str, bool] = {}
+        errors: Dict[str, Exception] = {}
+        for start in range(0, len(model_names), self.max_batch_outputs):
+            batch = model_names[start:start + self.max_batch_outputs]
+            if len(batch) > 1:
+                try:
+                    verdicts.update(self._verify_outputs_listwise({name: outputs[name] for name in batch},
+                                                                  job_description, job_id))
+                except VerificationFailed as e:
+                    errors.update({name: e for name in batch})
+        for model_name in model_names:
+            if model_name not in verdicts and model_name not in errors:
+                try:
+                    verdicts[model_name] = self._verify_output(outputs[model_name], job_description, job_id)
+                except VerificationFailed as e:
+                    errors[model_name] = e
+        return verdicts, errors
+    
+    def _collect_job_context(self, job_ids: Set[int], jobs: Iterable[pd.DataFrame]) -> Dict[int, Tuple[str, str]]:
         """
-        # Get all txt files in the output directory
-        output_files = [f for f in os.listdir(output_dir) 
-                       if f.endswith('.txt') and f.startswith('output_')]
+        Stream job batches and keep (TITLE, DESCRIPTION) only for the given job IDs.
         
-        # Initialize sets to track unique models and jobs
-        model_names: Set[str] = set()
-        job_ids: Set[int] = set()
+        Args:
+            job_ids (Set[int]): IDs of the jobs that have outputs
+            jobs (Iterable[pd.DataFrame]): Batches with ID, TITLE and DESCRIPTION columns
+            
+        Returns:
+            Dict[int, Tuple[str, str]]: Job ID to (title, description)
+        """
+        context = {}
+        for batch in jobs:
+            batch = batch[batch['ID'].isin(job_ids)]
+            context.update(zip(batch['ID'].tolist(), zip(batch['TITLE'].tolist(), batch['DESCRIPTION'].tolist())))
+        return context
+    
+    def _get_job_context(self, job_id: int, context: Optional[Dict[int, Tuple[str, str]]]) -> Tuple[str, str]:
+        """Returns (title, description) for a job from streamed context or the data handler."""
+        if context is None:
+            return self.data.get_job_metadata(job_id).title, self.data.get_job_description(job_id)
+        if job_id not in context:
+            raise KeyError(f"Job ID {job_id} not found in the dataset")
+        return context[job_id]
+    
+    def _load_submission(self, store: Any, model_name: str, job_id: int,
+                         context: Optional[Dict[int, Tuple[str, str]]], verdicts: VerdictStore,
+                         force: bool) -> LoadedSubmission:
+        """
+        Reuse the stored verdict of an unchanged output, or read the output and look up
+        the job title and description to grade it against.
+        """
+        if not force:
+            content_hash = store.info(model_name, job_id).sha256
+            reused = verdicts.get(model_name, job_id, content_hash, self.accepted_verifiers, PROMPT_VERSION)
+            if reused is not None:
+                return LoadedSubmission(content_hash, reused)
+        content = store.read_bytes(model_name, job_id)
+        job_title, job_description = self._get_job_context(job_id, context)
+        return LoadedSubmission(hashlib.sha256(content).hexdigest(), None,
+                                content.decode('utf-8', errors='replace'), job_title, job_description)
+    
+    def _load_job(self, job_id: int, stores: Dict[str, Any], context: Optional[Dict[int, Tuple[str, str]]],
+                  verdicts: VerdictStore, force: bool) -> Dict[str, Any]:
+        """
+        Read stage: load a job's submissions, keeping errors per submission.
         
-        # First pass: collect all model names and job IDs
-        for filename in output_files:
+        Returns:
+            Dict[str, Any]: Model name to its LoadedSubmission, or the exception raised loading it
+        """
+        loaded = {}
+        for model_name, store in stores.items():
             try:
-                model_name, job_id = self._parse_filename(filename)
-                model_names.add(model_name)
-                job_ids.add(job_id)
-            except ValueError:
+                loaded[model_name] = self._load_submission(store, model_name, job_id, context, verdicts, force)
+            except (ValueError, KeyError, OSError) as e:
+                loaded[model_name] = e
+        return loaded
+    
+    def _run_cascade(self, job_id: int,
+                     to_grade: Dict[str, LoadedSubmission]) -> Tuple[Dict[str, Tuple[bool, str]], Dict[str, str]]:
+        """
+        Resolve what the cascade's heuristics and cheap model can of a job's submissions.
+        
+        Returns:
+            Tuple[Dict[str, Tuple[bool, str]], Dict[str, str]]: Model name to verdict and the
+                verifier that decided it, for the resolved submissions; and model name to
+                the model it copies, for duplicates that share their original's verdict
+        
+        Raises:
+            RateLimitExceeded: If a cheap model call is still throttled after all retries
+        """
+        cascade = self.cascade
+        duplicates = cascade.find_duplicates({model_name: submission.output for model_name, submission in to_grade.items()})
+        resolved, copies = {}, {}
+        for model_name, submission in to_grade.items():
+            if model_name in duplicates:
+                if cascade.reject_duplicates:
+                    cascade.record(TIER_HEURISTICS, 'duplicate')
+                    resolved[model_name] = (False, HEURISTICS_VERIFIER)
+                else:
+                    copies[model_name] = duplicates[model_name]
                 continue
+            
+            reason = cascade.precheck(submission.output, submission.job_description)
+            if reason is not None:
+                is_valid, tier, verifier = False, TIER_HEURISTICS, HEURISTICS_VERIFIER
+            else:
+                request = self._verification_request(submission.output, submission.job_description, job_id)
+                try:
+                    is_valid = cascade.cheap_verdict(self.backend.complete(cache=self.cache,
+                                                                           **cascade.cheap_request(request)))
+                except RateLimitExceeded:
+                    raise
+                except Exception as e:
+                    print(f"Error during cheap verification, escalating: {str(e)}")
+                    is_valid = None
+                if is_valid is None:
+                    cascade.record(TIER_JUDGE)
+                    continue
+                tier, verifier = TIER_CHEAP, cascade.cheap_model
+            
+            if cascade.should_audit(model_name, job_id):
+                try:
+                    judged = self._verify_output(submission.output, submission.job_description, job_id)
+                except VerificationFailed as e:
+                    # The audit is skipped rather than counted; the tier's verdict stands
+                    print(f"{str(e)}; keeping the {verifier} verdict")
+                else:
+                    cascade.record_audit(tier, judged == is_valid)
+                    is_valid, verifier = judged, VERIFIER_MODEL
+            cascade.record(tier, reason)
+            resolved[model_name] = (is_valid, verifier)
+        return resolved, copies
+    
+    def _grade_submissions(self, job_id: int, loaded: Future,
+                           verdicts: VerdictStore) -> List[Tuple[str, Optional[str], bool, List[str]]]:
+        """
+        Grading stage: verify a job's submissions once its read stage has finished, and
+        store the verdicts; listwise in one call per sub-batch, or one call per output.
         
-        # Create a DataFrame with all jobs as rows and models as columns
-        results_df = pd.DataFrame(index=sorted(job_ids), 
-                                columns=sorted(model_names))
-        results_df.index.name = 'jobID'
+        Errors are isolated to the submission, whose result is left blank and not
+        recorded, so a later run grades it again.
         
-        # Second pass: process each file and fill the DataFrame
-        for filename in output_files:
-            try:
-                model_name, job_id = self._parse_filename(filename)
-                filepath = os.path.join(output_dir, filename)
-                
-                # Read the output and job description
-                output = self._read_output_file(filepath)
-                job_description = self.data.get_job_description(job_id)
-                
-                # Get job metadata for better logging
-                job_metadata = self.data.get_jobs_metadata()[job_id]
-                job_title = job_metadata[0]  # First element is the title
-                
-                # Verify the output
-                is_valid = self._verify_output(output, job_description)
+        Returns:
+            List[Tuple[str, Optional[str], bool, List[str]]]: Per model: 'win', 'fail' or
+                None on error, whether a stored verdict was reused, and log lines
+        """
+        submissions = loaded.result()
+        graded: Dict[str, bool] = {}
+        verifiers: Dict[str, str] = {}
+        tallies: Dict[str, Tuple[int, int]] = {}
+        copies: Dict[str, str] = {}
+        errors = {model_name: e for model_name, e in submissions.items() if isinstance(e, Exception)}
+        to_grade = {model_name: submission for model_name, submission in submissions.items()
+                    if model_name not in errors and submission.reused is None}
+        try:
+            to_judge = to_grade
+            if self.cascade is not None and to_grade:
+                resolved, copies = self._run_cascade(job_id, to_grade)
+                for model_name, (is_valid, verifier) in resolved.items():
+                    graded[model_name], verifiers[model_name] = is_valid, verifier
+                to_judge = {model_name: submission for model_name, submission in to_grade.items()
+                            if model_name not in resolved and model_name not in copies}
+            
+            if self.listwise and len(to_judge) > 1:
+                job_description = next(iter(to_judge.values())).job_description
+                judged, failed = self._grade_job(job_id, {model_name: submission.output
+                                                          for model_name, submission in to_judge.items()}, job_description)
+                graded.update(judged)
+                errors.update(failed)
+            else:
+                for model_name, submission in to_judge.items():
+                    try:
+                        if self.votes > 1:
+                            is_valid, yes, no = self._vote_output(submission.output, submission.job_description, job_id)
+                            graded[model_name], tallies[model_name] = is_valid, (yes, no)
+                        else:
+                            graded[model_name] = self._verify_output(submission.output, submission.job_description, job_id)
+                    except (RateLimitExceeded, VerificationFailed) as e:
+                        errors[model_name] = e
+        except (RateLimitExceeded, VerificationFailed) as e:
+            errors.update({model_name: e for model_name in to_grade if model_name not in graded and model_name not in copies})
+        
+        # Copies share the verdict of the output they duplicate
+        for model_name, original in copies.items():
+            if original in graded:
+                graded[model_name] = graded[original]
+                verifiers[model_name] = verifiers.get(original, VERIFIER_MODEL)
+                self.cascade.record(TIER_HEURISTICS, 'duplicate')
+            else:
+                errors[model_name] = errors.get(original, KeyError(f"Duplicate of {original}, which was not graded"))
+        
+        results = []
+        for model_name, submission in submissions.items():
+            if model_name in errors:
+                filename = submission_filename(model_name, job_id)
+                results.append((model_name, None, False, [f"Error processing {filename}: {str(errors[model_name])}"]))
+            elif submission.reused is not None:
+                results.append((model_name, submission.reused, True, []))
+            else:
+                is_valid = graded[model_name]
                 result = 'win' if is_valid else 'fail'
-                
-                # Update the DataFrame
-                results_df.loc[job_id, model_name] = result
-                
-                # Print detailed information
-                print(f"\nJob: {job_title} (ID: {job_id})")
-                print(f"Agent: {model_name}")
-                print(f"Result: {'✓ SUCCESS' if is_valid else '✗ FAILURE'}")
-                print("-" * 80)
-                
-            except (ValueError, KeyError) as e:
-                print(f"Error processing {filename}: {str(e)}")
+                verifier = verifiers.get(model_name, VERIFIER_MODEL)
+                verdicts.record(model_name, job_id, submission.content_hash, verifier, PROMPT_VERSION, result,
+                                votes=tallies.get(model_name))
+                lines = [
+                    f"\nJob: {submission.job_title} (ID: {job_id})",
+                    f"Agent: {model_name}",
+                    f"Result: {'✓ SUCCESS' if is_valid else '✗ FAILURE'}",
+                ]
+                if self.cascade is not None:
+                    lines.append(f"Grader: {verifier}")
+                if model_name in tallies:
+                    lines.append(f"Votes: {tallies[model_name][0]} YES, {tallies[model_name][1]} NO")
+                results.append((model_name, result, False, lines + ["-" * 80]))
+        return results
+    
+    def _grade_batch(self, units: List[Tuple[int, Dict[str, Any]]], context: Optional[Dict[int, Tuple[str, str]]],
+                     verdicts: VerdictStore, force: bool, batch: BatchRunner,
+                     wait: bool) -> List[Tuple[int, List[Tuple[str, Optional[str], bool, List[str]]]]]:
+        """
+        Grade submissions through the batch API, one request per output.
+        
+        Returns results in the shape of _grade_submissions, per job. Submissions whose
+        batch is still running or failed are left blank.
+        """
+        results: Dict[int, List[Tuple[str, Optional[str], bool, List[str]]]] = {job_id: [] for job_id, _ in units}
+        requested: Dict[str, Tuple[int, str, LoadedSubmission]] = {}
+        
+        def requests():
+            for job_id, stores in units:
+                for model_name, submission in self._load_job(job_id, stores, context, verdicts, force).items():
+                    if isinstance(submission, Exception):
+                        filename = submission_filename(model_name, job_id)
+                        results[job_id].append((model_name, None, False, [f"Error processing {filename}: {str(submission)}"]))
+                    elif submission.reused is not None:
+                        results[job_id].append((model_name, submission.reused, True, []))
+                    else:
+                        custom_id = f"verify-{model_name}-{job_id}-{submission.content_hash[:16]}-v{PROMPT_VERSION}"
+                        # Only what ingestion needs is kept; the output itself goes to the request file
+                        requested[custom_id] = (job_id, model_name, submission._replace(output=None, job_description=None))
+                        yield custom_id, self._verification_request(submission.output, submission.job_description, job_id)
+        
+        answers = batch.run(requests(), wait=wait)
+        for custom_id, (job_id, model_name, submission) in requested.items():
+            answer = answers.get(custom_id)
+            if answer is None:
+                reason = batch.errors.get(custom_id, 'batch still running')
+                results[job_id].append((model_name, None, False,
+                                        [f"Not graded {submission_filename(model_name, job_id)}: {reason}"]))
                 continue
+            is_valid = (answer.choices[0].message.content or '').strip().upper() == "YES"
+            result = 'win' if is_valid else 'fail'
+            verdicts.record(model_name, job_id, submission.content_hash, VERIFIER_MODEL, PROMPT_VERSION, result)
+            results[job_id].append((model_name, result, False, [
+                f"\nJob: {submission.job_title} (ID: {job_id})",
+                f"Agent: {model_name}",
+                f"Result: {'✓ SUCCESS' if is_valid else '✗ FAILURE'}",
+                "-" * 80,
+            ]))
+        return list(results.items())
+    
+    def process_outputs(self, output_dir: str, jobs: Optional[Iterable[pd.DataFrame]] = None,
+                        max_in_flight: Optional[int] = None, force: bool = False,
+                        batch: Optional[BatchRunner] = None, wait: bool = True,
+                        results_store: Optional[ResultsStore] = None, run: Optional[str] = None) -> None:
+        """
+        Process all output files and generate results.csv
+        
+        Submissions go through a pipeline: reading the output and looking up the job
+        runs on read_ahead threads, ahead of grading on up to max_in_flight threads, so
+        total time is bounded by the API's concurrency rather than the sum of call
+        latencies. At most twice max_in_flight submissions are in the pipeline at once.
+        Results are logged in submission order as they complete, and a submission that
+        fails is reported and left blank without affecting the others.
+        
+        With listwise grading, a job's submissions move through the pipeline together
+        and are graded in one call per sub-batch.
+        
+        With a cascade, a job's submissions also move through the pipeline together, so
+        copies across models are found, and the cascade's tiers run before the judge.
+        
+        With votes above 1, outputs the judge grades on their own are decided by an
+        early-stopping majority vote, and the vote counts are stored with the verdict
+        as its confidence.
+        
+        With a BatchRunner, outputs that need grading are sent through the batch API
+        instead, one request per output and without the cascade, and their verdicts are ingested when the
+        batches finish. Outputs still being graded are left blank; run again, e.g. with
+        the same batch work directory the next morning, to pick up their verdicts.
+        
+        Verdicts are stored in verdicts.jsonl in output_dir with the hash of the graded
+        output, the verifier model and PROMPT_VERSION. Outputs whose stored verdict
+        still matches are not graded again, so a rerun only grades new or changed
+        submissions and merges the rest into results.csv.
+        
+        With a ResultsStore, every verdict in results.csv is also saved to it under run,
+        one typed row per model and job, for api.leaderboard.Leaderboard.
+        
+        Args:
+            output_dir (str): Directory containing output files
+            jobs (Iterable[pd.DataFrame], optional): Batches of jobs, as yielded by iter_jobs, to
+                take job titles and descriptions from instead of the data handler. Only the
+                jobs that have outputs are kept in memory.
+            max_in_flight (int, optional): Overrides the verifier's max_in_flight for this run
+            force (bool): Grade every submission again, e.g. after changing the rubric
+                without bumping PROMPT_VERSION
+            batch (BatchRunner, optional): Grade through the batch API with this runner
+            wait (bool): With batch, wait until every batch has finished; if False, return
+                after submitting and write results.csv with the verdicts available so far
+            results_store (ResultsStore, optional): Also save the verdicts here
+            run (str, optional): Run name in results_store; defaults to output_dir's name
+        """
+        max_in_flight = max_in_flight or self.max_in_flight
+        
+        # Find every submission, whether saved as plain files or packed segments.
+        # A key present in both layouts is read from the packed segments.
+        submissions = {}
+        for store in detect_submission_stores(output_dir):
+            for key in store.keys():
+                submissions[key] = store
+        
+        # Collect all model names and job IDs
+        model_names: Set[str] = {model_name for model_name, _ in submissions}
+        job_ids: Set[int] = {job_id for _, job_id in submissions}
+        
+        # Pull job context for just the graded jobs out of the stream, if one was given
+        context = None
+        if jobs is not None:
+            context = self._collect_job_context(job_ids, jobs)
+        
+        # Units of work: a job's submissions graded together, or each submission on its own
+        if (self.listwise or self.cascade is not None) and batch is None:
+            by_job: Dict[int, Dict[str, Any]] = {}
+            for (model_name, job_id), store in submissions.items():
+                by_job.setdefault(job_id, {})[model_name] = store
+            units = sorted(by_job.items())
+        else:
+            units = [(job_id, {model_name: store}) for (model_name, job_id), store in submissions.items()]
+        
+        # Bounds units between discovery and aggregation, so reads don't run far ahead of grading
+        slots = threading.BoundedSemaphore(2 * max_in_flight)
+        pending: Deque[Tuple[int, Future]] = deque()
+        results: Dict[Tuple[int, str], str] = {}
+        reused_count = 0
+        verdicts = VerdictStore(os.path.join(output_dir, VERDICTS_FILENAME))
+        
+        def aggregate(wait: bool) -> None:
+            # Record and log finished submissions from the front of the queue, keeping submission order
+            nonlocal reused_count
+            while pending and (wait or pending[0][1].done()):
+                job_id, graded = pending.popleft()
+                for model_name, result, reused, lines in graded.result():
+                    reused_count += reused
+                    if result is not None:
+                        results[(job_id, model_name)] = result
+                    for line in lines:
+                        print(line)
+        
+        try:
+            if batch is not None:
+                # Batch verdicts arrive together and are aggregated like finished pipeline units
+                for job_id, unit_results in self._grade_batch(units, context, verdicts, force, batch, wait):
+                    done: Future = Future()
+                    done.set_result(unit_results)
+                    pending.append((job_id, done))
+                aggregate(wait=True)
+            else:
+                with ThreadPoolExecutor(max_workers=self.read_ahead) as readers, \
+                        ThreadPoolExecutor(max_workers=max_in_flight) as graders:
+                    for job_id, stores in units:
+                        slots.acquire()
+                        loaded = readers.submit(self._load_job, job_id, stores, context, verdicts, force)
+                        graded = graders.submit(self._grade_submissions, job_id, loaded, verdicts)
+                        graded.add_done_callback(lambda _: slots.release())
+                        pending.append((job_id, graded))
+                        aggregate(wait=False)
+                    aggregate(wait=True)
+        finally:
+            verdicts.close()
+        
+        # Verdicts in long format, one row per graded submission
+        long = pd.DataFrame([(job_id, model_name, result) for (job_id, model_name), result in results.items()],
+                            columns=['job_id', 'model', 'win'])
+        long['verifier'] = [verdicts.verdicts.get((model_name, job_id), {}).get('verifier_model')
+                            for job_id, model_name in zip(long['job_id'], long['model'])]
+        
+        # Pivot into a DataFrame with all jobs as rows and models as columns
+        results_df = (long.pivot(index='job_id', columns='model', values='win')
+                      .reindex(index=sorted(job_ids), columns=sorted(model_names)))
+        results_df.index.name = 'jobID'
+        results_df.columns.name = None
         
         # Save the results
         output_path = os.path.join(output_dir, 'results.csv')
         results_df.to_csv(output_path)
         print(f"\nResults saved to {output_path}")
+        print(f"Graded {len(results) - reused_count:,} new or changed submissions, reused {reused_count:,} stored verdicts")
+        if results_store is not None:
+            run = run or os.path.basename(os.path.normpath(output_dir))
+            changed = results_store.add_many(long, run=run)
+            print(f"Saved {changed:,} new or changed verdicts to {results_store.path} as run {run}")
+        if self.cascade is not None and batch is None:
+            for line in self.cascade.summary():
+                print(line)
+        if self.cache is not None:
+            print(f"LLM cache: {self.cache.stats()}")
 
-# Example usage:
 if __name__ == "__main__":
-    # Initialize the data
-    data = AgentArenaData("data/df_randomized_feasible_cleaned.csv")
-    
-    # Create verifier and process outputs
-    verifier = SimpleVerifier(
-        openai_api_key="your-api-key-here",  # Replace with actual API key
-        data=data
-    )
-    verifier.process_outputs("outputs")
+    parser = argparse.ArgumentParser(description="Grade agent submissions and write results.csv")
+    parser.add_argument('output_dir', nargs='?', default='outputs', help="Directory containing output files")
+    parser.add_argument('--data', default='data/df_randomized_feasible_cleaned.csv',
+                        help="Path to the cleaned CSV file or .arena job store")
+    parser.add_argument('--max-in-flight', type=int, default=16)
+    parser.add_argument('--listwise', action='store_true', help="Grade all models' outputs for a job in one call")
+    parser.add_argument('--max-batch-outputs', type=int, default=4, help="Most outputs per listwise call")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Resolve obvious failures locally and clear cases with gpt-4o-mini before gpt-4o")
+    parser.add_argument('--audit-rate', type=float, default=0.05,
+                        help="With --cascade, fraction of early verdicts checked against gpt-4o")
+    parser.add_argument('--votes', type=int, default=1,
+                        help="Grade each output by majority of up to this many samples, e.g. 3")
+    parser.add_argument('--batch-dir', help="Grade through the batch API, keeping batch files in this directory")
+    parser.add_argument('--no-wait', action='store_true', help="With --batch-dir, submit and return without waiting")
+    parser.add_argument('--force', action='store_true', help="Grade every submission again, ignoring stored verdicts")
+    parser.add_argument('--results-store', help="Also save verdicts to this results store, e.g. results.sqlite")
+    parser.add_argument('--run', help="Run name in the results store; defaults to the output directory's name")
+    args = parser.parse_args()
+
+    data = AgentArenaData(args.data)
+    verifier = SimpleVerifier(openai_api_key=os.getenv('OPENAI_API_KEY'), data=data, max_in_flight=args.max_in_flight,
+                              listwise=args.listwise, max_batch_outputs=args.max_batch_outputs,
+                              cascade=GradingCascade(audit_rate=args.audit_rate) if args.cascade else None,
+                              votes=args.votes)
+    batch = BatchRunner(args.batch_dir, backend=verifier.backend) if args.batch_dir else None
+    results_store = ResultsStore(args.results_store) if args.results_store else None
+    verifier.process_outputs(args.output_dir, force=args.force, batch=batch, wait=not args.no_wait,
+                             results_store=results_store, run=args.run)
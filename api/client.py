@@ -0,0 +1,279 @@
+import gzip
+import http.client
+import io
+import json
+import math
+import os
+import stat
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+from urllib.parse import quote, urlencode, urlsplit
+import pandas as pd
+from api.data import JobMetadata, METADATA_COLUMNS, where_mask
+from api.server import encode_where
+from api.submissions import SubmissionOutput, iter_chunks
+
+def _is_regular_file(body: Any) -> bool:
+    """Whether a request body is a file object on a regular file, which can be sent with sendfile."""
+    if not hasattr(body, 'fileno') or not hasattr(body, 'tell'):
+        return False
+    try:
+        return stat.S_ISREG(os.fstat(body.fileno()).st_mode)
+    except (OSError, io.UnsupportedOperation):
+        return False
+
+class AgentArenaClient:
+    def __init__(self, base_url: str = "http://127.0.0.1:8765", timeout: float = 60.0,
+                 cache_size: int = 4096):
+        """
+        Thin HTTP client for api.server that drops in for AgentArenaData.
+
+        Each thread keeps one keep-alive connection. GET responses are cached with
+        their ETag and revalidated with If-None-Match, so unchanged job data is not
+        re-sent, and responses are requested gzipped.
+
+        Args:
+            base_url (str): URL of the running server
+            timeout (float): Socket timeout in seconds
+            cache_size (int): Number of GET responses to keep for revalidation
+        """
+        url = urlsplit(base_url)
+        self.host = url.hostname or '127.0.0.1'
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._cache_lock = threading.Lock()
+        self._cache: 'OrderedDict[str, Tuple[str, bytes]]' = OrderedDict()
+        self._metadata = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _send(self, conn: http.client.HTTPConnection, method: str, path: str, headers: dict,
+              body: Union[None, bytes, BinaryIO, Iterable[bytes]]) -> None:
+        """
+        Send a request; bytes are sent as they are, a regular file from its current
+        position with socket.sendfile, and anything else chunked as it is iterated.
+        """
+        if body is None or isinstance(body, bytes):
+            conn.request(method, path, body=body, headers=headers)
+        elif _is_regular_file(body):
+            size = os.fstat(body.fileno()).st_size - body.tell()
+            conn.putrequest(method, path, skip_accept_encoding=True)
+            for name, value in {**headers, 'Content-Length': str(size)}.items():
+                conn.putheader(name, value)
+            conn.endheaders()
+            # Copied in the kernel where the platform supports it
+            conn.sock.sendfile(body, offset=body.tell(), count=size)
+        else:
+            conn.request(method, path, body=iter_chunks(body), headers=headers, encode_chunked=True)
+
+    def _request(self, method: str, path: str, body: Union[None, bytes, BinaryIO, Iterable[bytes]] = None,
+                 content_type: str = 'application/json') -> bytes:
+        """
+        Send a request over this thread's keep-alive connection and return the decoded body.
+
+        The body may be bytes, a binary file object or an iterable of chunks, which are
+        streamed rather than read into memory.
+
+        Raises:
+            KeyError: If the server answers 404
+            ValueError: If the server answers 400
+            RuntimeError: For any other error status
+        """
+        headers = {'Accept-Encoding': 'gzip'}
+        cached = None
+        if method == 'GET':
+            with self._cache_lock:
+                cached = self._cache.get(path)
+            if cached is not None:
+                headers['If-None-Match'] = cached[0]
+        if body is not None:
+            headers['Content-Type'] = content_type
+
+        # Retry once on a fresh connection if the server closed an idle keep-alive socket.
+        # A one-shot iterable can't be sent twice, so it starts on a fresh connection instead.
+        rewind = body.tell() if _is_regular_file(body) else None
+        replayable = body is None or isinstance(body, bytes) or rewind is not None
+        if not replayable:
+            self.close()
+        for attempt in range(2 if replayable else 1):
+            conn = self._connection()
+            try:
+                if attempt and rewind is not None:
+                    body.seek(rewind)
+                self._send(conn, method, path, headers, body)
+                response = conn.getresponse()
+                payload = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionError, BrokenPipeError):
+                conn.close()
+                self._local.conn = None
+                if attempt or not replayable:
+                    raise
+
+        if response.status == 304 and cached is not None:
+            with self._cache_lock:
+                self._cache.move_to_end(path)
+            return cached[1]
+        if response.getheader('Content-Encoding') == 'gzip':
+            payload = gzip.decompress(payload)
+        if response.status != 200:
+            message = payload.decode('utf-8', errors='replace')
+            try:
+                message = json.loads(message).get('error', message)
+            except ValueError:
+                pass
+            if response.status == 404:
+                raise KeyError(message)
+            if response.status == 400:
+                raise ValueError(message)
+            raise RuntimeError(f"{method} {path} failed with {response.status}: {message}")
+
+        etag = response.getheader('ETag')
+        if method == 'GET' and etag:
+            with self._cache_lock:
+                self._cache[path] = (etag, payload)
+                self._cache.move_to_end(path)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return payload
+
+    def _get_json(self, path: str) -> Any:
+        return json.loads(self._request('GET', path))
+
+    def _post_json(self, path: str, payload: Any) -> Any:
+        return json.loads(self._request('POST', path, json.dumps(payload).encode('utf-8')))
+
+    def get_num_jobs(self) -> int:
+        """Returns the total number of jobs in the dataset."""
+        return self._get_json('/jobs/count')['count']
+
+    def _get_page(self, offset: int, limit: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        query = {'offset': offset, 'limit': limit}
+        if columns is not None:
+            query['columns'] = ','.join(columns)
+        page = self._get_json('/jobs?' + urlencode(query))
+        return pd.DataFrame(page['columns'])
+
+    def iter_jobs(self, batch_size: int = 1000, columns: Optional[List[str]] = None,
+                  where: Optional[Mapping[str, Any]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Page through the jobs in batches, with the same interface as AgentArenaData.iter_jobs.
+
+        Predicates are applied to each page on the client, so callables are supported.
+
+        Yields:
+            pd.DataFrame: Batches of at most batch_size matching rows
+        """
+        fetch = None
+        if columns is not None:
+            fetch = list(dict.fromkeys(list(columns) + list(where or {})))
+        offset = 0
+        while True:
+            batch = self._get_page(offset, batch_size, fetch)
+            if batch.empty:
+                return
+            offset += len(batch)
+            if where:
+                batch = batch[where_mask(batch, where)]
+            if columns is not None:
+                batch = batch[list(columns)]
+            if len(batch):
+                yield batch
+
+    def get_jobs_metadata(self) -> Mapping[int, JobMetadata]:
+        """Returns a mapping of job IDs to their metadata, fetched page by page and cached."""
+        if self._metadata is None:
+            metadata = {}
+            for batch in self.iter_jobs(batch_size=5000, columns=['ID'] + METADATA_COLUMNS):
+                records = map(JobMetadata._make, zip(*(batch[col].tolist() for col in METADATA_COLUMNS)))
+                metadata.update(zip(batch['ID'].tolist(), records))
+            self._metadata = metadata
+        return self._metadata
+
+    def get_job_metadata(self, job_id: int) -> JobMetadata:
+        """
+        Returns the metadata for a specific job ID.
+
+        Raises:
+            KeyError: If the job_id is not found in the dataset
+        """
+        record = self._get_json(f'/jobs/{int(job_id)}')
+        budget = record['budget']
+        return JobMetadata(record['title'], record['sector'], record['skills'], record['experience_level'],
+                           math.nan if budget is None else budget, record['country'])
+
+    def get_job_description(self, job_id: int) -> str:
+        """
+        Returns the description for a specific job ID.
+
+        Raises:
+            KeyError: If the job_id is not found in the dataset
+        """
+        return self._request('GET', f'/jobs/{int(job_id)}/description').decode('utf-8')
+
+    def get_job_descriptions(self, job_ids: Iterable[int]) -> List[str]:
+        """
+        Returns the descriptions for many job IDs in one request.
+
+        Raises:
+            KeyError: If any of the job_ids is not found in the dataset
+        """
+        return self._post_json('/jobs/descriptions', {'ids': [int(job_id) for job_id in job_ids]})['descriptions']
+
+    def query(self, where: Optional[Mapping[str, Any]] = None, offset: int = 0,
+              limit: Optional[int] = None) -> List[int]:
+        """Returns the IDs of jobs matching a where-spec, see AgentArenaData.query."""
+        return self._post_json('/query', {'where': encode_where(where), 'offset': offset, 'limit': limit})['ids']
+
+    def count_jobs(self, where: Optional[Mapping[str, Any]] = None) -> int:
+        """Returns the number of jobs matching a where-spec."""
+        return self._post_json('/query', {'where': encode_where(where), 'offset': 0, 'limit': 0})['total']
+
+    def search(self, text: str, k: int = 10) -> List[Tuple[int, float]]:
+        """Returns (job ID, score) pairs best matching free text, see AgentArenaData.search."""
+        results = self._get_json('/search?' + urlencode({'q': text, 'k': k}))['results']
+        return [(job_id, score) for job_id, score in results]
+
+    def submit_job(self, save_dir: str, model_name: str, job_id: int, output: SubmissionOutput) -> str:
+        """
+        Uploads the model's output for a specific job.
+
+        Args:
+            save_dir (str): Directory, relative to the server's output root, to save into
+            model_name (str): Name of the model that generated the output
+            job_id (int): ID of the job
+            output (SubmissionOutput): The output to save, see AgentArenaData.submit_job
+
+        Local files are sent with sendfile and file objects and iterables chunk by chunk,
+        so large outputs are never held in memory on either side.
+
+        Returns:
+            str: Path the server saved the output to
+
+        Raises:
+            KeyError: If the job_id is not found in the dataset
+        """
+        path = f"/submissions/{quote(model_name, safe='')}/{int(job_id)}?" + urlencode({'save_dir': save_dir})
+        if isinstance(output, os.PathLike):
+            with open(output, 'rb') as f:
+                return json.loads(self._request('POST', path, f, 'application/octet-stream'))['path']
+        if isinstance(output, str):
+            output = output.encode('utf-8')
+        elif isinstance(output, (bytearray, memoryview)):
+            output = bytes(output)
+        return json.loads(self._request('POST', path, output, 'application/octet-stream'))['path']
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -1,16 +1,208 @@
 import pandas as pd
-from typing import Dict, Tuple
+import numpy as np
+from types import MappingProxyType
+from typing import Any, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
 import os
+import threading
+from api.index import JobIndex
+from api.search import JobSearchIndex, SEARCH_COLUMNS, search_index_path_for
+from api.store import JobStore, STORE_SUFFIX, is_store_current, store_path_for
+from api.submissions import SUBMISSION_BACKENDS, SubmissionOutput, open_submission_store
+
+# Columns exposed by get_jobs_metadata, in tuple order
+METADATA_COLUMNS = ['TITLE', 'SECTOR', 'SKILLS_AND_EXPERTISE', 'EXPERIENCE_LEVEL', 'BUDGET', 'COUNTRY']
+
+# Derived column holding each description's length in UTF-8 bytes, which the job
+# store reads from its offsets without decoding the text
+DESCRIPTION_LENGTH = 'DESCRIPTION_LENGTH'
+
+def text_lengths(values: pd.Series) -> np.ndarray:
+    """UTF-8 byte lengths of text values, with 0 for missing ones; the unit of DESCRIPTION_LENGTH."""
+    return values.fillna('').astype(str).str.encode('utf-8').str.len().to_numpy(dtype=np.int64)
+
+class JobMetadata(NamedTuple):
+    """Immutable metadata record for a job; unpacks like the original 6-tuple."""
+    title: str
+    sector: str
+    skills: str
+    experience_level: str
+    budget: float
+    country: str
+
+def where_mask(df: pd.DataFrame, where: Optional[Mapping[str, Any]]) -> np.ndarray:
+    """
+    Evaluate a where-spec against a DataFrame and return a boolean row mask.
+    
+    Each key is a column name and each value is one of:
+        - a 2-tuple (low, high): inclusive range, with None for an open end
+        - a list, set or frozenset: membership test
+        - a callable: called with the column Series, must return a boolean mask
+        - any other value: equality test
+    All predicates must hold for a row to be kept.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, predicate in (where or {}).items():
+        values = df[column]
+        if callable(predicate):
+            matched = predicate(values)
+        elif isinstance(predicate, tuple) and len(predicate) == 2:
+            low, high = predicate
+            matched = values.notna()
+            if low is not None:
+                matched &= values >= low
+            if high is not None:
+                matched &= values <= high
+        elif isinstance(predicate, (list, set, frozenset)):
+            matched = values.isin(list(predicate))
+        else:
+            matched = values == predicate
+        mask &= np.asarray(matched, dtype=bool)
+    return mask
+
+def iter_jobs(csv_path: str, batch_size: int = 1000, columns: Optional[List[str]] = None,
+              where: Optional[Mapping[str, Any]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream jobs from a CSV file in bounded batches without loading the whole file.
+    
+    Only the requested columns (plus any used by predicates) are parsed, and the
+    predicates are applied to each chunk before it is yielded, so peak memory is
+    bounded by batch_size regardless of file size.
+    
+    Args:
+        csv_path (str): Path to the CSV file
+        batch_size (int): Number of rows read per chunk
+        columns (List[str], optional): Columns to yield. If None, all columns are yielded.
+            May include DESCRIPTION_LENGTH, which is derived from DESCRIPTION.
+        where (Mapping[str, Any], optional): Column predicates, e.g.
+            {'SECTOR': 'Web Development', 'BUDGET': (500, 2000), 'EXPERIENCE_LEVEL': ['Expert']}
+            
+    Yields:
+        pd.DataFrame: Batches of at most batch_size matching rows
+    """
+    usecols = None
+    derive_length = columns is not None and DESCRIPTION_LENGTH in columns
+    if columns is not None:
+        read = [('DESCRIPTION' if col == DESCRIPTION_LENGTH else col) for col in columns]
+        usecols = list(dict.fromkeys(read + list(where or {})))
+    for chunk in pd.read_csv(csv_path, chunksize=batch_size, usecols=usecols):
+        if where:
+            chunk = chunk[where_mask(chunk, where)]
+        if derive_length:
+            chunk = chunk.assign(**{DESCRIPTION_LENGTH: text_lengths(chunk['DESCRIPTION'])})
+        if columns is not None:
+            chunk = chunk[list(columns)]
+        if len(chunk):
+            yield chunk
 
 class AgentArenaData:
-    def __init__(self, csv_path: str):
+    def __init__(self, csv_path: str, use_store: bool = True, submission_backend: str = 'files'):
         """
         Initialize AgentArenaData with a CSV file path.
         
+        If an up-to-date job store (see api.store) sits next to the CSV, or csv_path
+        points at a .arena store directly, the data is opened via mmap instead: startup
+        skips CSV parsing and descriptions are only read from the mapping on access.
+        Otherwise the CSV is loaded with pandas as before.
+        
         Args:
-            csv_path (str): Path to the CSV file containing job data
+            csv_path (str): Path to the CSV file (or .arena job store) containing job data
+            use_store (bool): Whether to use a job store next to the CSV when one is current
+            submission_backend (str): How submit_job stores outputs: 'files' for one file per
+                submission, or 'segments' for append-only packed segments (see api.submissions)
         """
-        self.df = pd.read_csv(csv_path)
+        if submission_backend not in SUBMISSION_BACKENDS:
+            raise ValueError(f"Unknown submission backend {submission_backend}; expected one of {sorted(SUBMISSION_BACKENDS)}")
+        self.csv_path = csv_path
+        self.submission_backend = submission_backend
+        self._submission_stores = {}
+        self._submission_lock = threading.Lock()
+        self._search_lock = threading.Lock()
+        self._store: Optional[JobStore] = None
+        # Incremented whenever the jobs change, so caches keyed on it go stale
+        self.generation = 0
+        store_path = csv_path if csv_path.endswith(STORE_SUFFIX) else store_path_for(csv_path)
+        if csv_path.endswith(STORE_SUFFIX) or (use_store and is_store_current(store_path, csv_path)):
+            self._store = JobStore(store_path)
+            # Frame is indexed by store row so descriptions can be located after filtering
+            self.df = self._store.to_frame()
+        else:
+            self.df = pd.read_csv(csv_path)
+    
+    @property
+    def df(self) -> pd.DataFrame:
+        """The underlying job DataFrame."""
+        return self._df
+    
+    @df.setter
+    def df(self, df: pd.DataFrame) -> None:
+        # Reassigning the DataFrame rebuilds the ID index and drops cached
+        # metadata so lookups never go stale
+        self._df = df
+        self.generation += 1
+        self._build_index()
+        self._metadata_columns: Optional[List[list]] = None
+        self._metadata: Optional[Mapping[int, JobMetadata]] = None
+        self._search_index: Optional[JobSearchIndex] = None
+    
+    def _build_index(self) -> None:
+        """
+        Build the primary-key index mapping job IDs to row positions, and the
+        secondary indexes over job attributes used by query.
+        
+        Duplicate IDs resolve to their first occurrence, matching the previous
+        `self.df[self.df['ID'] == job_id].iloc[0]` behaviour.
+        """
+        ids = self._df['ID']
+        first = ~ids.duplicated(keep='first').to_numpy()
+        self._id_index = pd.Index(ids.to_numpy()[first])
+        self._id_positions = np.flatnonzero(first)
+        self._job_index = JobIndex(self._df, self._id_positions)
+    
+    def _row_position(self, job_id: int) -> int:
+        """
+        Returns the row position of a job ID in O(1).
+        
+        Raises:
+            KeyError: If the job_id is not found in the dataset
+        """
+        try:
+            loc = self._id_index.get_loc(job_id)
+        except (KeyError, TypeError):
+            raise KeyError(f"Job ID {job_id} not found in the dataset") from None
+        return int(self._id_positions[loc])
+    
+    def _row_positions(self, job_ids: Iterable[int]) -> np.ndarray:
+        """
+        Returns the row positions of many job IDs in one vectorized lookup.
+        
+        Raises:
+            KeyError: If any of the job_ids is not found in the dataset
+        """
+        job_ids = list(job_ids)
+        if not job_ids:
+            return np.empty(0, dtype=np.intp)
+        locs = self._id_index.get_indexer(job_ids)
+        missing = locs < 0
+        if missing.any():
+            missing_ids = [job_ids[i] for i in np.flatnonzero(missing)]
+            raise KeyError(f"Job IDs {missing_ids} not found in the dataset")
+        return self._id_positions[locs]
+    
+    def has_job(self, job_id: int) -> bool:
+        """
+        Returns whether a job ID exists in the dataset.
+        
+        Args:
+            job_id (int): The ID of the job
+            
+        Returns:
+            bool: True if the job exists
+        """
+        try:
+            self._row_position(job_id)
+        except KeyError:
+            return False
+        return True
     
     def get_num_jobs(self) -> int:
         """
@@ -21,25 +213,174 @@ class AgentArenaData:
         """
         return len(self.df)
     
-    def get_jobs_metadata(self) -> Dict[int, Tuple[str, str, str, str, float, str]]:
+    def _get_metadata_columns(self) -> List[list]:
+        """Returns the metadata columns as Python lists, converted once and cached."""
+        if self._metadata_columns is None:
+            self._metadata_columns = [self.df[col].tolist() for col in METADATA_COLUMNS]
+        return self._metadata_columns
+    
+    def get_jobs_metadata(self) -> Mapping[int, JobMetadata]:
         """
-        Returns a dictionary mapping job IDs to their metadata.
+        Returns a mapping of job IDs to their metadata.
+        
+        The mapping is built once with column-wise operations and cached until
+        the DataFrame is reassigned. It is read-only since it is shared between callers.
         
         Returns:
-            Dict[int, Tuple[str, str, str, str, float, str]]: Dictionary with ID as key and
+            Mapping[int, JobMetadata]: Mapping with ID as key and
                 (TITLE, SECTOR, SKILLS_AND_EXPERTISE, EXPERIENCE_LEVEL, BUDGET, COUNTRY) as value
         """
-        metadata_dict = {}
-        for _, row in self.df.iterrows():
-            metadata_dict[row['ID']] = (
-                row['TITLE'],
-                row['SECTOR'],
-                row['SKILLS_AND_EXPERTISE'],
-                row['EXPERIENCE_LEVEL'],
-                row['BUDGET'],
-                row['COUNTRY']
-            )
-        return metadata_dict
+        if self._metadata is None:
+            records = map(JobMetadata._make, zip(*self._get_metadata_columns()))
+            self._metadata = MappingProxyType(dict(zip(self.df['ID'].tolist(), records)))
+        return self._metadata
+    
+    def get_job_metadata(self, job_id: int) -> JobMetadata:
+        """
+        Returns the metadata for a specific job ID without building the full mapping.
+        
+        Args:
+            job_id (int): The ID of the job
+            
+        Returns:
+            JobMetadata: (TITLE, SECTOR, SKILLS_AND_EXPERTISE, EXPERIENCE_LEVEL, BUDGET, COUNTRY)
+            
+        Raises:
+            KeyError: If the job_id is not found in the dataset
+        """
+        position = self._row_position(job_id)
+        return JobMetadata._make(col[position] for col in self._get_metadata_columns())
+    
+    def _descriptions_at(self, positions: Iterable[int]) -> List[str]:
+        """Returns descriptions at row positions, from the DataFrame or the mmap job store."""
+        if 'DESCRIPTION' in self.df.columns or self._store is None:
+            return self.df['DESCRIPTION'].to_numpy()[np.asarray(positions, dtype=np.intp)].tolist()
+        store_rows = self.df.index.to_numpy()[np.asarray(positions, dtype=np.intp)]
+        return self._store.texts('DESCRIPTION', store_rows)
+    
+    def _description_lengths_at(self, positions: Iterable[int]) -> np.ndarray:
+        """Returns description lengths in UTF-8 bytes at row positions, from the job store's offsets if there is one."""
+        positions = np.asarray(positions, dtype=np.intp)
+        if 'DESCRIPTION' in self.df.columns or self._store is None:
+            return text_lengths(self.df['DESCRIPTION'].iloc[positions])
+        return self._store.text_lengths('DESCRIPTION', self.df.index.to_numpy()[positions])
+    
+    def query(self, where: Optional[Mapping[str, Any]] = None, offset: int = 0,
+              limit: Optional[int] = None) -> List[int]:
+        """
+        Returns the IDs of jobs matching a where-spec, in dataset order, without a table scan.
+        
+        Predicates on SECTOR, EXPERIENCE_LEVEL, COUNTRY and LANGUAGE use posting lists and
+        predicates on BUDGET, HOURLY_LOW, HOURLY_HIGH and POST_DATE use sorted arrays.
+        Any other predicate is only evaluated on the rows the indexes already matched.
+        
+        Args:
+            where (Mapping[str, Any], optional): Column predicates, see iter_jobs, e.g.
+                {'EXPERIENCE_LEVEL': 'Expert', 'SECTOR': 'Web Development', 'BUDGET': (500, 2000)}
+            offset (int): Number of matching jobs to skip, for pagination
+            limit (int, optional): Maximum number of job IDs to return. If None, returns all.
+            
+        Returns:
+            List[int]: Matching job IDs
+        """
+        positions = self._job_index.find(where, fallback=where_mask)
+        stop = None if limit is None else offset + limit
+        return self._job_index.ids(positions[offset:stop])
+    
+    def count_jobs(self, where: Optional[Mapping[str, Any]] = None) -> int:
+        """
+        Returns the number of jobs matching a where-spec, see query.
+        
+        Args:
+            where (Mapping[str, Any], optional): Column predicates
+            
+        Returns:
+            int: Number of matching jobs
+        """
+        return len(self._job_index.find(where, fallback=where_mask))
+    
+    def _get_search_index(self) -> JobSearchIndex:
+        """
+        Returns the full-text index, loading it from next to the dataset or building
+        and persisting it on first use.
+        """
+        if self._search_index is not None:
+            return self._search_index
+        with self._search_lock:
+            # Concurrent first searches wait for one build instead of each building the index
+            if self._search_index is None:
+                self._search_index = self._load_or_build_search_index()
+            return self._search_index
+    
+    def _load_or_build_search_index(self) -> JobSearchIndex:
+        job_ids = self.df['ID'].to_numpy()[self._id_positions]
+        index_path = search_index_path_for(self.csv_path)
+        if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(self.csv_path):
+            index = JobSearchIndex.load(index_path)
+            if np.array_equal(index.job_ids, job_ids):
+                return index
+        
+        index = JobSearchIndex.build(job_ids, self._search_texts(self._id_positions))
+        try:
+            index.save(index_path)
+        except OSError as e:
+            print(f"Could not save search index to {index_path}: {e}")
+        return index
+    
+    def _search_texts(self, positions: np.ndarray) -> List[str]:
+        """Returns the concatenated TITLE, DESCRIPTION and SKILLS_AND_EXPERTISE text at row positions."""
+        columns = []
+        for col in SEARCH_COLUMNS:
+            if col == 'DESCRIPTION':
+                columns.append(self._descriptions_at(positions))
+            elif col in self.df.columns:
+                columns.append(self.df[col].to_numpy()[positions].tolist())
+        return [' '.join(part for part in parts if isinstance(part, str)) for parts in zip(*columns)]
+    
+    def search(self, text: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Returns the jobs whose title, description and skills best match free text.
+        
+        Runs fully offline against a BM25 index that is built once and saved next to
+        the dataset (see api.search).
+        
+        Args:
+            text (str): Query text, e.g. an agent's skills
+            k (int): Maximum number of results
+            
+        Returns:
+            List[Tuple[int, float]]: (job ID, score) pairs, best first
+        """
+        return self._get_search_index().search(text, k)
+    
+    def add_jobs(self, jobs: pd.DataFrame) -> None:
+        """
+        Append new jobs to the in-memory dataset.
+        
+        The lookup indexes are rebuilt and, if the search index is loaded, only the
+        new jobs are tokenized and merged into it. Neither the dataset file nor the
+        search index saved next to it is changed, so the added jobs are gone once the
+        dataset is reloaded; add them to the CSV to keep them.
+        
+        Args:
+            jobs (pd.DataFrame): New jobs with the same columns as the dataset
+            
+        Raises:
+            ValueError: If a job ID already exists, or the data is backed by a read-only job store
+        """
+        if self._store is not None:
+            raise ValueError("Cannot add jobs to a read-only job store; convert the updated CSV with api.store instead")
+        existing = [job_id for job_id in jobs['ID'].tolist() if self.has_job(job_id)]
+        if existing:
+            raise ValueError(f"Job IDs {existing} already exist in the dataset")
+        
+        search_index = self._search_index
+        num_rows = len(self.df)
+        self.df = pd.concat([self.df, jobs], ignore_index=True)
+        if search_index is not None:
+            new_positions = self._id_positions[self._id_positions >= num_rows]
+            search_index.add_documents(self.df['ID'].to_numpy()[new_positions], self._search_texts(new_positions))
+            self._search_index = search_index
     
     def get_job_description(self, job_id: int) -> str:
         """
@@ -54,43 +395,116 @@ class AgentArenaData:
         Raises:
             KeyError: If the job_id is not found in the dataset
         """
-        job = self.df[self.df['ID'] == job_id]
-        if job.empty:
-            raise KeyError(f"Job ID {job_id} not found in the dataset")
-        return job.iloc[0]['DESCRIPTION']
+        return self._descriptions_at([self._row_position(job_id)])[0]
     
-    def submit_job(self, save_dir: str, model_name: str, job_id: int, output: str) -> str:
+    def get_job_descriptions(self, job_ids: Iterable[int]) -> List[str]:
         """
-        Saves the model's output for a specific job to a text file.
+        Returns the descriptions for many job IDs in one vectorized lookup.
+        
+        Args:
+            job_ids (Iterable[int]): The IDs of the jobs
+            
+        Returns:
+            List[str]: The job descriptions, in the same order as job_ids
+            
+        Raises:
+            KeyError: If any of the job_ids is not found in the dataset
+        """
+        return self._descriptions_at(self._row_positions(job_ids))
+    
+    def _frame_at(self, positions: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the rows at positions, decoding DESCRIPTION from the job store only if
+        requested. DESCRIPTION_LENGTH may also be requested; it is read from the store's
+        offsets, so ranking jobs by prompt size never decodes their text.
+        """
+        frame_columns = list(self.df.columns)
+        if columns is None:
+            columns = frame_columns + ([] if 'DESCRIPTION' in frame_columns else ['DESCRIPTION'])
+        selected = [col for col in columns if col in frame_columns]
+        frame = self.df.iloc[positions][selected]
+        if 'DESCRIPTION' in columns and 'DESCRIPTION' not in frame_columns:
+            frame = frame.assign(DESCRIPTION=self._descriptions_at(positions))
+        if DESCRIPTION_LENGTH in columns and DESCRIPTION_LENGTH not in frame_columns:
+            frame = frame.assign(**{DESCRIPTION_LENGTH: self._description_lengths_at(positions)})
+        return frame[[col for col in columns if col in frame.columns]]
+    
+    def get_jobs(self, job_ids: Iterable[int], columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the rows for many job IDs in one vectorized lookup.
+        
+        Args:
+            job_ids (Iterable[int]): The IDs of the jobs
+            columns (List[str], optional): Columns to return. If None, all columns are returned.
+            
+        Returns:
+            pd.DataFrame: One row per job ID, in the same order as job_ids
+            
+        Raises:
+            KeyError: If any of the job_ids is not found in the dataset
+        """
+        return self._frame_at(self._row_positions(job_ids), columns)
+    
+    def iter_jobs(self, batch_size: int = 1000, columns: Optional[List[str]] = None,
+                  where: Optional[Mapping[str, Any]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Iterate over the loaded jobs in batches, with the same interface as the
+        module-level iter_jobs so agents can consume either source.
+        
+        Args:
+            batch_size (int): Number of rows per batch before filtering
+            columns (List[str], optional): Columns to yield. If None, all columns are yielded.
+            where (Mapping[str, Any], optional): Column predicates, see iter_jobs
+            
+        Yields:
+            pd.DataFrame: Batches of at most batch_size matching rows
+        """
+        for start in range(0, len(self.df), batch_size):
+            chunk = self.df.iloc[start:start + batch_size]
+            positions = np.flatnonzero(where_mask(chunk, where)) + start
+            if len(positions):
+                yield self._frame_at(positions, columns)
+    
+    def _get_submission_store(self, save_dir: str):
+        """Returns the submission store for a directory, opening it on first use."""
+        with self._submission_lock:
+            if save_dir not in self._submission_stores:
+                self._submission_stores[save_dir] = open_submission_store(save_dir, self.submission_backend)
+            return self._submission_stores[save_dir]
+    
+    def submit_job(self, save_dir: str, model_name: str, job_id: int, output: SubmissionOutput) -> str:
+        """
+        Saves the model's output for a specific job using the configured submission backend.
+        
+        With the 'files' backend the output is saved to save_dir/output_{model}_{jobID}.txt;
+        with 'segments' it is appended to packed segment files under save_dir/segments.
+        Either way the size and SHA-256 of the content are recorded with the submission.
         
         Args:
             save_dir (str): Directory to save the output file
             model_name (str): Name of the model that generated the output
             job_id (int): ID of the job
-            output (str): The output text to save
+            output (SubmissionOutput): The output to save: text (str), bytes, a local file
+                (os.PathLike, copied in the kernel), a binary file object, or an iterable
+                of str/bytes chunks, which are written as they arrive
             
         Returns:
-            str: Path to the saved file
+            str: Path to the saved file, or segment_path#offset for the 'segments' backend
             
         Raises:
             KeyError: If the job_id is not found in the dataset
         """
         # Verify job exists
-        if job_id not in self.df['ID'].values:
-            raise KeyError(f"Job ID {job_id} not found in the dataset")
-        
-        # Create save directory if it doesn't exist
-        os.makedirs(save_dir, exist_ok=True)
+        self._row_position(job_id)
         
-        # Create filename in format: output_model_jobID.txt
-        filename = f"output_{model_name}_{job_id}.txt"
-        filepath = os.path.join(save_dir, filename)
-        
-        # Save the output
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(output)
-            
-        return filepath
+        return self._get_submission_store(save_dir).write(model_name, job_id, output)
+    
+    def close(self) -> None:
+        """Flush and close any open submission stores."""
+        with self._submission_lock:
+            for store in self._submission_stores.values():
+                store.close()
+            self._submission_stores.clear()
 
 # Example usage:
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+# Columns indexed with one posting list (sorted row positions) per distinct value
+CATEGORICAL_INDEX_COLUMNS = ['SECTOR', 'EXPERIENCE_LEVEL', 'COUNTRY', 'LANGUAGE']
+
+# Columns indexed with their values sorted alongside the matching row positions
+RANGE_INDEX_COLUMNS = ['BUDGET', 'HOURLY_LOW', 'HOURLY_HIGH', 'POST_DATE']
+
+# Columns whose values are timestamps; bounds are converted with pd.Timestamp
+_DATETIME_COLUMNS = {'POST_DATE'}
+
+class JobIndex:
+    def __init__(self, df: pd.DataFrame, primary_positions: np.ndarray):
+        """
+        Build secondary indexes over the job attributes of a DataFrame.
+
+        Args:
+            df (pd.DataFrame): The job data
+            primary_positions (np.ndarray): Sorted row positions that are the first
+                occurrence of their job ID; only these rows are returned by queries
+        """
+        self._df = df
+        self._ids = df['ID'].to_numpy()
+        self._primary_positions = primary_positions
+        self._is_primary = np.zeros(len(df), dtype=bool)
+        self._is_primary[primary_positions] = True
+
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {}
+        for column in CATEGORICAL_INDEX_COLUMNS:
+            if column in df.columns:
+                self._postings[column] = self._build_postings(df[column])
+
+        self._ranges: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for column in RANGE_INDEX_COLUMNS:
+            if column in df.columns:
+                self._ranges[column] = self._build_range(column, df[column])
+
+    @staticmethod
+    def _build_postings(values: pd.Series) -> Dict[Any, np.ndarray]:
+        """Group row positions by value in one sort; missing values are not indexed."""
+        codes, uniques = pd.factorize(values)
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        # Rows with missing values have code -1 and sort first, so skip past them
+        splits = np.split(order[np.count_nonzero(codes < 0):], np.cumsum(counts)[:-1])
+        return dict(zip(uniques.tolist(), splits))
+
+    @staticmethod
+    def _range_values(column: str, values: pd.Series) -> np.ndarray:
+        if column in _DATETIME_COLUMNS:
+            timestamps = pd.to_datetime(values, errors='coerce')
+            return np.where(timestamps.isna(), np.nan, timestamps.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64))
+        return pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+
+    def _build_range(self, column: str, values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """Sort non-missing values once, keeping the row position of each."""
+        numeric = self._range_values(column, values)
+        positions = np.flatnonzero(~np.isnan(numeric))
+        order = np.argsort(numeric[positions], kind='stable')
+        return numeric[positions][order], positions[order]
+
+    def _bound(self, column: str, value: Any) -> float:
+        if column in _DATETIME_COLUMNS:
+            return float(pd.Timestamp(value).value)
+        return float(value)
+
+    def _lookup(self, column: str, predicate: Any) -> Optional[np.ndarray]:
+        """
+        Resolve a single predicate against an index.
+
+        Returns:
+            Optional[np.ndarray]: Sorted matching row positions, or None if the
+                predicate cannot be answered from an index
+        """
+        if callable(predicate):
+            return None
+
+        if column in self._postings:
+            postings = self._postings[column]
+            if isinstance(predicate, (list, set, frozenset)):
+                lists = [postings[value] for value in predicate if value in postings]
+                return np.unique(np.concatenate(lists)) if lists else np.empty(0, dtype=np.intp)
+            if isinstance(predicate, tuple):
+                return None
+            return postings.get(predicate, np.empty(0, dtype=np.intp))
+
+        if column in self._ranges:
+            sorted_values, positions = self._ranges[column]
+            if isinstance(predicate, tuple) and len(predicate) == 2:
+                low, high = predicate
+            elif isinstance(predicate, (list, set, frozenset)):
+                return None
+            else:
+                low = high = predicate
+            start = 0 if low is None else np.searchsorted(sorted_values, self._bound(column, low), side='left')
+            stop = len(sorted_values) if high is None else np.searchsorted(sorted_values, self._bound(column, high), side='right')
+            return np.sort(positions[start:stop])
+
+        return None
+
+    def find(self, where: Optional[Mapping[str, Any]] = None,
+             fallback: Optional[Callable[[pd.DataFrame, Mapping[str, Any]], np.ndarray]] = None) -> np.ndarray:
+        """
+        Returns the sorted row positions matching every predicate in a where-spec.
+
+        Indexed predicates are resolved from posting lists and sorted arrays and
+        intersected smallest-first. Predicates that cannot use an index are applied
+        with fallback to the surviving candidate rows only.
+
+        Args:
+            where (Mapping[str, Any], optional): Column predicates, see api.data.iter_jobs
+            fallback (Callable, optional): Function evaluating a where-spec on a DataFrame
+                and returning a boolean mask
+
+        Returns:
+            np.ndarray: Sorted row positions of matching jobs
+        """
+        candidates: List[np.ndarray] = []
+        residual = {}
+        for column, predicate in (where or {}).items():
+            matched = self._lookup(column, predicate)
+            if matched is None:
+                residual[column] = predicate
+            else:
+                candidates.append(matched)
+
+        if candidates:
+            candidates.sort(key=len)
+            positions = candidates[0]
+            for other in candidates[1:]:
+                if not len(positions):
+                    break
+                positions = np.intersect1d(positions, other, assume_unique=True)
+            positions = positions[self._is_primary[positions]]
+        else:
+            positions = self._primary_positions
+
+        if residual:
+            if fallback is None:
+                raise ValueError(f"No index for predicates on {sorted(residual)}")
+            positions = positions[fallback(self._df.iloc[positions], residual)]
+        return positions
+
+    def ids(self, positions: np.ndarray) -> List[int]:
+        """Returns the job IDs at the given row positions."""
+        return self._ids[positions].tolist()
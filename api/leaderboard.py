@@ -0,0 +1,206 @@
+import argparse
+import time
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from api.data import AgentArenaData
+from api.results import DEFAULT_RESULTS_PATH, ResultsStore
+
+# Columns looked up for every graded job
+JOB_COLUMNS = ['ID', 'SECTOR', 'BUDGET', 'HOURLY_LOW', 'HOURLY_HIGH']
+
+def _numeric(jobs: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in jobs.columns:
+        return np.full(len(jobs), np.nan)
+    return pd.to_numeric(jobs[name], errors='coerce').to_numpy(dtype=np.float64)
+
+def job_value(jobs: pd.DataFrame, hourly_hours: float = 10.0) -> np.ndarray:
+    """
+    Payout of each job if won: its BUDGET, or for hourly jobs the mean of
+    HOURLY_LOW and HOURLY_HIGH (or whichever is set) times hourly_hours.
+    Jobs with neither are worth 0.
+    """
+    budget = _numeric(jobs, 'BUDGET')
+    low, high = _numeric(jobs, 'HOURLY_LOW'), _numeric(jobs, 'HOURLY_HIGH')
+    hourly = np.where(np.isnan(high), low, np.where(np.isnan(low), high, (low + high) / 2))
+    value = np.where(budget > 0, budget, hourly * hourly_hours)
+    return np.nan_to_num(value, nan=0.0)
+
+# Largest sample resampled exactly; larger ones use the Poisson bootstrap
+MAX_EXACT_BOOTSTRAP = 10_000
+
+def bootstrap_sum(values: np.ndarray, n_boot: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Bootstrap distribution of the sum of values.
+
+    Resampling n values with replacement is the same as drawing how many times each
+    distinct value is picked from a multinomial, so each resample costs O(distinct
+    values) rather than O(n). Past MAX_EXACT_BOOTSTRAP values, each distinct value is
+    instead picked a Poisson number of times with mean its count (the Poisson
+    bootstrap), which is indistinguishable at that size and much faster to draw.
+
+    Returns:
+        np.ndarray: n_boot resampled sums
+    """
+    if len(values) == 0:
+        return np.zeros(n_boot)
+    distinct, counts = np.unique(values, return_counts=True)
+    if len(distinct) == 1:
+        return np.full(n_boot, distinct[0] * len(values))
+    if len(values) <= MAX_EXACT_BOOTSTRAP:
+        picks = rng.multinomial(len(values), counts / len(values), size=n_boot)
+    else:
+        picks = rng.poisson(counts, size=(n_boot, len(distinct)))
+    return picks @ distinct
+
+class Leaderboard:
+    def __init__(self, store: ResultsStore, data: AgentArenaData, n_boot: int = 2000, seed: int = 0,
+                 hourly_hours: float = 10.0, confidence: float = 0.95):
+        """
+        Win rates and earnings per model, with bootstrap confidence intervals.
+
+        Verdicts are read from a ResultsStore and kept in memory with each job's SECTOR
+        and value. refresh only reads verdicts added or changed since the last refresh
+        and looks up only jobs not seen before, so it can be called after every grading
+        run. Tables are computed with grouped column operations, and the intervals use
+        bootstrap_sum, so millions of verdicts take seconds.
+
+        Args:
+            store (ResultsStore): Verdicts to rank
+            data (AgentArenaData): Jobs, for SECTOR, BUDGET and hourly rates
+            n_boot (int): Bootstrap resamples per interval
+            seed (int): Seed of the resampling
+            hourly_hours (float): Hours assumed when valuing hourly jobs
+            confidence (float): Coverage of the intervals
+        """
+        self.store = store
+        self.data = data
+        self.n_boot = n_boot
+        self.seed = seed
+        self.hourly_hours = hourly_hours
+        self.confidence = confidence
+        self.seq = 0
+        self.verdicts = pd.DataFrame(columns=['run', 'model', 'job_id', 'win', 'verifier'])
+        self.jobs = pd.DataFrame({'SECTOR': pd.Series(dtype=object), 'value': pd.Series(dtype=np.float64)},
+                                 index=pd.Index([], dtype=np.int64, name='job_id'))
+
+    def refresh(self) -> int:
+        """
+        Read verdicts added or changed since the last refresh.
+
+        Returns:
+            int: Number of verdicts read
+        """
+        new, self.seq = self.store.read(since=self.seq)
+        if new.empty:
+            return 0
+        new = new[['run', 'model', 'job_id', 'win', 'verifier']]
+        if self.verdicts.empty:
+            self.verdicts = new.reset_index(drop=True)
+        else:
+            # A changed verdict replaces the one read before
+            combined = pd.concat([self.verdicts, new], ignore_index=True)
+            self.verdicts = combined.drop_duplicates(['run', 'model', 'job_id'], keep='last').reset_index(drop=True)
+
+        unseen = np.setdiff1d(new['job_id'].unique(), self.jobs.index.to_numpy())
+        unseen = [job_id for job_id in unseen.tolist() if self.data.has_job(job_id)]
+        if unseen:
+            jobs = self.data.get_jobs(unseen, columns=JOB_COLUMNS)
+            found = pd.DataFrame({'SECTOR': jobs['SECTOR'].to_numpy(),
+                                  'value': job_value(jobs, self.hourly_hours)},
+                                 index=pd.Index(jobs['ID'].to_numpy(dtype=np.int64), name='job_id'))
+            self.jobs = pd.concat([self.jobs, found]) if len(self.jobs) else found
+        return len(new)
+
+    def _interval(self, samples: np.ndarray) -> Tuple[float, float]:
+        tail = (1 - self.confidence) / 2 * 100
+        low, high = np.percentile(samples, [tail, 100 - tail])
+        return float(low), float(high)
+
+    def table(self, by: Optional[str] = None, runs: Optional[Iterable[str]] = None,
+              models: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Leaderboard of the verdicts read so far, best earnings first.
+
+        Each verdict is one trial; a model graded in several runs has one trial per run.
+        Earnings are the summed value of the jobs won, and earnings_share is that as a
+        fraction of the value of all jobs attempted. Verdicts for jobs missing from the
+        data count as trials worth 0.
+
+        Args:
+            by (str, optional): Also break down by this job column, e.g. 'SECTOR'
+            runs (Iterable[str], optional): Only these runs
+            models (Iterable[str], optional): Only these models
+
+        Returns:
+            pd.DataFrame: One row per model (and value of by) with trials, wins, win_rate,
+                win_rate_low/high, earnings, earnings_low/high, value_offered and earnings_share
+        """
+        verdicts = self.verdicts
+        if runs is not None:
+            verdicts = verdicts[verdicts['run'].isin(list(runs))]
+        if models is not None:
+            verdicts = verdicts[verdicts['model'].isin(list(models))]
+        jobs = self.jobs.reindex(verdicts['job_id'].to_numpy())
+        frame = pd.DataFrame({'model': verdicts['model'].to_numpy(),
+                              'win': verdicts['win'].to_numpy(dtype=bool),
+                              'value': jobs['value'].fillna(0.0).to_numpy()})
+        keys = ['model']
+        if by is not None:
+            frame[by] = jobs[by].to_numpy() if by in jobs.columns else self._job_column(by, verdicts['job_id'])
+            keys.append(by)
+        frame['earned'] = np.where(frame['win'], frame['value'], 0.0)
+
+        grouped = frame.groupby(keys, sort=True, dropna=False)
+        table = grouped.agg(trials=('win', 'size'), wins=('win', 'sum'), earnings=('earned', 'sum'),
+                            value_offered=('value', 'sum'))
+        table['win_rate'] = table['wins'] / table['trials']
+        table['earnings_share'] = (table['earnings'] / table['value_offered'].where(table['value_offered'] > 0))
+
+        rng = np.random.default_rng(self.seed)
+        bounds: List[Tuple[float, float, float, float]] = []
+        for (_, group), trials, win_rate in zip(grouped['earned'], table['trials'], table['win_rate']):
+            win_low, win_high = self._interval(rng.binomial(trials, win_rate, size=self.n_boot) / trials)
+            earn_low, earn_high = self._interval(bootstrap_sum(group.to_numpy(), self.n_boot, rng))
+            bounds.append((win_low, win_high, earn_low, earn_high))
+        bounds = np.array(bounds).reshape(-1, 4)
+        table['win_rate_low'], table['win_rate_high'] = bounds[:, 0], bounds[:, 1]
+        table['earnings_low'], table['earnings_high'] = bounds[:, 2], bounds[:, 3]
+
+        table = table[['trials', 'wins', 'win_rate', 'win_rate_low', 'win_rate_high', 'earnings',
+                       'earnings_low', 'earnings_high', 'value_offered', 'earnings_share']]
+        sort_keys = keys[1:] + ['earnings']
+        return table.reset_index().sort_values(sort_keys, ascending=[True] * (len(keys) - 1) + [False],
+                                               ignore_index=True)
+
+    def _job_column(self, name: str, job_ids: pd.Series) -> np.ndarray:
+        """Look up a job column other than SECTOR for a breakdown."""
+        ids = job_ids.unique()
+        ids = [job_id for job_id in ids.tolist() if self.data.has_job(job_id)]
+        lookup = self.data.get_jobs(ids, columns=['ID', name]).set_index('ID')[name] if ids else pd.Series(dtype=object)
+        return job_ids.map(lookup).to_numpy()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank models by win rate and earnings from stored verdicts")
+    parser.add_argument('results', nargs='?', default=DEFAULT_RESULTS_PATH, help="Path to the results store")
+    parser.add_argument('--data', default='data/df_randomized_feasible_cleaned.csv',
+                        help="Path to the cleaned CSV file or .arena job store")
+    parser.add_argument('--import', dest='import_csv', action='append', default=[],
+                        help="Import a results.csv into the store first; may be repeated")
+    parser.add_argument('--run', help="Run name for --import; defaults to the results.csv's directory name")
+    parser.add_argument('--runs', nargs='+', help="Only rank these runs")
+    parser.add_argument('--by', help="Break down by a job column, e.g. SECTOR")
+    parser.add_argument('--n-boot', type=int, default=2000, help="Bootstrap resamples per interval")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.results)
+    for path in args.import_csv:
+        print(f"Imported {store.import_results_csv(path, run=args.run):,} new or changed verdicts from {path}")
+    start = time.perf_counter()
+    leaderboard = Leaderboard(store, AgentArenaData(args.data), n_boot=args.n_boot)
+    count = leaderboard.refresh()
+    table = leaderboard.table(by=args.by, runs=args.runs)
+    print(f"Ranked {count:,} verdicts in {time.perf_counter() - start:.1f}s")
+    with pd.option_context('display.max_rows', None, 'display.width', 200, 'display.float_format', '{:,.3f}'.format):
+        print(table.to_string(index=False))
+    store.close()
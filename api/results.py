@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Default location of the results store, relative to the working directory
+DEFAULT_RESULTS_PATH = 'results.sqlite'
+
+# Columns of ResultsStore.read, in order
+RESULT_COLUMNS = ['run', 'model', 'job_id', 'win', 'verifier', 'graded_at', 'seq']
+
+class ResultsStore:
+    def __init__(self, path: str = DEFAULT_RESULTS_PATH):
+        """
+        Typed, long-format store of grading verdicts backed by SQLite.
+
+        One row per (run, model, job_id) with win as 0/1, the verifier that decided it
+        and when. Rows are indexed by model, job and run, and carry a sequence number
+        that increases whenever a verdict is added or changes, so readers such as
+        api.leaderboard.Leaderboard can fetch only what is new since their last read.
+
+        Args:
+            path (str): Path to the SQLite file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Transactions are begun explicitly, so add_many can take the write lock up front
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                run TEXT NOT NULL,
+                model TEXT NOT NULL,
+                job_id INTEGER NOT NULL,
+                win INTEGER NOT NULL,
+                verifier TEXT,
+                graded_at REAL NOT NULL,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (run, model, job_id)
+            );
+            CREATE INDEX IF NOT EXISTS verdicts_model ON verdicts (model);
+            CREATE INDEX IF NOT EXISTS verdicts_job ON verdicts (job_id);
+            CREATE INDEX IF NOT EXISTS verdicts_run ON verdicts (run);
+            CREATE INDEX IF NOT EXISTS verdicts_seq ON verdicts (seq);
+        """)
+
+    def add_many(self, verdicts: pd.DataFrame, run: Optional[str] = None) -> int:
+        """
+        Insert or update verdicts in one transaction.
+
+        Rows whose win and verifier are unchanged keep their sequence number, so
+        re-adding the same verdicts does not make readers refetch them.
+
+        Args:
+            verdicts (pd.DataFrame): Columns model, job_id and win (bool, 0/1 or
+                'win'/'fail'), optionally run, verifier and graded_at
+            run (str, optional): Run name for rows without a run column
+
+        Returns:
+            int: Number of rows added or changed
+        """
+        if verdicts.empty:
+            return 0
+        win = verdicts['win']
+        if not (pd.api.types.is_bool_dtype(win) or pd.api.types.is_numeric_dtype(win)):
+            win = win.map({'win': 1, 'fail': 0, True: 1, False: 0})
+        runs = verdicts['run'] if 'run' in verdicts.columns else pd.Series(run or 'default', index=verdicts.index)
+        verifiers = verdicts['verifier'] if 'verifier' in verdicts.columns else pd.Series(None, index=verdicts.index)
+        graded_at = (verdicts['graded_at'] if 'graded_at' in verdicts.columns
+                     else pd.Series(time.time(), index=verdicts.index))
+        rows = list(zip(runs.astype(str).tolist(), verdicts['model'].astype(str).tolist(),
+                        verdicts['job_id'].astype(np.int64).tolist(), win.astype(np.int64).tolist(),
+                        verifiers.where(verifiers.notna(), None).tolist(), graded_at.astype(float).tolist()))
+        with self._lock:
+            # Take the write lock before reading MAX(seq), so writers in other processes
+            # cannot pick the same sequence numbers
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                start = self._conn.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM verdicts').fetchone()[0]
+                before = self._conn.total_changes
+                self._conn.executemany("""
+                    INSERT INTO verdicts (run, model, job_id, win, verifier, graded_at, seq) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (run, model, job_id) DO UPDATE SET
+                        win = excluded.win, verifier = excluded.verifier, graded_at = excluded.graded_at, seq = excluded.seq
+                    WHERE win != excluded.win OR verifier IS NOT excluded.verifier""",
+                    [row + (seq,) for seq, row in enumerate(rows, start)])
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            return self._conn.total_changes - before
+
+    def add(self, run: str, model: str, job_id: int, win: bool, verifier: Optional[str] = None) -> int:
+        """Insert or update a single verdict."""
+        return self.add_many(pd.DataFrame({'run': [run], 'model': [model], 'job_id': [job_id], 'win': [int(win)],
+                                           'verifier': [verifier]}))
+
+    def import_results_csv(self, path: str, run: Optional[str] = None) -> int:
+        """
+        Import a wide results.csv written by SimpleVerifier; blank cells are skipped.
+
+        Args:
+            path (str): Path to results.csv
+            run (str, optional): Run name; defaults to the name of the directory holding the file
+        """
+        results = pd.read_csv(path, index_col='jobID')
+        long = results.stack().rename('win').reset_index().rename(columns={'jobID': 'job_id', 'level_1': 'model'})
+        long = long[long['win'].isin(['win', 'fail'])]
+        run = run or os.path.basename(os.path.dirname(os.path.abspath(path)))
+        return self.add_many(long, run=run)
+
+    def read(self, since: int = 0, runs: Optional[Iterable[str]] = None,
+             models: Optional[Iterable[str]] = None) -> Tuple[pd.DataFrame, int]:
+        """
+        Read verdicts added or changed after sequence number since.
+
+        Args:
+            since (int): Last sequence number already read; 0 reads everything
+            runs (Iterable[str], optional): Only these runs
+            models (Iterable[str], optional): Only these models
+
+        Returns:
+            Tuple[pd.DataFrame, int]: Verdicts with RESULT_COLUMNS and win as a bool, and
+                the sequence number to pass as since next time
+        """
+        query, params = 'SELECT run, model, job_id, win, verifier, graded_at, seq FROM verdicts WHERE seq > ?', [since]
+        for column, values in (('run', runs), ('model', models)):
+            if values is not None:
+                values = list(values)
+                query += f" AND {column} IN ({', '.join('?' * len(values))})"
+                params += values
+        with self._lock:
+            frame = pd.read_sql_query(query + ' ORDER BY seq', self._conn, params=params)
+        frame['win'] = frame['win'].astype(bool)
+        frame['job_id'] = frame['job_id'].astype(np.int64)
+        last = int(frame['seq'].iloc[-1]) if len(frame) else since
+        return frame, last
+
+    def to_wide(self, run: str) -> pd.DataFrame:
+        """Returns a run's verdicts in the results.csv layout: jobID rows, model columns, 'win'/'fail' cells."""
+        frame, _ = self.read(runs=[run])
+        wide = frame.pivot(index='job_id', columns='model', values='win')
+        wide = wide.apply(lambda column: column.map({True: 'win', False: 'fail'}))
+        wide.index.name = 'jobID'
+        wide.columns.name = None
+        return wide
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
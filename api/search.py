@@ -0,0 +1,207 @@
+import os
+import re
+import numpy as np
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Suffix of the persisted index file that sits next to the dataset
+SEARCH_INDEX_SUFFIX = '.search.npz'
+
+# Columns whose text is indexed for each job
+SEARCH_COLUMNS = ['TITLE', 'DESCRIPTION', 'SKILLS_AND_EXPERTISE']
+
+# Keeps tokens like "c++", "c#" and "node.js" intact
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+_STOPWORDS = frozenset("""
+a an and are as at be but by can for from have i if in into is it its me my of on or our so
+that the their this to we will with you your
+""".split())
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into lowercase search terms, dropping stopwords.
+
+    Args:
+        text (str, optional): Text to tokenize; None is treated as empty
+
+    Returns:
+        List[str]: Terms in order of appearance
+    """
+    if not text or not isinstance(text, str):
+        return []
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+def search_index_path_for(data_path: str) -> str:
+    """Returns the search index path that sits next to a dataset file."""
+    return os.path.splitext(data_path)[0] + SEARCH_INDEX_SUFFIX
+
+class JobSearchIndex:
+    def __init__(self):
+        """
+        Create an empty BM25 inverted index over job text.
+
+        Postings are kept in CSR form: for term t, documents
+        doc_idx[term_ptr[t]:term_ptr[t + 1]] contain it tf[...] times. Queries
+        score every matching document with vectorized array operations.
+        """
+        self.vocab: Dict[str, int] = {}
+        self.job_ids = np.empty(0, dtype=np.int64)
+        self.doc_lens = np.empty(0, dtype=np.float32)
+        self.term_ptr = np.zeros(1, dtype=np.int64)
+        self.doc_idx = np.empty(0, dtype=np.int32)
+        self.tf = np.empty(0, dtype=np.float32)
+        self._job_id_set = set()
+
+    @property
+    def num_docs(self) -> int:
+        """Number of indexed jobs."""
+        return len(self.job_ids)
+
+    @classmethod
+    def build(cls, job_ids: Sequence[int], texts: Iterable[str]) -> 'JobSearchIndex':
+        """
+        Build an index over job texts.
+
+        Args:
+            job_ids (Sequence[int]): Job IDs, one per text
+            texts (Iterable[str]): Text to index for each job
+
+        Returns:
+            JobSearchIndex: The built index
+        """
+        index = cls()
+        index.add_documents(job_ids, texts)
+        return index
+
+    def add_documents(self, job_ids: Sequence[int], texts: Iterable[str]) -> None:
+        """
+        Add jobs to the index incrementally.
+
+        Only the new documents are tokenized; their postings are merged into the
+        existing CSR arrays with a single stable sort. The index is left unchanged
+        if the arguments are rejected. Additions are in memory only; call save to
+        persist them.
+
+        Args:
+            job_ids (Sequence[int]): IDs of the new jobs
+            texts (Iterable[str]): Text to index for each new job
+
+        Raises:
+            ValueError: If a job ID is already indexed
+        """
+        job_ids = [int(job_id) for job_id in job_ids]
+        texts = list(texts)
+        if len(texts) != len(job_ids):
+            raise ValueError("job_ids and texts must have the same length")
+        duplicates = self._job_id_set.intersection(job_ids)
+        if duplicates or len(set(job_ids)) != len(job_ids):
+            raise ValueError(f"Job IDs already indexed: {sorted(duplicates) or 'duplicates in batch'}")
+
+        # Unseen terms get IDs after the existing ones, and join the vocabulary only
+        # once the postings covering them are in place
+        added_vocab: Dict[str, int] = {}
+        new_terms: List[int] = []
+        new_docs: List[int] = []
+        new_tf: List[int] = []
+        doc_lens: List[int] = []
+        first_doc = self.num_docs
+        for offset, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lens.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                term_id = self.vocab.get(term)
+                if term_id is None:
+                    term_id = added_vocab.setdefault(term, len(self.vocab) + len(added_vocab))
+                new_terms.append(term_id)
+                new_docs.append(first_doc + offset)
+                new_tf.append(count)
+
+        num_terms = len(self.vocab) + len(added_vocab)
+        old_terms = np.repeat(np.arange(len(self.term_ptr) - 1), np.diff(self.term_ptr))
+        terms = np.concatenate([old_terms, np.asarray(new_terms, dtype=np.int64)])
+        order = np.argsort(terms, kind='stable')
+        self.doc_idx = np.concatenate([self.doc_idx, np.asarray(new_docs, dtype=np.int32)])[order]
+        self.tf = np.concatenate([self.tf, np.asarray(new_tf, dtype=np.float32)])[order]
+        self.term_ptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=num_terms), out=self.term_ptr[1:])
+        self.vocab.update(added_vocab)
+
+        self.job_ids = np.concatenate([self.job_ids, np.asarray(job_ids, dtype=np.int64)])
+        self.doc_lens = np.concatenate([self.doc_lens, np.asarray(doc_lens, dtype=np.float32)])
+        self._job_id_set.update(job_ids)
+
+    def search(self, text: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Returns the top-k jobs for a free-text query, ranked by BM25.
+
+        Args:
+            text (str): Query text, e.g. an agent's skills
+            k (int): Maximum number of results
+
+        Returns:
+            List[Tuple[int, float]]: (job ID, score) pairs, best first
+        """
+        term_ids = {self.vocab[term] for term in tokenize(text) if term in self.vocab}
+        if not term_ids or not self.num_docs or k <= 0:
+            return []
+
+        avg_len = max(float(self.doc_lens.mean()), 1.0)
+        length_norm = _K1 * (1 - _B + _B * self.doc_lens / avg_len)
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term_id in term_ids:
+            start, stop = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            docs = self.doc_idx[start:stop]
+            tf = self.tf[start:stop]
+            doc_freq = stop - start
+            idf = np.log1p((self.num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            scores[docs] += idf * tf * (_K1 + 1) / (tf + length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return list(zip(self.job_ids[matched].tolist(), scores[matched].tolist()))
+
+    def save(self, path: str) -> str:
+        """
+        Persist the index to a .npz file.
+
+        Args:
+            path (str): Path to write
+
+        Returns:
+            str: Path to the written index
+        """
+        terms = np.array(sorted(self.vocab, key=self.vocab.get), dtype=str)
+        tmp_path = f"{path}.tmp{os.getpid()}.npz"
+        np.savez(tmp_path, terms=terms, job_ids=self.job_ids, doc_lens=self.doc_lens,
+                 term_ptr=self.term_ptr, doc_idx=self.doc_idx, tf=self.tf)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'JobSearchIndex':
+        """
+        Load an index written by save.
+
+        Args:
+            path (str): Path to the .npz file
+
+        Returns:
+            JobSearchIndex: The loaded index
+        """
+        index = cls()
+        with np.load(path, allow_pickle=False) as arrays:
+            index.vocab = {term: i for i, term in enumerate(arrays['terms'].tolist())}
+            index.job_ids = arrays['job_ids']
+            index.doc_lens = arrays['doc_lens']
+            index.term_ptr = arrays['term_ptr']
+            index.doc_idx = arrays['doc_idx']
+            index.tf = arrays['tf']
+        index._job_id_set = set(index.job_ids.tolist())
+        return index
@@ -0,0 +1,417 @@
+import argparse
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+from api.data import AgentArenaData
+from api.submissions import CHUNK_SIZE
+
+# Bodies at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = 1024
+
+# Largest request body accepted, i.e. the largest submission
+MAX_BODY_BYTES = 512 * 1024 * 1024
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+def _json_safe(value: Any) -> Any:
+    """Replace NaN with None so responses are standard JSON."""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def encode_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Encode a where-spec (see api.data.iter_jobs) as JSON-compatible data.
+
+    Ranges become {"range": [low, high]} and memberships {"in": [...]}, since
+    tuples and lists are indistinguishable in JSON.
+
+    Raises:
+        TypeError: If a predicate is a callable, which cannot be sent over HTTP
+    """
+    if where is None:
+        return None
+    encoded = {}
+    for column, predicate in where.items():
+        if callable(predicate):
+            raise TypeError(f"Callable predicate on {column} cannot be sent to the server")
+        if isinstance(predicate, tuple) and len(predicate) == 2:
+            encoded[column] = {'range': list(predicate)}
+        elif isinstance(predicate, (list, set, frozenset)):
+            encoded[column] = {'in': list(predicate)}
+        else:
+            encoded[column] = predicate
+    return encoded
+
+def decode_where(encoded: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Inverse of encode_where."""
+    if encoded is None:
+        return None
+    where = {}
+    for column, predicate in encoded.items():
+        if isinstance(predicate, dict) and 'range' in predicate:
+            where[column] = tuple(predicate['range'])
+        elif isinstance(predicate, dict) and 'in' in predicate:
+            where[column] = list(predicate['in'])
+        else:
+            where[column] = predicate
+    return where
+
+class _Response:
+    def __init__(self, status: int, body: bytes = b'', content_type: str = 'application/json'):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+
+def _json_response(payload: Any, status: int = 200) -> _Response:
+    return _Response(status, json.dumps(payload).encode('utf-8'))
+
+class _PayloadTooLarge(ValueError):
+    pass
+
+def _content_length(headers: Dict[str, str]) -> int:
+    """
+    Returns a request's Content-Length, or 0 without one.
+
+    Raises:
+        ValueError: If the header is not a non-negative integer
+    """
+    value = headers.get('content-length', '')
+    if not value:
+        return 0
+    if not value.isdigit():
+        raise ValueError(f"Invalid Content-Length: {value!r}")
+    return int(value)
+
+class _BodyReader:
+    def __init__(self, reader: asyncio.StreamReader, headers: Dict[str, str], limit: int = MAX_BODY_BYTES):
+        """Reads a request body from the connection in chunks, sized by Content-Length or chunked."""
+        self.reader = reader
+        self.chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        self.remaining = 0 if self.chunked else _content_length(headers)
+        self.limit = limit
+        self.received = 0
+        self.done = not self.chunked and self.remaining == 0
+
+    async def read(self) -> bytes:
+        """Returns the next chunk of the body, or b'' once all of it has been read."""
+        if self.done:
+            return b''
+        if self.chunked:
+            line = await self.reader.readuntil(b'\r\n')
+            size = int(line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Skip any trailers up to the blank line that ends the body
+                while await self.reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                self.done = True
+                return b''
+            chunk = await self.reader.readexactly(size)
+            await self.reader.readexactly(2)
+        else:
+            chunk = await self.reader.read(min(self.remaining, CHUNK_SIZE))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', self.remaining)
+            self.remaining -= len(chunk)
+            self.done = self.remaining == 0
+        self.received += len(chunk)
+        if self.received > self.limit:
+            raise _PayloadTooLarge(f"Request body is larger than {self.limit:,} bytes")
+        return chunk
+
+    async def read_all(self) -> bytes:
+        parts = []
+        while True:
+            chunk = await self.read()
+            if not chunk:
+                return b''.join(parts)
+            parts.append(chunk)
+
+    def iter_from_thread(self, loop: asyncio.AbstractEventLoop) -> Iterator[bytes]:
+        """Yields the body in a worker thread, reading each chunk on the event loop when it is needed."""
+        while True:
+            chunk = asyncio.run_coroutine_threadsafe(self.read(), loop).result()
+            if not chunk:
+                return
+            yield chunk
+
+class ArenaServer:
+    def __init__(self, data: AgentArenaData, output_root: str = '.', gzip_cache_size: int = 4096):
+        """
+        Local HTTP server exposing an AgentArenaData instance to out-of-process agents.
+
+        Connections are kept alive between requests. Job data only changes through
+        add_jobs, so job responses carry an ETag derived from the dataset and its
+        generation, and If-None-Match requests are answered with 304 without
+        rebuilding the body. Search results are never cached. HEAD is answered like
+        GET, without the body.
+        Large bodies are gzipped when the client accepts it, and compressed bodies
+        are cached. Handlers and compression run on the event loop's executor, so a
+        slow request, e.g. the first search building its index, does not hold up
+        other connections, and submissions are streamed to the submission store as
+        they arrive, whether sent with Content-Length or chunked.
+
+        Args:
+            data (AgentArenaData): The dataset to serve
+            output_root (str): Directory that submission save_dirs are resolved under
+            gzip_cache_size (int): Number of compressed response bodies to keep
+        """
+        self.data = data
+        self.output_root = os.path.abspath(output_root)
+        self.gzip_cache_size = gzip_cache_size
+        self._gzip_cache: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._gzip_lock = threading.Lock()
+        source = os.stat(data.csv_path)
+        self._fingerprint = f"{os.path.abspath(data.csv_path)}:{source.st_size}:{source.st_mtime_ns}"
+        # Handlers get the whole body as bytes, except streaming ones, which get the
+        # _BodyReader. Cacheable GET responses are fixed by the data generation.
+        # Routes are (method, pattern, handler, streaming, cacheable)
+        self._routes = [
+            ('GET', re.compile(r'^/jobs/count$'), self._get_count, False, True),
+            ('GET', re.compile(r'^/jobs$'), self._get_jobs, False, True),
+            ('GET', re.compile(r'^/jobs/(-?\d+)$'), self._get_job_metadata, False, True),
+            ('GET', re.compile(r'^/jobs/(-?\d+)/description$'), self._get_job_description, False, True),
+            ('POST', re.compile(r'^/jobs/descriptions$'), self._post_job_descriptions, False, False),
+            ('POST', re.compile(r'^/query$'), self._post_query, False, False),
+            ('GET', re.compile(r'^/search$'), self._get_search, False, False),
+            ('POST', re.compile(r'^/submissions/([^/]+)/(-?\d+)$'), self._post_submission, True, False),
+        ]
+
+    # Handlers
+
+    def _get_count(self, query: Dict[str, List[str]], body: bytes) -> _Response:
+        return _json_response({'count': self.data.get_num_jobs()})
+
+    def _get_jobs(self, query: Dict[str, List[str]], body: bytes) -> _Response:
+        """Page of jobs in dataset order, as columns: /jobs?offset=0&limit=1000&columns=ID,TITLE"""
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['1000'])[0])
+        columns = query['columns'][0].split(',') if 'columns' in query else None
+        if columns is not None and 'ID' not in columns:
+            columns = ['ID'] + columns
+        ids = self.data.query(offset=offset, limit=limit)
+        page = {'total': self.data.count_jobs(), 'offset': offset, 'columns': {}}
+        if ids:
+            batch = self.data.get_jobs(ids, columns)
+            page['columns'] = {col: [_json_safe(v) for v in batch[col].tolist()] for col in batch.columns}
+        return _json_response(page)
+
+    def _get_job_metadata(self, query: Dict[str, List[str]], body: bytes, job_id: str) -> _Response:
+        metadata = self.data.get_job_metadata(int(job_id))
+        return _json_response({'id': int(job_id), **{k: _json_safe(v) for k, v in metadata._asdict().items()}})
+
+    def _get_job_description(self, query: Dict[str, List[str]], body: bytes, job_id: str) -> _Response:
+        description = self.data.get_job_description(int(job_id))
+        return _Response(200, (description or '').encode('utf-8'), 'text/plain; charset=utf-8')
+
+    def _post_job_descriptions(self, query: Dict[str, List[str]], body: bytes) -> _Response:
+        ids = json.loads(body)['ids']
+        return _json_response({'descriptions': self.data.get_job_descriptions(ids)})
+
+    def _post_query(self, query: Dict[str, List[str]], body: bytes) -> _Response:
+        request = json.loads(body) if body else {}
+        where = decode_where(request.get('where'))
+        offset = int(request.get('offset', 0))
+        limit = request.get('limit')
+        return _json_response({
+            'ids': self.data.query(where, offset=offset, limit=limit),
+            'total': self.data.count_jobs(where),
+        })
+
+    def _get_search(self, query: Dict[str, List[str]], body: bytes) -> _Response:
+        text = query.get('q', [''])[0]
+        k = int(query.get('k', ['10'])[0])
+        return _json_response({'results': self.data.search(text, k)})
+
+    def _resolve_save_dir(self, save_dir: str) -> str:
+        resolved = os.path.abspath(os.path.join(self.output_root, save_dir))
+        if os.path.isabs(save_dir) or os.path.commonpath([resolved, self.output_root]) != self.output_root:
+            raise ValueError(f"save_dir must be a relative path inside the output root: {save_dir}")
+        return resolved
+
+    async def _post_submission(self, query: Dict[str, List[str]], body: _BodyReader, model_name: str,
+                               job_id: str) -> _Response:
+        save_dir = self._resolve_save_dir(query.get('save_dir', ['output'])[0])
+        # The body is written chunk by chunk as it arrives, from a worker thread since submit_job blocks on disk I/O
+        loop = asyncio.get_running_loop()
+        path = await loop.run_in_executor(None, self.data.submit_job, save_dir,
+                                          unquote(model_name), int(job_id), body.iter_from_thread(loop))
+        return _json_response({'path': path})
+
+    # HTTP plumbing
+
+    async def _dispatch(self, method: str, target: str, body: _BodyReader) -> _Response:
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        allowed = False
+        for route_method, pattern, handler, streaming, _ in self._routes:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            allowed = True
+            if route_method != ('GET' if method == 'HEAD' else method):
+                continue
+            try:
+                if streaming:
+                    return await handler(query, body, *match.groups())
+                data = await body.read_all()
+                # Handlers may decode or scan the whole dataset, so keep them off the event loop
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, functools.partial(handler, query, data, *match.groups()))
+            except KeyError as e:
+                return _json_response({'error': str(e).strip('"\'')}, 404)
+            except _PayloadTooLarge as e:
+                return _json_response({'error': str(e)}, 413)
+            except (ValueError, TypeError) as e:
+                return _json_response({'error': str(e)}, 400)
+            except Exception as e:
+                return _json_response({'error': str(e)}, 500)
+        if allowed:
+            return _json_response({'error': f"Method {method} not allowed"}, 405)
+        return _json_response({'error': f"No route for {url.path}"}, 404)
+
+    def _gzip(self, key: Optional[str], body: bytes) -> bytes:
+        """Compress a body, caching the result under key unless it is None."""
+        if key is not None:
+            with self._gzip_lock:
+                if key in self._gzip_cache:
+                    self._gzip_cache.move_to_end(key)
+                    return self._gzip_cache[key]
+        compressed = gzip.compress(body, compresslevel=5)
+        if key is not None:
+            with self._gzip_lock:
+                self._gzip_cache[key] = compressed
+                if len(self._gzip_cache) > self.gzip_cache_size:
+                    self._gzip_cache.popitem(last=False)
+        return compressed
+
+    def _cacheable(self, method: str, path: str) -> bool:
+        """Returns whether a request is served by a cacheable route."""
+        return method in ('GET', 'HEAD') and any(cacheable and route_method == 'GET' and pattern.match(path)
+                                                 for route_method, pattern, _, _, cacheable in self._routes)
+
+    def _etag(self) -> str:
+        """Tag of every cacheable representation of the current data generation."""
+        version = f"{self._fingerprint}:{self.data.generation}:{self.data.get_num_jobs()}"
+        return hashlib.sha1(version.encode('utf-8')).hexdigest()[:20]
+
+    async def _respond(self, method: str, target: str, headers: Dict[str, str],
+                       body: _BodyReader) -> Tuple[int, Dict[str, str], bytes]:
+        accepts_gzip = 'gzip' in headers.get('accept-encoding', '')
+        etag = None
+        if self._cacheable(method, urlsplit(target).path):
+            # Fixed by the data generation and the encoding
+            version = self._etag()
+            etag = f'"{version}-gz"' if accepts_gzip else f'"{version}"'
+            if headers.get('if-none-match') == etag:
+                return 304, {'ETag': etag}, b''
+
+        response = await self._dispatch(method, target, body)
+        response_headers = {'Content-Type': response.content_type}
+        payload = response.body
+        if response.status == 200 and etag is not None:
+            response_headers['ETag'] = etag
+            response_headers['Cache-Control'] = 'no-cache'
+        if accepts_gzip and len(payload) >= GZIP_MIN_BYTES:
+            loop = asyncio.get_running_loop()
+            # Cached bodies are keyed by ETag too, so a new generation is compressed afresh
+            key = f"{etag}{target}" if etag is not None and response.status == 200 else None
+            payload = await loop.run_in_executor(None, self._gzip, key, payload)
+            response_headers['Content-Encoding'] = 'gzip'
+            response_headers['Vary'] = 'Accept-Encoding'
+        return response.status, response_headers, payload
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                rejected = None
+                try:
+                    if _content_length(headers) > MAX_BODY_BYTES:
+                        rejected = _json_response({'error': f"Request body is larger than {MAX_BODY_BYTES:,} bytes"}, 413)
+                except ValueError as e:
+                    rejected = _json_response({'error': str(e)}, 400)
+                if rejected is not None:
+                    # The body is left unread, so the connection can't be reused
+                    status, response_headers, payload = rejected.status, {'Content-Type': rejected.content_type}, rejected.body
+                    keep_alive = False
+                else:
+                    body = _BodyReader(reader, headers)
+                    status, response_headers, payload = await self._respond(method, target, headers, body)
+                    # A body left partly unread would be taken for the next request
+                    if not body.done:
+                        keep_alive = False
+
+                response_headers['Content-Length'] = str(len(payload))
+                response_headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+                head_lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+                head_lines += [f"{name}: {value}" for name, value in response_headers.items()]
+                writer.write(('\r\n'.join(head_lines) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765, ready: Optional[asyncio.Event] = None) -> None:
+        """
+        Serve until cancelled.
+
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind; 0 picks a free port, available as self.port once ready
+            ready (asyncio.Event, optional): Set once the server is listening
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port, limit=1024 * 1024)
+        self.port = server.sockets[0].getsockname()[1]
+        print(f"Serving {self.data.get_num_jobs():,} jobs on http://{host}:{self.port}")
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve an Agent Arena dataset over HTTP")
+    parser.add_argument('csv_path', help="Path to the cleaned CSV file or .arena job store")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output-root', default='.', help="Directory submission save_dirs are resolved under")
+    parser.add_argument('--submission-backend', default='files', choices=['files', 'segments'])
+    args = parser.parse_args()
+
+    data = AgentArenaData(args.csv_path, submission_backend=args.submission_backend)
+    try:
+        asyncio.run(ArenaServer(data, args.output_root).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
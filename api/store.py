@@ -0,0 +1,287 @@
+import json
+import mmap
+import os
+import sys
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# File layout:
+#   magic (8 bytes) | header length (uint64 LE) | JSON header | padding | column data
+# Every column buffer starts on an 8-byte boundary so typed arrays can be viewed in place.
+STORE_MAGIC = b'AARENA01'
+STORE_SUFFIX = '.arena'
+_PREAMBLE_SIZE = len(STORE_MAGIC) + 8
+_ALIGNMENT = 8
+
+# Text columns that stay in the mmap and are only decoded on access
+LAZY_COLUMNS = ('DESCRIPTION',)
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+def store_path_for(csv_path: str) -> str:
+    """
+    Returns the job store path that sits next to a CSV file.
+
+    Args:
+        csv_path (str): Path to the CSV file
+
+    Returns:
+        str: Path with the CSV extension replaced by .arena
+    """
+    return os.path.splitext(csv_path)[0] + STORE_SUFFIX
+
+def is_store_current(store_path: str, csv_path: Optional[str] = None) -> bool:
+    """
+    Returns whether a job store exists and is at least as new as its source CSV.
+
+    Args:
+        store_path (str): Path to the job store
+        csv_path (str, optional): Path to the source CSV. If it does not exist, any store is current.
+
+    Returns:
+        bool: True if the store can be used in place of the CSV
+    """
+    if not os.path.exists(store_path):
+        return False
+    if csv_path is None or not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(store_path) >= os.path.getmtime(csv_path)
+
+def _encode_column(series: pd.Series) -> Dict:
+    """Encode one column as either a typed array or a text blob with offsets."""
+    if pd.api.types.is_bool_dtype(series) and not series.isna().any():
+        return {'kind': 'array', 'values': series.to_numpy(dtype=np.bool_)}
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = series.to_numpy()
+        if values.dtype.kind not in 'iuf':
+            values = values.astype(np.float64)
+        return {'kind': 'array', 'values': np.ascontiguousarray(values)}
+
+    # Everything else is stored as UTF-8 text with a validity mask for missing values
+    valid = series.notna().to_numpy()
+    encoded = [str(value).encode('utf-8') if is_valid else b''
+               for value, is_valid in zip(series.tolist(), valid)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return {
+        'kind': 'text',
+        'offsets': offsets,
+        'valid': valid.astype(np.bool_),
+        'blob': b''.join(encoded),
+    }
+
+def write_store(df: pd.DataFrame, store_path: str) -> str:
+    """
+    Write a DataFrame to an on-disk columnar job store.
+
+    Fixed-width columns are written as typed arrays; text columns are written as a
+    single UTF-8 blob plus an offsets array. The file is written to a temporary path
+    and renamed into place so readers never see a partial store.
+
+    Args:
+        df (pd.DataFrame): The job data to write
+        store_path (str): Path to write the store to
+
+    Returns:
+        str: Path to the written store
+    """
+    # Lay out every buffer relative to the start of the data section
+    columns = []
+    buffers = []
+    position = 0
+    for name in df.columns:
+        encoded = _encode_column(df[name])
+        entry = {'name': str(name), 'kind': encoded['kind']}
+        parts = ['values'] if encoded['kind'] == 'array' else ['offsets', 'valid', 'blob']
+        for part in parts:
+            data = encoded[part]
+            raw = data.tobytes() if isinstance(data, np.ndarray) else data
+            position = _align(position)
+            entry[part] = {'offset': position, 'nbytes': len(raw)}
+            if isinstance(data, np.ndarray):
+                entry[part]['dtype'] = data.dtype.str
+            buffers.append((position, raw))
+            position += len(raw)
+        columns.append(entry)
+
+    header = json.dumps({'num_rows': len(df), 'columns': columns}).encode('utf-8')
+    data_start = _align(_PREAMBLE_SIZE + len(header))
+
+    tmp_path = f"{store_path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(STORE_MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        for offset, raw in buffers:
+            f.seek(data_start + offset)
+            f.write(raw)
+        # Pad the tail so the final buffer is fully backed by the file
+        f.truncate(_align(data_start + position))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, store_path)
+    return store_path
+
+def convert_csv_to_store(csv_path: str, store_path: Optional[str] = None) -> str:
+    """
+    One-time conversion of a cleaned job CSV into a memory-mappable job store.
+
+    Args:
+        csv_path (str): Path to the cleaned CSV file
+        store_path (str, optional): Path to save the store. If None, will save next to the
+            CSV with the extension replaced by .arena.
+
+    Returns:
+        str: Path to the written store
+    """
+    if store_path is None:
+        store_path = store_path_for(csv_path)
+    df = pd.read_csv(csv_path)
+    write_store(df, store_path)
+    print(f"Converted {len(df):,} jobs from {csv_path} to {store_path}")
+    return store_path
+
+class JobStore:
+    def __init__(self, store_path: str):
+        """
+        Open a job store read-only via mmap.
+
+        Opening only parses the header. Typed columns are zero-copy views of the
+        mapping and text is decoded on access, so processes that open the same store
+        share one copy of its pages in the OS page cache.
+
+        Args:
+            store_path (str): Path to the .arena store
+
+        Raises:
+            ValueError: If the file is not a job store
+        """
+        self.store_path = store_path
+        self._open()
+
+    def _open(self) -> None:
+        with open(self.store_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(STORE_MAGIC)] != STORE_MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.store_path} is not a job store")
+        header_len = int.from_bytes(self._mmap[len(STORE_MAGIC):_PREAMBLE_SIZE], 'little')
+        header = json.loads(self._mmap[_PREAMBLE_SIZE:_PREAMBLE_SIZE + header_len])
+        self._data_start = _align(_PREAMBLE_SIZE + header_len)
+        self.num_rows: int = header['num_rows']
+        self._columns = {entry['name']: entry for entry in header['columns']}
+
+    def __getstate__(self) -> Dict:
+        # Pickle by path so worker processes re-map the file instead of copying it
+        return {'store_path': self.store_path}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.store_path = state['store_path']
+        self._open()
+
+    def close(self) -> None:
+        """Unmap the store."""
+        self._mmap.close()
+
+    @property
+    def column_names(self) -> List[str]:
+        """Names of all columns in the store, in file order."""
+        return list(self._columns)
+
+    def _view(self, part: Dict) -> np.ndarray:
+        dtype = np.dtype(part['dtype'])
+        return np.frombuffer(self._mmap, dtype=dtype, count=part['nbytes'] // dtype.itemsize,
+                             offset=self._data_start + part['offset'])
+
+    def _entry(self, name: str) -> Dict:
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise KeyError(f"Column {name} not found in {self.store_path}") from None
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        Returns a zero-copy, read-only view of a fixed-width column.
+
+        Args:
+            name (str): Column name
+
+        Returns:
+            np.ndarray: Typed array backed by the mmap
+        """
+        entry = self._entry(name)
+        if entry['kind'] != 'array':
+            raise TypeError(f"Column {name} is a text column")
+        return self._view(entry['values'])
+
+    def texts(self, name: str, positions: Optional[Iterable[int]] = None) -> List[Optional[str]]:
+        """
+        Decode text values of a column, optionally only at the given row positions.
+
+        Args:
+            name (str): Column name
+            positions (Iterable[int], optional): Row positions to decode. Decodes every row if None.
+
+        Returns:
+            List[Optional[str]]: Decoded strings, with None for missing values
+        """
+        entry = self._entry(name)
+        if entry['kind'] != 'text':
+            raise TypeError(f"Column {name} is not a text column")
+        offsets = self._view(entry['offsets'])
+        valid = self._view(entry['valid'])
+        blob_start = self._data_start + entry['blob']['offset']
+        if positions is None:
+            positions = range(self.num_rows)
+        mm = self._mmap
+        return [mm[blob_start + offsets[i]:blob_start + offsets[i + 1]].decode('utf-8') if valid[i] else None
+                for i in positions]
+
+    def text_lengths(self, name: str, positions: Optional[Iterable[int]] = None) -> np.ndarray:
+        """
+        UTF-8 byte lengths of text values, read from the offsets without decoding.
+
+        Args:
+            name (str): Column name
+            positions (Iterable[int], optional): Row positions. Every row if None.
+
+        Returns:
+            np.ndarray: int64 lengths, with 0 for missing values
+        """
+        entry = self._entry(name)
+        if entry['kind'] != 'text':
+            raise TypeError(f"Column {name} is not a text column")
+        offsets = self._view(entry['offsets'])
+        valid = self._view(entry['valid'])
+        rows = np.arange(self.num_rows) if positions is None else np.asarray(positions, dtype=np.intp)
+        lengths = offsets[rows + 1].astype(np.int64) - offsets[rows].astype(np.int64)
+        return np.where(valid[rows].astype(bool), lengths, 0)
+
+    def text(self, name: str, position: int) -> Optional[str]:
+        """Decode a single text value."""
+        return self.texts(name, [position])[0]
+
+    def to_frame(self, exclude: Sequence[str] = LAZY_COLUMNS) -> pd.DataFrame:
+        """
+        Build a DataFrame of every column except the lazily accessed ones.
+
+        Args:
+            exclude (Sequence[str]): Columns to leave in the mmap
+
+        Returns:
+            pd.DataFrame: Frame indexed by store row number
+        """
+        data = {}
+        for name, entry in self._columns.items():
+            if name in exclude:
+                continue
+            data[name] = self.array(name) if entry['kind'] == 'array' else self.texts(name)
+        return pd.DataFrame(data, index=pd.RangeIndex(self.num_rows), copy=False)
+
+if __name__ == "__main__":
+    if len(sys.argv) not in [2, 3]:
+        print("Usage: python -m api.store <input_csv_file> [output_store_file]")
+    else:
+        convert_csv_to_store(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None)
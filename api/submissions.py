@@ -0,0 +1,548 @@
+import errno
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# Anything submit_job accepts as a deliverable. A str is always the output text itself;
+# pass an os.PathLike (e.g. pathlib.Path) to submit a local file.
+SubmissionOutput = Union[str, bytes, bytearray, memoryview, os.PathLike, BinaryIO, Iterable[Union[str, bytes]]]
+
+# Size of chunks read from file-like outputs
+CHUNK_SIZE = 1024 * 1024
+
+# Errors that mean a zero-copy primitive is unsupported for these fds, not that the copy failed
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EBADF, errno.EPERM}
+
+class SubmissionInfo(NamedTuple):
+    """Size and content hash recorded with each submission."""
+    size: int
+    sha256: str
+
+def _write_all(fd: int, data) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+def _kernel_copy(src_fd: int, dst_fd: int, count: int) -> None:
+    """
+    Copy count bytes between the current positions of two fds without passing them
+    through user space, using copy_file_range, then sendfile, then read/write as fallbacks.
+    """
+    primitives = []
+    if hasattr(os, 'copy_file_range'):
+        primitives.append(lambda n: os.copy_file_range(src_fd, dst_fd, n))
+    if hasattr(os, 'sendfile'):
+        primitives.append(lambda n: os.sendfile(dst_fd, src_fd, None, n))
+
+    remaining = count
+    while remaining > 0:
+        if primitives:
+            try:
+                copied = primitives[0](remaining)
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+                primitives.pop(0)
+                continue
+        else:
+            chunk = os.read(src_fd, min(remaining, CHUNK_SIZE))
+            _write_all(dst_fd, chunk)
+            copied = len(chunk)
+        if copied == 0:
+            raise OSError(f"Source ended with {remaining} bytes left to copy")
+        remaining -= copied
+
+def _digest_fd(fd: int, size: int) -> Tuple[SubmissionInfo, int]:
+    """Hash a file through an mmap, returning its info and CRC32."""
+    sha = hashlib.sha256()
+    crc = 0
+    if size:
+        with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mm:
+            sha.update(mm)
+            crc = zlib.crc32(mm)
+    return SubmissionInfo(size, sha.hexdigest()), crc
+
+def iter_chunks(output: SubmissionOutput) -> Iterator[bytes]:
+    """Yield an in-memory, file-like or iterable output as byte chunks."""
+    if isinstance(output, str):
+        yield output.encode('utf-8')
+    elif isinstance(output, (bytes, bytearray, memoryview)):
+        yield output
+    elif hasattr(output, 'read'):
+        while True:
+            chunk = output.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+    else:
+        for chunk in output:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+def write_output(output: SubmissionOutput, fd: int) -> Tuple[SubmissionInfo, int]:
+    """
+    Write a submission to an fd at its current position without materializing it.
+
+    Local files are copied in the kernel; streams and iterables are written chunk by
+    chunk while their hash is updated incrementally.
+
+    Args:
+        output (SubmissionOutput): The deliverable
+        fd (int): Destination file descriptor
+
+    Returns:
+        Tuple[SubmissionInfo, int]: Size and SHA-256 of what was written, and its CRC32
+    """
+    if isinstance(output, os.PathLike):
+        with open(output, 'rb') as src:
+            size = os.fstat(src.fileno()).st_size
+            info, crc = _digest_fd(src.fileno(), size)
+            _kernel_copy(src.fileno(), fd, size)
+        return info, crc
+
+    sha = hashlib.sha256()
+    crc = 0
+    size = 0
+    for chunk in iter_chunks(output):
+        sha.update(chunk)
+        crc = zlib.crc32(chunk, crc)
+        _write_all(fd, chunk)
+        size += len(chunk)
+    return SubmissionInfo(size, sha.hexdigest()), crc
+
+def submission_filename(model_name: str, job_id: int) -> str:
+    """Returns the plain-file name of a submission: output_{model}_{jobID}.txt"""
+    return f"output_{model_name}_{job_id}.txt"
+
+def parse_submission_filename(filename: str) -> Tuple[str, int]:
+    """
+    Parse the model name and job ID from a plain-file submission name.
+
+    Raises:
+        ValueError: If the filename is not in the output_{model}_{jobID}.txt format
+    """
+    parts = filename.replace('.txt', '').split('_')
+    if len(parts) != 3 or parts[0] != 'output':
+        raise ValueError(f"Invalid filename format: {filename}")
+    return parts[1], int(parts[2])
+
+class FileSubmissionStore:
+    def __init__(self, save_dir: str):
+        """
+        Plain-file submission layout: one output_{model}_{jobID}.txt per submission,
+        plus a manifest.jsonl recording the size and content hash of each write.
+
+        Args:
+            save_dir (str): Directory holding the output files
+        """
+        self.save_dir = save_dir
+        self.manifest_path = os.path.join(save_dir, 'manifest.jsonl')
+        self._manifest_lock = threading.Lock()
+        self._manifest: Dict[Tuple[str, int], Dict] = {}
+        self._manifest_offset = 0
+
+    def _filepath(self, model_name: str, job_id: int) -> str:
+        return os.path.join(self.save_dir, submission_filename(model_name, job_id))
+
+    def write(self, model_name: str, job_id: int, output: SubmissionOutput) -> str:
+        """
+        Save a submission, replacing any earlier one for the same (model, job).
+
+        The output is written to a temporary file and renamed into place, so readers
+        never see a partially written submission.
+
+        Returns:
+            str: Path to the saved file
+        """
+        filepath = self._filepath(model_name, job_id)
+        tmp_path = os.path.join(self.save_dir, f".{submission_filename(model_name, job_id)}.{os.getpid()}-{threading.get_ident()}.tmp")
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        except FileNotFoundError:
+            # Create the save directory on first use (or if it was removed since)
+            os.makedirs(self.save_dir, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            info, _ = write_output(output, fd)
+        except BaseException:
+            os.close(fd)
+            os.unlink(tmp_path)
+            raise
+        os.close(fd)
+        os.replace(tmp_path, filepath)
+
+        entry = {'model': model_name, 'job_id': int(job_id), 'size': info.size,
+                 'sha256': info.sha256, 'mtime_ns': os.stat(filepath).st_mtime_ns}
+        with self._manifest_lock:
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        return filepath
+
+    def keys(self) -> List[Tuple[str, int]]:
+        """Returns (model_name, job_id) for every submission in the directory."""
+        if not os.path.isdir(self.save_dir):
+            return []
+        keys = []
+        for filename in os.listdir(self.save_dir):
+            if filename.endswith('.txt') and filename.startswith('output_'):
+                try:
+                    keys.append(parse_submission_filename(filename))
+                except ValueError:
+                    continue
+        return keys
+
+    def read_bytes(self, model_name: str, job_id: int) -> bytes:
+        """
+        Returns the raw content of a submission.
+
+        Raises:
+            KeyError: If there is no submission for (model_name, job_id)
+        """
+        try:
+            with open(self._filepath(model_name, job_id), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(f"No submission for model {model_name} and job ID {job_id}") from None
+
+    def read(self, model_name: str, job_id: int) -> str:
+        """
+        Returns the text of a submission; undecodable bytes in binary deliverables are replaced.
+
+        Raises:
+            KeyError: If there is no submission for (model_name, job_id)
+        """
+        return self.read_bytes(model_name, job_id).decode('utf-8', errors='replace')
+
+    def _refresh_manifest(self) -> None:
+        """Read manifest lines appended since the last refresh."""
+        if not os.path.exists(self.manifest_path):
+            return
+        with self._manifest_lock:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                f.seek(self._manifest_offset)
+                while True:
+                    line = f.readline()
+                    if not line.endswith('\n'):
+                        break
+                    self._manifest_offset = f.tell()
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line torn by a crash, with the next append glued on; the
+                        # manifest is only a cache, so those files are hashed again
+                        continue
+                    self._manifest[(entry['model'], entry['job_id'])] = entry
+
+    def info(self, model_name: str, job_id: int) -> SubmissionInfo:
+        """
+        Returns the size and content hash of a submission.
+
+        The recorded hash is used when the file's size and mtime still match the
+        manifest, so unchanged outputs are not re-read; otherwise the file is hashed.
+
+        Raises:
+            KeyError: If there is no submission for (model_name, job_id)
+        """
+        filepath = self._filepath(model_name, job_id)
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            raise KeyError(f"No submission for model {model_name} and job ID {job_id}") from None
+        key = (model_name, int(job_id))
+        self._refresh_manifest()
+        entry = self._manifest.get(key)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return SubmissionInfo(entry['size'], entry['sha256'])
+        with open(filepath, 'rb') as f:
+            return _digest_fd(f.fileno(), stat.st_size)[0]
+
+    def close(self) -> None:
+        pass
+
+# Segment record layout: header | model name (UTF-8) | payload
+#   header = magic, model name length, job ID, payload length, CRC32 of payload
+_RECORD_MAGIC = b'SUB1'
+_RECORD_HEADER = struct.Struct('<4sHqQI')
+
+class SegmentSubmissionStore:
+    def __init__(self, save_dir: str, max_segment_bytes: int = 256 * 1024 * 1024,
+                 commit_delay: float = 0.002):
+        """
+        Append-only packed submission layout.
+
+        Submissions are appended as records to segment files under save_dir/segments,
+        with a JSON-lines index per segment mapping (model_name, job_id) to the record.
+        Each process writes to its own segments, so concurrent processes never
+        interleave, and the latest record for a key wins when reading.
+
+        Writers wait until their record is durable, but one fsync covers every record
+        appended since the previous one (group commit), so concurrent submitters share
+        disk flushes instead of serializing on them.
+
+        Args:
+            save_dir (str): Directory to keep the segments directory in
+            max_segment_bytes (int): Size after which a new segment file is started
+            commit_delay (float): Seconds a committing writer waits for others to join its fsync
+        """
+        self.save_dir = save_dir
+        self.segment_dir = os.path.join(save_dir, 'segments')
+        self.max_segment_bytes = max_segment_bytes
+        self.commit_delay = commit_delay
+
+        # Writer state, guarded by _write_lock
+        self._write_lock = threading.Lock()
+        self._segment = None
+        self._index_file = None
+        self._segment_path: Optional[str] = None
+        self._segment_count = 0
+        self._written_seq = 0
+
+        # Group commit state, guarded by _commit_cond
+        self._commit_cond = threading.Condition()
+        self._durable_seq = 0
+        self._committing = False
+
+        # Reader state: key -> (segment path, payload offset, payload length, sha256)
+        self._read_lock = threading.Lock()
+        self._index: Dict[Tuple[str, int], Tuple[str, int, int, Optional[str]]] = {}
+        self._index_offsets: Dict[str, int] = {}
+
+    def _open_segment(self) -> None:
+        """Start a new segment and its index; called with _write_lock held."""
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self._close_segment()
+        self._segment_count += 1
+        # Time-first names so sorting segments approximates write order across processes
+        name = f"seg-{time.time_ns():020d}-{os.getpid()}-{self._segment_count:04d}"
+        self._segment_path = os.path.join(self.segment_dir, name + '.log')
+        # Unbuffered and not O_APPEND, so kernel copies can write straight into the segment
+        self._segment = open(self._segment_path, 'wb', buffering=0)
+        self._index_file = open(os.path.join(self.segment_dir, name + '.idx'), 'a', encoding='utf-8')
+
+    def _close_segment(self) -> None:
+        if self._segment is not None:
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self._segment.close()
+            self._index_file.flush()
+            os.fsync(self._index_file.fileno())
+            self._index_file.close()
+            self._segment = None
+            self._index_file = None
+
+    def write(self, model_name: str, job_id: int, output: SubmissionOutput) -> str:
+        """
+        Append a submission and wait until it is durable.
+
+        In-memory outputs are appended directly. Local files are hashed through an mmap
+        and copied into the segment in the kernel. Streams and iterables are first
+        spooled to a temporary file chunk by chunk, so a slow producer never holds the
+        segment lock.
+
+        Returns:
+            str: Locator of the record, as segment_path#offset
+        """
+        model = model_name.encode('utf-8')
+        spool_path = None
+        try:
+            if isinstance(output, (str, bytes, bytearray, memoryview)):
+                payload = output.encode('utf-8') if isinstance(output, str) else output
+                sha = hashlib.sha256(payload).hexdigest()
+                info, crc, source = SubmissionInfo(len(payload), sha), zlib.crc32(payload), None
+            elif isinstance(output, os.PathLike):
+                source = os.fspath(output)
+                with open(source, 'rb') as src:
+                    info, crc = _digest_fd(src.fileno(), os.fstat(src.fileno()).st_size)
+            else:
+                os.makedirs(self.segment_dir, exist_ok=True)
+                spool_path = os.path.join(self.segment_dir, f".spool-{os.getpid()}-{threading.get_ident()}.tmp")
+                fd = os.open(spool_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                try:
+                    info, crc = write_output(output, fd)
+                finally:
+                    os.close(fd)
+                source = spool_path
+
+            header = _RECORD_HEADER.pack(_RECORD_MAGIC, len(model), int(job_id), info.size, crc)
+            with self._write_lock:
+                if self._segment is None or self._segment.tell() >= self.max_segment_bytes:
+                    self._open_segment()
+                offset = self._segment.tell()
+                segment_fd = self._segment.fileno()
+                if source is None:
+                    _write_all(segment_fd, header + model + payload)
+                else:
+                    _write_all(segment_fd, header + model)
+                    with open(source, 'rb') as src:
+                        _kernel_copy(src.fileno(), segment_fd, info.size)
+                payload_offset = offset + len(header) + len(model)
+                self._index_file.write(json.dumps({'model': model_name, 'job_id': int(job_id), 'offset': payload_offset,
+                                                   'length': info.size, 'sha256': info.sha256}) + '\n')
+                self._written_seq += 1
+                seq = self._written_seq
+                segment_path = self._segment_path
+        finally:
+            if spool_path is not None and os.path.exists(spool_path):
+                os.unlink(spool_path)
+
+        self._wait_durable(seq)
+        return f"{segment_path}#{offset}"
+
+    def _wait_durable(self, seq: int) -> None:
+        """Block until record seq is fsynced, leading a group commit if none is running."""
+        with self._commit_cond:
+            while self._durable_seq < seq and self._committing:
+                self._commit_cond.wait()
+            if self._durable_seq >= seq:
+                return
+            self._committing = True
+            target = self._durable_seq
+
+        try:
+            # Give concurrent writers a moment to append so one fsync covers them all
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            with self._write_lock:
+                written_seq = self._written_seq
+                fds = []
+                # A closed segment was already fsynced by _close_segment
+                if self._segment is not None:
+                    self._segment.flush()
+                    self._index_file.flush()
+                    # Duplicate the fds so writers can keep appending, or roll over, during the fsync
+                    fds = [os.dup(self._segment.fileno()), os.dup(self._index_file.fileno())]
+            try:
+                for fd in fds:
+                    os.fsync(fd)
+            finally:
+                for fd in fds:
+                    os.close(fd)
+            target = written_seq
+        finally:
+            with self._commit_cond:
+                self._committing = False
+                self._durable_seq = max(self._durable_seq, target)
+                self._commit_cond.notify_all()
+
+    def _refresh_index(self) -> None:
+        """Read index lines added since the last refresh, in segment order."""
+        if not os.path.isdir(self.segment_dir):
+            return
+        with self._read_lock:
+            for name in sorted(os.listdir(self.segment_dir)):
+                if not name.endswith('.idx'):
+                    continue
+                index_path = os.path.join(self.segment_dir, name)
+                segment_path = index_path[:-len('.idx')] + '.log'
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    f.seek(self._index_offsets.get(index_path, 0))
+                    while True:
+                        line = f.readline()
+                        # Stop at a partially written line; it is picked up on the next refresh
+                        if not line.endswith('\n'):
+                            break
+                        entry = json.loads(line)
+                        self._index[(entry['model'], entry['job_id'])] = (
+                            segment_path, entry['offset'], entry['length'], entry.get('sha256'))
+                        self._index_offsets[index_path] = f.tell()
+
+    def keys(self) -> List[Tuple[str, int]]:
+        """Returns (model_name, job_id) for every submission in the store."""
+        self._refresh_index()
+        return list(self._index)
+
+    def _lookup(self, model_name: str, job_id: int) -> Tuple[str, int, int, Optional[str]]:
+        key = (model_name, int(job_id))
+        if key not in self._index:
+            self._refresh_index()
+        if key not in self._index:
+            raise KeyError(f"No submission for model {model_name} and job ID {job_id}")
+        return self._index[key]
+
+    def read_bytes(self, model_name: str, job_id: int) -> bytes:
+        """
+        Returns the raw content of the latest submission for (model_name, job_id).
+
+        Raises:
+            KeyError: If there is no submission for (model_name, job_id)
+            ValueError: If the record fails its checksum
+        """
+        segment_path, offset, length, _ = self._lookup(model_name, job_id)
+        model_len = len(model_name.encode('utf-8'))
+        with open(segment_path, 'rb') as f:
+            f.seek(offset - model_len - _RECORD_HEADER.size)
+            magic, _, _, payload_len, crc = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+            f.seek(model_len, os.SEEK_CUR)
+            payload = f.read(length)
+        if magic != _RECORD_MAGIC or payload_len != length or zlib.crc32(payload) != crc:
+            raise ValueError(f"Corrupt submission record for model {model_name} and job ID {job_id}")
+        return payload
+
+    def read(self, model_name: str, job_id: int) -> str:
+        """
+        Returns the text of the latest submission; undecodable bytes in binary deliverables are replaced.
+
+        Raises:
+            KeyError: If there is no submission for (model_name, job_id)
+            ValueError: If the record fails its checksum
+        """
+        return self.read_bytes(model_name, job_id).decode('utf-8', errors='replace')
+
+    def info(self, model_name: str, job_id: int) -> SubmissionInfo:
+        """
+        Returns the size and content hash recorded in the index, without reading the payload.
+
+        Raises:
+            KeyError: If there is no submission for (model_name, job_id)
+        """
+        _, _, length, sha256 = self._lookup(model_name, job_id)
+        if sha256 is None:
+            sha256 = hashlib.sha256(self.read_bytes(model_name, job_id)).hexdigest()
+        return SubmissionInfo(length, sha256)
+
+    def close(self) -> None:
+        """Flush, fsync and close the current segment."""
+        with self._write_lock:
+            self._close_segment()
+
+# Submission layouts selectable by name
+SUBMISSION_BACKENDS = {
+    'files': FileSubmissionStore,
+    'segments': SegmentSubmissionStore,
+}
+
+def open_submission_store(save_dir: str, backend: str = 'files'):
+    """
+    Open a submission store with the given layout.
+
+    Args:
+        save_dir (str): Directory holding the submissions
+        backend (str): 'files' for one file per submission, 'segments' for packed segments
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend not in SUBMISSION_BACKENDS:
+        raise ValueError(f"Unknown submission backend {backend}; expected one of {sorted(SUBMISSION_BACKENDS)}")
+    return SUBMISSION_BACKENDS[backend](save_dir)
+
+def detect_submission_stores(save_dir: str) -> list:
+    """
+    Returns a reader for every submission layout present in a directory.
+
+    Args:
+        save_dir (str): Directory holding the submissions
+
+    Returns:
+        list: FileSubmissionStore, plus SegmentSubmissionStore if save_dir/segments exists
+    """
+    stores = [FileSubmissionStore(save_dir)]
+    if os.path.isdir(os.path.join(save_dir, 'segments')):
+        stores.append(SegmentSubmissionStore(save_dir))
+    return stores
@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+from typing import Any, List
+import numpy as np
+from agent.basic_llm import BasicLLMAgent
+from agent.verifier_simple import SimpleVerifier
+from api.data import AgentArenaData, METADATA_COLUMNS
+from utils.llm_backend import ModelBackend, OpenAIBackend
+from utils.rate_limiter import configure_limiter
+from utils.stub_llm_server import StubLLMServer
+
+class TimedBackend(ModelBackend):
+    def __init__(self, backend: ModelBackend):
+        """Backend wrapper recording the latency of every successful call."""
+        self.backend = backend
+        self.supports_n = backend.supports_n
+        self.latencies: List[float] = []
+
+    def create(self, **request) -> Any:
+        start = time.perf_counter()
+        response = self.backend.create(**request)
+        self.latencies.append(time.perf_counter() - start)
+        return response
+
+def start_stub_server(**options) -> StubLLMServer:
+    """Start a StubLLMServer on a free port in a background thread and wait until it listens."""
+    server = StubLLMServer(**options)
+    started = threading.Event()
+
+    def run():
+        async def serve():
+            ready = asyncio.Event()
+            task = asyncio.create_task(server.serve(port=0, ready=ready))
+            await ready.wait()
+            started.set()
+            await task
+        asyncio.run(serve())
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return server
+
+def report(stage: str, count: int, elapsed: float, latencies: List[float]) -> None:
+    print(f"\n{stage}: {count:,} calls in {elapsed:.2f}s ({count / elapsed:,.1f} calls/s)")
+    if latencies:
+        ms = np.array(latencies) * 1000
+        print(f"Call latency ms: p50 {np.percentile(ms, 50):.1f}, p95 {np.percentile(ms, 95):.1f}, "
+              f"p99 {np.percentile(ms, 99):.1f}, max {ms.max():.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure agent and verifier throughput against a local stub LLM")
+    parser.add_argument('csv_path', help="Path to the cleaned CSV file or .arena job store")
+    parser.add_argument('--jobs', type=int, default=500, help="Number of jobs to consider")
+    parser.add_argument('--max-in-flight', type=int, default=32)
+    parser.add_argument('--latency', default='lognormal:0.05,0.5', help="See utils.stub_llm_server.parse_latency")
+    parser.add_argument('--token-delay', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--stream', action='store_true', help="Stream agent completions")
+    parser.add_argument('--url', help="Use an already running OpenAI-compatible server instead of starting one")
+    args = parser.parse_args()
+
+    if args.url:
+        base_url = args.url
+    else:
+        server = start_stub_server(latency=args.latency, token_delay=args.token_delay, error_rate=args.error_rate,
+                                   rate_limit_rate=args.rate_limit_rate)
+        base_url = f"http://127.0.0.1:{server.port}/v1"
+    # Limits high enough that only the harness and the injected faults slow things down
+    for model in ('gpt-4o-mini', 'gpt-4o'):
+        configure_limiter(model, requests_per_minute=1_000_000, tokens_per_minute=1_000_000_000,
+                          max_concurrency=args.max_in_flight, base_delay=0.05)
+
+    data = AgentArenaData(args.csv_path)
+    job_ids = data.query(limit=args.jobs)
+    jobs = [data.get_jobs(job_ids, columns=['ID'] + METADATA_COLUMNS + ['DESCRIPTION'])]
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        backend = TimedBackend(OpenAIBackend(base_url=base_url))
+        agent = BasicLLMAgent(None, data, max_in_flight=args.max_in_flight, seed=0, stream=args.stream, backend=backend)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent.process_jobs(output_dir, jobs=jobs)
+        report("Agent", len(backend.latencies), time.perf_counter() - start, backend.latencies)
+        submitted = sum(name.startswith('output_') for name in os.listdir(output_dir))
+        print(f"Submitted {submitted:,} of {len(job_ids):,} jobs")
+
+        backend = TimedBackend(OpenAIBackend(base_url=base_url))
+        verifier = SimpleVerifier(None, data, backend=backend)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            verifier.process_outputs(output_dir)
+        report("Verifier", len(backend.latencies), time.perf_counter() - start, backend.latencies)
+
+if __name__ == "__main__":
+    main()
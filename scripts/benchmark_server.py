@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import random
+import threading
+import time
+import numpy as np
+from api.client import AgentArenaClient
+from api.data import AgentArenaData
+from api.server import ArenaServer
+
+def start_server(csv_path: str, output_root: str) -> ArenaServer:
+    """Start an ArenaServer on a free port in a background thread and wait until it listens."""
+    server = ArenaServer(AgentArenaData(csv_path), output_root)
+    started = threading.Event()
+
+    def run():
+        async def serve():
+            ready = asyncio.Event()
+            task = asyncio.create_task(server.serve(port=0, ready=ready))
+            await ready.wait()
+            started.set()
+            await task
+        asyncio.run(serve())
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return server
+
+def run_client(base_url: str, job_ids: list, duration: float, latencies: list, seed: int) -> None:
+    """Issue a mix of description, metadata and query requests until duration elapses."""
+    client = AgentArenaClient(base_url)
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        job_id = rng.choice(job_ids)
+        start = time.perf_counter()
+        roll = rng.random()
+        if roll < 0.7:
+            client.get_job_description(job_id)
+        elif roll < 0.9:
+            client.get_job_metadata(job_id)
+        else:
+            client.query({'BUDGET': (rng.uniform(0, 1000), None)}, limit=50)
+        latencies.append(time.perf_counter() - start)
+    client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test api.server with many concurrent clients")
+    parser.add_argument('csv_path', help="Path to the cleaned CSV file or .arena job store")
+    parser.add_argument('--url', help="Benchmark an already running server instead of starting one")
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.url:
+        base_url = args.url
+    else:
+        server = start_server(args.csv_path, output_root='output')
+        base_url = f"http://127.0.0.1:{server.port}"
+
+    job_ids = AgentArenaClient(base_url).query()
+    latencies_per_client = [[] for _ in range(args.clients)]
+    threads = [threading.Thread(target=run_client, args=(base_url, job_ids, args.duration, latencies, i))
+               for i, latencies in enumerate(latencies_per_client)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([lat for client_latencies in latencies_per_client for lat in client_latencies]) * 1000
+    print(f"\nClients: {args.clients}")
+    print(f"Requests: {len(latencies):,} in {elapsed:.1f}s ({len(latencies) / elapsed:,.0f} req/s)")
+    print(f"Latency ms: p50 {np.percentile(latencies, 50):.2f}, p95 {np.percentile(latencies, 95):.2f}, "
+          f"p99 {np.percentile(latencies, 99):.2f}, max {latencies.max():.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,31 @@
+import argparse
 import pandas as pd
-import openai
-import time
 from tqdm import tqdm
 import os
 from dotenv import load_dotenv
+from utils.llm_backend import OpenAIBackend
+from utils.llm_batch import BatchRunner
+from utils.llm_cache import ResponseCache
+from utils.prompt_budget import PromptBudget, Section
+from utils.rate_limiter import RateLimitExceeded
 
 # Load environment variables
 load_dotenv()
 
-# Set up OpenAI API key
-client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Default model backend: the OpenAI API, or any compatible server set in OPENAI_BASE_URL
+default_backend = OpenAIBackend(api_key=os.getenv('OPENAI_API_KEY'), base_url=os.getenv('OPENAI_BASE_URL'))
 
-def analyze_job_version(title, description, sector, experience_level, projected_value, skills):
-    """Analyze a job posting to determine its version (v1-v5) using GPT-4."""
+# Labels are a single word, so only the prompt needs budgeting
+prompt_budget = PromptBudget("gpt-4o", max_total_tokens=8000, max_output_tokens=10, min_output_tokens=10)
+
+def version_request(title, description, sector, experience_level, projected_value, skills):
+    """
+    Build the chat request classifying a job's version, with its description trimmed to fit the prompt budget.
+    
+    Returns a dict of keyword arguments for chat.completions.create.
+    """
     
-    prompt = f"""Analyze this job posting and classify it as v1, v2, v3, v4, or v5 based on the following criteria:
+    prompt_template = """Analyze this job posting and classify it as v1, v2, v3, v4, or v5 based on the following criteria:
 
 v1: Can be completed with just the job description and public files, no client clarification needed.  v1 jobs can not necessitate an ongoing relationship with the client.  There has to be a simple handoff of requirements and then a single returning of results.
 v2: Requires a few clarification questions but no proprietary data or ongoing interaction.  v2 jobs can not necessitate an ongoing relationship with the client (except for the few clarification questions).  There has to be a simple handoff of requirements and then a single returning of results.
@@ -31,23 +42,58 @@ Projected Value: {projected_value}
 Skills Required: {skills}
 
 Respond with ONLY the version number (v1, v2, v3, v4, or v5)."""
+    fields = dict(title=title, sector=sector, experience_level=experience_level,
+                  projected_value=projected_value, skills=skills)
+    system = {"role": "system", "content": "You are a job classification expert. Respond with only the version number."}
+    # Long descriptions are trimmed so the prompt fits the model's context window
+    fitted = prompt_budget.fit([system], [Section('description', str(description), priority=0)],
+                               fixed_text=prompt_template.format(description='', **fields))
+    prompt = prompt_template.format(description=fitted.texts['description'], **fields)
 
+    return dict(
+        model="gpt-4o",
+        messages=[system, {"role": "user", "content": prompt}],
+        temperature=0.3,
+        max_tokens=fitted.max_tokens
+    )
+
+def analyze_job_version(title, description, sector, experience_level, projected_value, skills, cache=None,
+                        backend=None):
+    """
+    Analyze a job posting to determine its version (v1-v5) using GPT-4.
+    
+    Returns None if the request was still throttled after all retries, so the job
+    is left unlabeled rather than marked as an error.
+    """
+    backend = backend or default_backend
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a job classification expert. Respond with only the version number."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=10
-        )
+        response = backend.complete(cache=cache, **version_request(title, description, sector, experience_level,
+                                                                   projected_value, skills))
         return response.choices[0].message.content.strip()
+    except RateLimitExceeded as e:
+        print(f"Rate limited, leaving job unlabeled: {e}")
+        return None
     except Exception as e:
         print(f"Error analyzing job: {e}")
         return "ERROR"
 
-def main():
+def label_versions_batch(df, batch):
+    """
+    Label every row's version through the batch API; rows without an answer yet are left as None.
+    
+    Custom IDs are taken from the ID column, or the row index if there is none, so
+    running again with the same batch work directory resumes where it stopped.
+    """
+    ids = df['ID'] if 'ID' in df.columns else df.index
+    requests = ((f"version-{job_id}", version_request(row['TITLE'], row['DESCRIPTION'], row['SECTOR'],
+                                                      row['EXPERIENCE_LEVEL'], row['PROJECTED_VALUE'],
+                                                      row['SKILLS_AND_EXPERTISE']))
+                for job_id, (_, row) in zip(ids, df.iterrows()))
+    answers = batch.run(requests)
+    return pd.Series([answers[f"version-{job_id}"].choices[0].message.content.strip()
+                      if f"version-{job_id}" in answers else None for job_id in ids], index=df.index)
+
+def main(batch_dir=None):
     # Read the CSV file
     print("Reading CSV file...")
     df = pd.read_csv('df_randomized.csv')
@@ -55,30 +101,38 @@ def main():
     # Limit to first 100 rows
     #df = df.head(100)
     
+    # Labels are cached so an interrupted run can be restarted without paying for finished rows
+    cache = ResponseCache()
+    
     # Add version column
     df['JOB_VERSION'] = None
     
-    # Process each row
+    # Process each row, through the batch API if asked, or one call at a time
     print("Analyzing job descriptions...")
-    for idx in tqdm(df.index):
-        row = df.iloc[idx]
-        version = analyze_job_version(
-            row['TITLE'],
-            row['DESCRIPTION'],
-            row['SECTOR'],
-            row['EXPERIENCE_LEVEL'],
-            row['PROJECTED_VALUE'],
-            row['SKILLS_AND_EXPERTISE']
-        )
-        df.at[idx, 'JOB_VERSION'] = version
-        
-        # Add a small delay to avoid rate limits
-        time.sleep(1)
+    if batch_dir is not None:
+        df['JOB_VERSION'] = label_versions_batch(df, BatchRunner(batch_dir, backend=default_backend, cache=cache))
+    else:
+        for idx in tqdm(df.index):
+            row = df.iloc[idx]
+            version = analyze_job_version(
+                row['TITLE'],
+                row['DESCRIPTION'],
+                row['SECTOR'],
+                row['EXPERIENCE_LEVEL'],
+                row['PROJECTED_VALUE'],
+                row['SKILLS_AND_EXPERTISE'],
+                cache=cache
+            )
+            df.at[idx, 'JOB_VERSION'] = version
     
     # Save the results
     print("Saving results...")
     df.to_csv('df_randomized_versioned.csv', index=False)
     print("Done!")
+    print(f"LLM cache: {cache.stats()}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Classify the version of every job in df_randomized.csv")
+    parser.add_argument('--batch-dir', help="Label through the batch API, keeping batch files in this directory")
+    args = parser.parse_args()
+    main(args.batch_dir)
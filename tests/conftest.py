@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+SECTORS = ['Design', 'Writing', 'Development']
+
+def make_jobs(num_jobs: int = 20, first_id: int = 0) -> pd.DataFrame:
+    """Small dataset in the cleaned CSV layout; every third job is hourly."""
+    ids = range(first_id, first_id + num_jobs)
+    return pd.DataFrame({
+        'ID': list(ids),
+        'TITLE': [f"Job {i} build a {'logo' if i % 2 else 'website'}" for i in ids],
+        'DESCRIPTION': [f"Please build a python scraper for client {i}. " * (1 + i % 3) + ('é' * (i % 4)) for i in ids],
+        'SECTOR': [SECTORS[i % 3] for i in ids],
+        'SKILLS_AND_EXPERTISE': ['Python, Scraping' if i % 2 else 'Illustrator' for i in ids],
+        'EXPERIENCE_LEVEL': ['Expert' if i % 2 else 'Intermediate' for i in ids],
+        'HOURLY_LOW': [20.0 if i % 3 == 0 else None for i in ids],
+        'HOURLY_HIGH': [40.0 if i % 3 == 0 else None for i in ids],
+        'BUDGET': [None if i % 3 == 0 else 100.0 + i for i in ids],
+        'COUNTRY': ['Germany' for _ in ids],
+    })
+
+@pytest.fixture
+def jobs_csv(tmp_path) -> str:
+    path = tmp_path / 'jobs.csv'
+    make_jobs().to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture(scope='module')
+def stub_server():
+    """A utils.stub_llm_server on a free port, shared by a module's tests."""
+    from scripts.benchmark_pipeline import start_stub_server
+    return start_stub_server()
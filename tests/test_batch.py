@@ -0,0 +1,89 @@
+import json
+import os
+import pandas as pd
+import pytest
+from agent.verdicts import VERDICTS_FILENAME, VerdictStore
+from agent.verifier_simple import SimpleVerifier
+from api.data import AgentArenaData
+from api.submissions import FileSubmissionStore
+from scripts.benchmark_pipeline import start_stub_server
+from utils.llm_backend import OpenAIBackend
+from utils.llm_batch import STATE_FILENAME, BatchRunner
+
+def _requests(count: int):
+    return [(f"req-{i}", {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': f"Answer YES or NO: {i}"}],
+                          'max_tokens': 5}) for i in range(count)]
+
+def _backend(server) -> OpenAIBackend:
+    return OpenAIBackend(base_url=f"http://127.0.0.1:{server.port}/v1")
+
+class InterruptedBackend(OpenAIBackend):
+    """Crashes the process, as far as BatchRunner can tell, right before submitting."""
+
+    def submit_batch(self, path: str, completion_window: str = '24h') -> str:
+        raise KeyboardInterrupt
+
+@pytest.fixture(scope='module')
+def slow_server():
+    return start_stub_server(batch_delay=0.3)
+
+def test_batches_left_running_are_picked_up_by_a_new_runner(tmp_path, slow_server):
+    work_dir = str(tmp_path / 'batches')
+    batches = slow_server.stats['batches']
+    answers = BatchRunner(work_dir, backend=_backend(slow_server)).run(_requests(5), wait=False)
+    assert answers == {}
+
+    runner = BatchRunner(work_dir, backend=_backend(slow_server), poll_interval=0.05)
+    answers = runner.run(_requests(5))
+    assert sorted(answers) == [f"req-{i}" for i in range(5)]
+    assert all(answer.choices[0].message.content in ('YES', 'NO') for answer in answers.values())
+    assert slow_server.stats['batches'] == batches + 1
+    # Answers are read back from the downloaded files without asking again
+    assert BatchRunner(work_dir, backend=_backend(slow_server)).run(_requests(5), wait=False).keys() == answers.keys()
+    assert slow_server.stats['batches'] == batches + 1
+
+def test_requests_written_before_a_crash_are_submitted_once(tmp_path, stub_server):
+    work_dir = str(tmp_path / 'batches')
+    with pytest.raises(KeyboardInterrupt):
+        BatchRunner(work_dir, backend=InterruptedBackend(base_url=f"http://127.0.0.1:{stub_server.port}/v1")).run(
+            _requests(3))
+    with open(os.path.join(work_dir, STATE_FILENAME), 'r', encoding='utf-8') as f:
+        assert [entry['batch_id'] for entry in json.load(f)['batches']] == [None]
+
+    batches = stub_server.stats['batches']
+    runner = BatchRunner(work_dir, backend=_backend(stub_server), poll_interval=0.05)
+    assert len(runner.run(_requests(3))) == 3
+    assert len(runner.batches) == 1 and stub_server.stats['batches'] == batches + 1
+
+def test_failed_requests_are_sent_again(tmp_path):
+    server = start_stub_server(error_rate=0.5, seed=1)
+    work_dir = str(tmp_path / 'batches')
+    runner = BatchRunner(work_dir, backend=_backend(server), poll_interval=0.05)
+    answers = runner.run(_requests(10))
+    failed = set(runner.errors)
+    assert failed and len(answers) + len(failed) == 10
+
+    server.error_rate = 0.0
+    runner = BatchRunner(work_dir, backend=_backend(server), poll_interval=0.05)
+    assert len(runner.run(_requests(10))) == 10
+    assert set(runner.batches[-1]['custom_ids']) == failed
+
+def test_verifier_fills_in_batch_verdicts_on_a_later_run(jobs_csv, tmp_path, slow_server):
+    data = AgentArenaData(jobs_csv, use_store=False)
+    output_dir = str(tmp_path / 'out')
+    submissions = FileSubmissionStore(output_dir)
+    for job_id in range(3):
+        submissions.write('model-a', job_id, f"Output for job {job_id}")
+    submissions.close()
+    verifier = SimpleVerifier('unused', data, backend=_backend(slow_server))
+
+    def grade(wait):
+        batch = BatchRunner(str(tmp_path / 'batches'), backend=_backend(slow_server), poll_interval=0.05)
+        verifier.process_outputs(output_dir, batch=batch, wait=wait)
+        return pd.read_csv(os.path.join(output_dir, 'results.csv'), index_col='jobID')
+
+    assert grade(wait=False)['model-a'].isna().all()
+    assert grade(wait=True)['model-a'].isin(['win', 'fail']).all()
+    store = VerdictStore(os.path.join(output_dir, VERDICTS_FILENAME))
+    assert len(store.verdicts) == 3
+    store.close()
@@ -0,0 +1,78 @@
+import json
+import os
+from agent.basic_llm import BasicLLMAgent
+from agent.journal import DONE, FAILED, SKIP, TAKE, RunJournal
+from agent.scheduler import RandomPolicy
+from api.data import AgentArenaData
+from utils.llm_backend import OpenAIBackend
+
+def _tear_tail(path: str, keep: int) -> None:
+    with open(path, 'rb') as f:
+        data = f.read()
+    start = data.rstrip(b'\n').rfind(b'\n') + 1
+    with open(path, 'wb') as f:
+        f.write(data[:start + keep])
+
+def test_resume_replays_decisions_and_outcomes(tmp_path):
+    path = str(tmp_path / 'run_journal.jsonl')
+    journal = RunJournal(path, resume=False)
+    journal.record(1, TAKE)
+    journal.record(2, SKIP)
+    journal.record(3, TAKE)
+    journal.record(1, DONE, path='out/1.txt')
+    journal.record(3, FAILED, error='timeout')
+    journal.close()
+
+    resumed = RunJournal(path)
+    assert resumed.decision(1) is True and resumed.decision(2) is False and resumed.decision(4) is None
+    assert resumed.is_completed(1) and not resumed.is_completed(3)
+    assert resumed.failed == {3: 'timeout'}
+    resumed.close()
+    assert RunJournal(path, resume=False).decisions == {}
+
+def test_torn_tail_survives_repeated_resumes(tmp_path):
+    path = str(tmp_path / 'run_journal.jsonl')
+    journal = RunJournal(path, resume=False)
+    journal.record(1, TAKE)
+    journal.record(2, TAKE)
+    journal.close()
+    _tear_tail(path, 10)
+
+    journal = RunJournal(path)
+    assert journal.decision(1) is True and journal.decision(2) is None
+    journal.record(3, TAKE)
+    journal.close()
+    journal = RunJournal(path)
+    assert journal.decision(3) is True
+    journal.close()
+    with open(path, 'r', encoding='utf-8') as f:
+        assert [json.loads(line)['job_id'] for line in f] == [1, 3]
+
+def test_undecodable_lines_are_skipped(tmp_path):
+    path = str(tmp_path / 'run_journal.jsonl')
+    with open(path, 'wb') as f:
+        f.write(b'{"job_id": 1, "event": "take"}\n{"job_id": 2, "ev{"job_id": 3, "event": "take"}\n\xff\xfe\n'
+                b'{"job_id": 4, "event": "skip"}\n')
+    journal = RunJournal(path)
+    assert journal.decisions == {1: True, 4: False}
+    journal.close()
+
+def test_agent_resumes_after_crash_mid_write(jobs_csv, tmp_path, stub_server):
+    data = AgentArenaData(jobs_csv, use_store=False)
+    output_dir = str(tmp_path / 'out')
+    journal_path = os.path.join(output_dir, 'run_journal.jsonl')
+
+    def agent():
+        return BasicLLMAgent('unused', data, backend=OpenAIBackend(base_url=f"http://127.0.0.1:{stub_server.port}/v1"),
+                             policy=RandomPolicy(1.0), max_in_flight=4)
+
+    agent().process_jobs(output_dir)
+    _tear_tail(journal_path, 7)
+    requests = stub_server.stats['requests']
+    agent().process_jobs(output_dir, resume=True)
+    agent().process_jobs(output_dir, resume=True)
+    # Only the job whose completion was torn off is worked on again
+    assert stub_server.stats['requests'] == requests + 1
+    journal = RunJournal(journal_path)
+    assert len(journal.completed) == data.get_num_jobs()
+    journal.close()
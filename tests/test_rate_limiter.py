@@ -0,0 +1,92 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from utils.prompt_budget import get_token_counter
+from utils.rate_limiter import RateLimiter, RateLimitExceeded, estimate_tokens, is_retryable, retry_after
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+def _limiter(**options) -> RateLimiter:
+    return RateLimiter(requests_per_minute=60_000, tokens_per_minute=10_000_000, base_delay=0.001, **options)
+
+def test_retryable_errors():
+    assert is_retryable(_StatusError(429)) and is_retryable(_StatusError(503)) and is_retryable(_StatusError(408))
+    assert not is_retryable(_StatusError(400)) and not is_retryable(ValueError("bad"))
+    assert retry_after(_StatusError(429, {'retry-after-ms': '250'})) == 0.25
+    assert retry_after(_StatusError(429, {'retry-after': '2'})) == 2.0
+
+def test_retries_transient_errors_then_succeeds():
+    limiter = _limiter()
+    failures = [_StatusError(503), _StatusError(429, {'retry-after': '0'})]
+
+    def flaky():
+        if failures:
+            raise failures.pop(0)
+        return 'ok'
+
+    assert limiter.call(flaky) == 'ok'
+    assert limiter.retries == 2 and limiter.throttled == 1 and limiter.calls == 3
+
+def test_gives_up_after_max_retries_and_raises_other_errors_at_once():
+    limiter = _limiter(max_retries=2)
+
+    def fail(status_code):
+        raise _StatusError(status_code)
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.call(fail, 500)
+    assert limiter.calls == 3
+    with pytest.raises(_StatusError):
+        limiter.call(fail, 400)
+    assert limiter.calls == 4
+
+def test_concurrency_stays_within_limit():
+    limiter = _limiter(max_concurrency=3, min_concurrency=3)
+    lock = threading.Lock()
+    in_flight, peak = 0, 0
+
+    def work():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+
+    threads = [threading.Thread(target=limiter.call, args=(work,)) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak <= 3
+
+def test_stream_holds_its_slot_until_consumed():
+    limiter = _limiter(max_concurrency=1, min_concurrency=1)
+    stream = limiter.call(lambda stream: iter(['a', 'b']), stream=True)
+    assert limiter._in_flight == 1
+    assert list(stream) == ['a', 'b']
+    assert limiter._in_flight == 0
+
+    limiter.call(lambda stream: iter(['a']), stream=True).close()
+    assert limiter._in_flight == 0
+
+def test_usage_reconciles_the_token_estimate():
+    limiter = RateLimiter(tokens_per_minute=1000)
+    limiter.call(lambda: SimpleNamespace(usage=SimpleNamespace(total_tokens=100)), estimated_tokens=400)
+    assert limiter.tokens.tokens == pytest.approx(900, abs=1)
+
+def test_estimate_matches_the_prompt_budget_counter():
+    messages = [{'role': 'system', 'content': 'You are a judge.'},
+                {'role': 'user', 'content': 'Please build a python scraper. ' * 50}]
+    counter = get_token_counter('gpt-4o')
+    assert estimate_tokens(messages, 100, 'gpt-4o') == counter.count_messages(messages) + 100
+
+def test_estimate_reserves_every_sampled_completion():
+    messages = [{'role': 'user', 'content': 'Is this output sufficient?'}]
+    assert estimate_tokens(messages, 10, 'gpt-4o', n=3) - estimate_tokens(messages, 10, 'gpt-4o') == 20
@@ -0,0 +1,91 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+from api.data import AgentArenaData
+from api.leaderboard import Leaderboard, bootstrap_sum
+from api.results import RESULT_COLUMNS, ResultsStore
+
+def _add_runs(path: str, worker: int) -> None:
+    store = ResultsStore(path)
+    for i in range(20):
+        store.add_many(pd.DataFrame({'model': ['a', 'b'], 'job_id': [i, i], 'win': [True, False]}),
+                       run=f"run-{worker}-{i}")
+    store.close()
+
+def test_add_many_only_bumps_seq_on_change(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    verdicts = pd.DataFrame({'model': ['a', 'a', 'b'], 'job_id': [1, 2, 1], 'win': ['win', 'fail', 'win']})
+    assert store.add_many(verdicts, run='r') == 3
+    frame, seq = store.read()
+    assert list(frame.columns) == RESULT_COLUMNS
+    assert frame['win'].tolist() == [True, False, True]
+
+    assert store.add_many(verdicts, run='r') == 0
+    assert store.read(since=seq)[0].empty
+    assert store.add('r', 'a', 2, True, verifier='gpt-4o') == 1
+    changed, last = store.read(since=seq)
+    assert changed[['model', 'job_id', 'win', 'verifier']].values.tolist() == [['a', 2, True, 'gpt-4o']]
+    assert last > seq
+    store.close()
+
+def test_failed_add_many_leaves_store_unchanged(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    store.add('r', 'a', 1, True)
+    with pytest.raises(Exception):
+        store.add_many(pd.DataFrame({'model': ['a', 'a'], 'job_id': [2, 3], 'win': [1, 0],
+                                     'graded_at': [1.0, None]}), run='r')
+    assert len(store.read()[0]) == 1
+    assert store.add('r', 'a', 2, False) == 1
+    store.close()
+
+def test_import_results_csv_skips_blank_cells(tmp_path):
+    run_dir = tmp_path / 'run-1'
+    run_dir.mkdir()
+    pd.DataFrame({'jobID': [1, 2], 'a': ['win', 'fail'], 'b': ['fail', None]}).to_csv(run_dir / 'results.csv',
+                                                                                         index=False)
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    assert store.import_results_csv(str(run_dir / 'results.csv')) == 3
+    wide = store.to_wide('run-1')
+    assert wide.loc[1, 'a'] == 'win' and wide.loc[1, 'b'] == 'fail' and pd.isna(wide.loc[2, 'b'])
+    store.close()
+
+def test_concurrent_writers_get_distinct_seqs(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    ResultsStore(path).close()
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_add_runs, [path] * 4, range(4)))
+    store = ResultsStore(path)
+    frame, _ = store.read()
+    assert len(frame) == 4 * 20 * 2
+    assert frame['seq'].is_unique
+    store.close()
+
+def test_leaderboard_refresh_reads_only_new_verdicts(jobs_csv, tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    leaderboard = Leaderboard(store, AgentArenaData(jobs_csv, use_store=False), n_boot=200)
+    store.add_many(pd.DataFrame({'model': ['a', 'a', 'b', 'b'], 'job_id': [0, 1, 0, 1],
+                                 'win': [True, True, False, True]}), run='r')
+    assert leaderboard.refresh() == 4
+    assert leaderboard.refresh() == 0
+    store.add('r', 'b', 0, True)
+    assert leaderboard.refresh() == 1
+
+    table = leaderboard.table().set_index('model')
+    # Job 0 is hourly, 20-40 for 10 hours; job 1 has a budget of 101
+    assert table.loc['a', 'earnings'] == table.loc['b', 'earnings'] == 300.0 + 101.0
+    assert table.loc['b', 'wins'] == 2 and table.loc['b', 'win_rate'] == 1.0
+    assert table.loc['a', 'earnings_share'] == 1.0
+    by_sector = leaderboard.table(by='SECTOR')
+    assert set(by_sector['SECTOR']) == {'Design', 'Writing'}
+    store.close()
+
+def test_bootstrap_sum_keeps_total_and_handles_edge_cases():
+    rng = np.random.default_rng(0)
+    values = np.array([0.0, 0.0, 10.0, 10.0, 30.0])
+    sums = bootstrap_sum(values, 2000, rng)
+    assert sums.shape == (2000,)
+    assert abs(sums.mean() - values.sum()) < 2.0
+    assert set(np.unique(sums) % 10) == {0.0}
+    assert (bootstrap_sum(np.array([]), 5, rng) == 0).all()
+    assert (bootstrap_sum(np.full(4, 2.5), 5, rng) == 10.0).all()
@@ -0,0 +1,56 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from agent.scheduler import ExpectedValuePolicy, RandomPolicy, SelectionPolicy
+from api.data import DESCRIPTION_LENGTH, METADATA_COLUMNS, AgentArenaData, iter_jobs
+from api.store import convert_csv_to_store
+
+def test_selection_policy_is_abstract():
+    with pytest.raises(TypeError):
+        SelectionPolicy()
+
+def test_description_length_is_utf8_bytes_from_every_source(jobs_csv):
+    expected = pd.read_csv(jobs_csv)['DESCRIPTION'].str.encode('utf-8').str.len().tolist()
+    columns = ['ID', DESCRIPTION_LENGTH]
+    from_frame = AgentArenaData(jobs_csv, use_store=False).get_jobs(range(20), columns)
+    convert_csv_to_store(jobs_csv)
+    store_data = AgentArenaData(jobs_csv)
+    assert store_data._store is not None
+    from_store = store_data.get_jobs(range(20), columns)
+    from_csv = pd.concat(iter_jobs(jobs_csv, batch_size=7, columns=columns))
+    for frame in (from_frame, from_store, from_csv):
+        assert frame[DESCRIPTION_LENGTH].tolist() == expected
+    # Multi-byte characters make bytes and characters differ
+    assert expected != pd.read_csv(jobs_csv)['DESCRIPTION'].str.len().tolist()
+
+def test_schedule_takes_best_ev_per_token_within_budget(jobs_csv):
+    data = AgentArenaData(jobs_csv, use_store=False)
+    policy = ExpectedValuePolicy(token_budget=5000, output_tokens=1000)
+    columns = ['ID'] + METADATA_COLUMNS + policy.columns
+    sources = {
+        'data': data.iter_jobs(batch_size=6, columns=columns),
+        'csv': iter_jobs(jobs_csv, batch_size=6, columns=columns),
+        'with descriptions': data.iter_jobs(batch_size=6),
+    }
+    schedules = {}
+    for name, batches in sources.items():
+        (taken, take), (skipped, skip) = policy.schedule(batches)
+        assert take.all() and not skip.any()
+        assert 'DESCRIPTION' not in taken.columns
+        assert sorted(taken['ID'].tolist() + skipped['ID'].tolist()) == list(range(20))
+        schedules[name] = taken['ID'].tolist()
+    assert schedules['data'] == schedules['csv'] == schedules['with descriptions']
+
+    jobs = data.get_jobs(range(20), columns)
+    scores = policy.score(jobs).set_index(jobs['ID'])
+    taken = scores.loc[schedules['data']]
+    assert taken['tokens'].sum() <= 5000 and len(taken) == 4
+    assert (np.diff(taken['priority'].to_numpy()) <= 0).all()
+    assert taken['priority'].min() >= scores.drop(index=schedules['data'])['priority'].max()
+
+def test_random_policy_is_reproducible(jobs_csv):
+    batches = list(AgentArenaData(jobs_csv, use_store=False).iter_jobs(batch_size=5, columns=['ID']))
+    first = [take.tolist() for _, take in RandomPolicy(0.5, random.Random(3)).schedule(batches)]
+    second = [take.tolist() for _, take in RandomPolicy(0.5, random.Random(3)).schedule(batches)]
+    assert first == second and len(first) == 4
@@ -0,0 +1,42 @@
+import pytest
+from api.search import JobSearchIndex, tokenize
+
+def test_tokenize_keeps_tech_terms_and_drops_stopwords():
+    assert tokenize("Build a Node.js and C++ app for the web") == ['build', 'node.js', 'c++', 'app', 'web']
+    assert tokenize(None) == []
+
+def test_search_ranks_by_bm25():
+    index = JobSearchIndex.build([1, 2, 3], [
+        "python scraper for product prices",
+        "logo design for a bakery",
+        "python python data pipeline in python",
+    ])
+    results = index.search("python", k=10)
+    assert [job_id for job_id, _ in results] == [3, 1]
+    assert results[0][1] > results[1][1] > 0
+    assert index.search("python", k=1)[0][0] == 3
+    assert index.search("nothing matches") == []
+
+def test_add_documents_merges_new_terms():
+    index = JobSearchIndex.build([1], ["python scraper"])
+    index.add_documents([2], ["rust scraper"])
+    assert [job_id for job_id, _ in index.search("rust")] == [2]
+    assert {job_id for job_id, _ in index.search("scraper")} == {1, 2}
+
+def test_rejected_add_leaves_index_unchanged():
+    index = JobSearchIndex.build([1], ["python scraper"])
+    with pytest.raises(ValueError):
+        index.add_documents([2, 3], ["kotlin app"])
+    with pytest.raises(ValueError):
+        index.add_documents([1], ["kotlin app"])
+    assert 'kotlin' not in index.vocab
+    assert len(index.term_ptr) == len(index.vocab) + 1
+    assert index.search("kotlin") == []
+    index.add_documents([2], ["kotlin app"])
+    assert [job_id for job_id, _ in index.search("kotlin")] == [2]
+
+def test_save_and_load_round_trip(tmp_path):
+    index = JobSearchIndex.build([1, 2], ["python scraper", "logo design"])
+    index.add_documents([3], ["python logo"])
+    loaded = JobSearchIndex.load(index.save(str(tmp_path / 'jobs.search.npz')))
+    assert loaded.search("python logo") == index.search("python logo")
@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import json
+import socket
+import threading
+import pytest
+from api.client import AgentArenaClient
+from api.data import AgentArenaData
+from api.server import GZIP_MIN_BYTES, ArenaServer
+from tests.conftest import make_jobs
+
+@pytest.fixture
+def server(jobs_csv, tmp_path):
+    data = AgentArenaData(jobs_csv, use_store=False)
+    server = ArenaServer(data, str(tmp_path))
+    loop = asyncio.new_event_loop()
+    started = asyncio.Event()
+    task = loop.create_task(server.serve(port=0, ready=started))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(started.wait(), loop).result(5)
+    yield server
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(5)
+
+def _raw(server, request: bytes) -> tuple:
+    """Send raw bytes and return the status, lowercased headers and body of the response."""
+    with socket.create_connection(('127.0.0.1', server.port), timeout=5) as sock:
+        sock.sendall(request)
+        response = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+    head, _, body = response.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict((name.strip().lower(), value.strip()) for name, value in (line.split(':', 1) for line in lines[1:]))
+    return int(lines[0].split(' ')[1]), headers, body
+
+def _get(server, path: str, **headers) -> tuple:
+    lines = [f"GET {path} HTTP/1.1", "Host: test", "Connection: close"]
+    lines += [f"{name.replace('_', '-')}: {value}" for name, value in headers.items()]
+    return _raw(server, ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+@pytest.mark.parametrize('length', ['abc', '-5', '1.5'])
+def test_malformed_content_length_is_a_bad_request(server, length):
+    status, headers, body = _raw(server, (f"POST /query HTTP/1.1\r\nHost: test\r\nContent-Length: {length}\r\n\r\n{{}}"
+                                          ).encode('latin-1'))
+    assert status == 400
+    assert 'Content-Length' in json.loads(body)['error']
+    assert headers['connection'] == 'close'
+
+def test_error_statuses(server):
+    assert _get(server, '/jobs/999999')[0] == 404
+    assert _get(server, '/nowhere')[0] == 404
+    assert _get(server, '/jobs?offset=x')[0] == 400
+    assert _raw(server, b"DELETE /jobs/1 HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n")[0] == 405
+
+def test_etag_revalidation_and_gzip(server):
+    status, headers, body = _get(server, '/jobs?limit=20', accept_encoding='gzip')
+    assert status == 200 and len(gzip.decompress(body)) >= GZIP_MIN_BYTES
+    assert headers['content-encoding'] == 'gzip' and headers['etag'].endswith('-gz"')
+    assert _get(server, '/jobs?limit=20', accept_encoding='gzip', if_none_match=headers['etag'])[0] == 304
+    # The identity representation has its own tag
+    assert _get(server, '/jobs?limit=20', if_none_match=headers['etag'])[0] == 200
+
+def test_head_is_answered_like_get(server):
+    status, headers, body = _raw(server, b"HEAD /jobs/1 HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n")
+    get_status, get_headers, get_body = _get(server, '/jobs/1')
+    assert status == get_status == 200
+    assert body == b''
+    assert headers['content-length'] == str(len(get_body)) and headers['etag'] == get_headers['etag']
+
+def test_added_jobs_invalidate_etags_and_search(server):
+    etag = _get(server, '/jobs/count')[1]['etag']
+    status, headers, body = _get(server, '/search?q=unicorn')
+    assert status == 200 and 'etag' not in headers and json.loads(body)['results'] == []
+
+    new_jobs = make_jobs(1, first_id=100).assign(TITLE='Unicorn mascot design')
+    server.data.add_jobs(new_jobs)
+    status, _, body = _get(server, '/jobs/count', if_none_match=etag)
+    assert status == 200 and json.loads(body)['count'] == 21
+    assert [job_id for job_id, _ in json.loads(_get(server, '/search?q=unicorn')[2])['results']] == [100]
+
+def test_client_round_trip(server):
+    client = AgentArenaClient(f"http://127.0.0.1:{server.port}")
+    assert client.get_num_jobs() == 20
+    assert client.get_job_metadata(1).title == 'Job 1 build a logo'
+    assert client.get_job_description(2) == server.data.get_job_description(2)
+    with pytest.raises(KeyError):
+        client.get_job_metadata(999999)
+    path = client.submit_job('out', 'm1', 1, iter([b'chunked ', 'deliverable']))
+    with open(path, 'rb') as f:
+        assert f.read() == b'chunked deliverable'
+    client.close()
+
+def test_stub_llm_server_rejects_malformed_content_length(stub_server):
+    status, headers, body = _raw(stub_server, b"POST /v1/chat/completions HTTP/1.1\r\nHost: test\r\n"
+                                              b"Content-Length: -1\r\n\r\n")
+    assert status == 400
+    assert json.loads(body)['error']['type'] == 'invalid_request_error'
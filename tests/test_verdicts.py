@@ -0,0 +1,96 @@
+import json
+import os
+import pandas as pd
+from agent.verdicts import VERDICTS_FILENAME, VerdictStore
+from agent.verifier_simple import PROMPT_VERSION, VERIFIER_MODEL, SimpleVerifier
+from api.data import AgentArenaData
+from api.submissions import FileSubmissionStore
+from utils.llm_backend import OpenAIBackend
+
+def _tear_tail(path: str, keep: int) -> None:
+    with open(path, 'rb') as f:
+        data = f.read()
+    start = data.rstrip(b'\n').rfind(b'\n') + 1
+    with open(path, 'wb') as f:
+        f.write(data[:start + keep])
+
+def test_stored_verdict_is_invalidated_by_output_verifier_or_prompt(tmp_path):
+    store = VerdictStore(str(tmp_path / VERDICTS_FILENAME))
+    store.record('m', 1, 'abc', 'gpt-4o', 1, 'win')
+    assert store.get('m', 1, 'abc', 'gpt-4o', 1) == 'win'
+    assert store.get('m', 1, 'changed', 'gpt-4o', 1) is None
+    assert store.get('m', 1, 'abc', 'gpt-4o-mini', 1) is None
+    assert store.get('m', 1, 'abc', ('heuristics', 'gpt-4o'), 1) == 'win'
+    assert store.get('m', 1, 'abc', 'gpt-4o', 2) is None
+    assert store.get('other', 1, 'abc', 'gpt-4o', 1) is None
+    store.close()
+
+def test_latest_verdict_wins_and_log_is_compacted(tmp_path):
+    path = str(tmp_path / VERDICTS_FILENAME)
+    store = VerdictStore(path)
+    for i in range(5):
+        store.record('m', 1, f"v{i}", 'gpt-4o', 1, 'win' if i % 2 else 'lose')
+    store.record('m', 2, 'x', 'gpt-4o', 1, 'lose', votes=(2, 1))
+    store.close()
+
+    store = VerdictStore(path)
+    assert store.get('m', 1, 'v4', 'gpt-4o', 1) == 'lose'
+    assert store.verdicts[('m', 2)]['votes'] == {'yes': 2, 'no': 1}
+    assert store.verdicts[('m', 2)]['confidence'] == 1 / 3
+    store.close()
+    with open(path, 'r', encoding='utf-8') as f:
+        assert len(f.readlines()) == 2
+
+def test_torn_tail_survives_repeated_opens(tmp_path):
+    path = str(tmp_path / VERDICTS_FILENAME)
+    store = VerdictStore(path)
+    store.record('m', 1, 'a', 'gpt-4o', 1, 'win')
+    store.record('m', 2, 'b', 'gpt-4o', 1, 'win')
+    store.close()
+    _tear_tail(path, 12)
+
+    store = VerdictStore(path)
+    assert ('m', 2) not in store.verdicts
+    store.record('m', 3, 'c', 'gpt-4o', 1, 'lose')
+    store.close()
+    store = VerdictStore(path)
+    assert store.get('m', 1, 'a', 'gpt-4o', 1) == 'win'
+    assert store.get('m', 3, 'c', 'gpt-4o', 1) == 'lose'
+    store.close()
+
+def test_undecodable_lines_are_skipped(tmp_path):
+    path = str(tmp_path / VERDICTS_FILENAME)
+    store = VerdictStore(path)
+    store.record('m', 1, 'a', 'gpt-4o', 1, 'win')
+    store.close()
+    with open(path, 'ab') as f:
+        f.write(b'{"model": "m", "job_\n\xff\xfe\n')
+    store = VerdictStore(path)
+    assert list(store.verdicts) == [('m', 1)]
+    store.close()
+
+def test_rerun_grades_only_new_or_changed_outputs(jobs_csv, tmp_path, stub_server):
+    data = AgentArenaData(jobs_csv, use_store=False)
+    output_dir = str(tmp_path / 'out')
+    submissions = FileSubmissionStore(output_dir)
+    for job_id in range(4):
+        submissions.write('model-a', job_id, f"Output for job {job_id}")
+    submissions.close()
+    verifier = SimpleVerifier('unused', data,
+                              backend=OpenAIBackend(base_url=f"http://127.0.0.1:{stub_server.port}/v1"))
+
+    verifier.process_outputs(output_dir)
+    first = pd.read_csv(os.path.join(output_dir, 'results.csv'), index_col='jobID')
+    requests = stub_server.stats['requests']
+    verifier.process_outputs(output_dir)
+    assert stub_server.stats['requests'] == requests
+    pd.testing.assert_frame_equal(pd.read_csv(os.path.join(output_dir, 'results.csv'), index_col='jobID'), first)
+
+    submissions = FileSubmissionStore(output_dir)
+    submissions.write('model-a', 2, "A rewritten output")
+    submissions.close()
+    verifier.process_outputs(output_dir)
+    assert stub_server.stats['requests'] == requests + 1
+    with open(os.path.join(output_dir, VERDICTS_FILENAME), 'r', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert {(e['verifier_model'], e['prompt_version']) for e in entries} == {(VERIFIER_MODEL, PROMPT_VERSION)}
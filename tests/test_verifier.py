@@ -0,0 +1,120 @@
+import os
+import re
+from types import SimpleNamespace
+import pytest
+from agent.verdicts import VERDICTS_FILENAME, VerdictStore
+from agent.verifier_simple import SimpleVerifier, VerificationFailed
+from api.data import AgentArenaData
+from api.submissions import FileSubmissionStore
+from utils.llm_backend import ModelBackend
+
+class ScriptedBackend(ModelBackend):
+    """Answers every call with reply(request), a string or a list of choices, and records the requests."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        reply = self.reply(request)
+        if isinstance(reply, Exception):
+            raise reply
+        contents = reply if isinstance(reply, list) else [reply]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))
+                                        for content in contents], usage=None)
+
+def _prompt(request) -> str:
+    return request['messages'][-1]['content']
+
+def _candidates(request):
+    return re.findall(r'^Candidate ([A-Z]):\n(.*)$', _prompt(request), re.MULTILINE)
+
+@pytest.fixture
+def data(jobs_csv):
+    return AgentArenaData(jobs_csv, use_store=False)
+
+def test_listwise_response_formats_are_parsed(data):
+    backend = ScriptedBackend(lambda request: "Here you go:\n**A**: Yes.\nCandidate B - no\nc) YES\nA: NO\n")
+    verifier = SimpleVerifier('unused', data, backend=backend, listwise=True)
+    verdicts = verifier._verify_outputs_listwise({'m1': 'one', 'm2': 'two', 'm3': 'three', 'm4': 'four'}, 'job')
+    # The first verdict for a candidate counts, and D is missing from the response
+    assert verdicts == {'m1': True, 'm2': False, 'm3': True}
+    assert [output for _, output in _candidates(backend.requests[0])] == ['one', 'two', 'three', 'four']
+
+def test_unparsed_candidates_are_graded_on_their_own(data):
+    def reply(request):
+        labels = _candidates(request)
+        if labels:
+            # Only the first candidate gets a verdict line
+            return f"{labels[0][0]}: YES\n{labels[1][0]}: maybe"
+        return "NO"
+    backend = ScriptedBackend(reply)
+    verifier = SimpleVerifier('unused', data, backend=backend, listwise=True)
+    verdicts, errors = verifier._grade_job(3, {'m1': 'one', 'm2': 'two'}, 'job')
+    assert not errors
+    assert sorted(verdicts.values()) == [False, True]
+    assert len(backend.requests) == 2
+
+def test_candidate_order_is_seeded_by_job(data):
+    outputs = {f"m{i}": f"output {i}" for i in range(4)}
+    orders = []
+    for _ in range(2):
+        backend = ScriptedBackend(lambda request: '\n'.join(f"{label}: YES" for label, _ in _candidates(request)))
+        SimpleVerifier('unused', data, backend=backend, listwise=True)._grade_job(7, outputs, 'job')
+        orders.append([output for _, output in _candidates(backend.requests[0])])
+    assert orders[0] == orders[1]
+    assert sorted(orders[0]) == sorted(outputs.values())
+
+def test_failed_listwise_call_leaves_outputs_ungraded(data):
+    backend = ScriptedBackend(lambda request: ValueError("bad request"))
+    verifier = SimpleVerifier('unused', data, backend=backend, listwise=True)
+    with pytest.raises(VerificationFailed):
+        verifier._verify_outputs_listwise({'m1': 'one', 'm2': 'two'}, 'job')
+    verdicts, errors = verifier._grade_job(1, {'m1': 'one', 'm2': 'two'}, 'job')
+    assert verdicts == {} and set(errors) == {'m1', 'm2'}
+
+def test_votes_stop_once_the_majority_is_decided(data):
+    backend = ScriptedBackend(lambda request: ['YES'] * request.get('n', 1))
+    verifier = SimpleVerifier('unused', data, backend=backend, votes=3, vote_with_n=True)
+    assert verifier._vote_output('output', 'job') == (True, 2, 0)
+    assert [request.get('n') for request in backend.requests] == [2]
+
+    answers = iter([['YES', 'NO'], ['NO']])
+    backend = ScriptedBackend(lambda request: next(answers))
+    verifier = SimpleVerifier('unused', data, backend=backend, votes=3, vote_with_n=True)
+    assert verifier._vote_output('output', 'job') == (False, 1, 2)
+    assert [(request.get('n'), request.get('seed')) for request in backend.requests] == [(2, None), (None, 1)]
+
+def test_votes_one_call_each_without_n(data):
+    answers = iter(['NO', 'YES', 'YES'])
+    backend = ScriptedBackend(lambda request: next(answers))
+    verifier = SimpleVerifier('unused', data, backend=backend, votes=3)
+    assert verifier._vote_output('output', 'job') == (True, 2, 1)
+    assert [request.get('seed') for request in backend.requests] == [None, 1, 2]
+    assert all(request['temperature'] == verifier.vote_temperature for request in backend.requests)
+
+def test_failed_vote_only_fails_the_output_without_a_majority(data):
+    answers = iter([ValueError("bad request"), 'YES', 'YES'])
+    verifier = SimpleVerifier('unused', data, backend=ScriptedBackend(lambda request: next(answers)), votes=3)
+    assert verifier._vote_output('output', 'job') == (True, 2, 0)
+
+    answers = iter([ValueError("bad request"), 'YES', 'NO'])
+    verifier = SimpleVerifier('unused', data, backend=ScriptedBackend(lambda request: next(answers)), votes=3)
+    with pytest.raises(VerificationFailed):
+        verifier._vote_output('output', 'job')
+
+def test_vote_counts_are_stored_with_the_verdict(data, tmp_path):
+    output_dir = str(tmp_path / 'out')
+    submissions = FileSubmissionStore(output_dir)
+    for job_id in range(3):
+        submissions.write('model-a', job_id, f"Output for job {job_id}")
+    submissions.close()
+    backend = ScriptedBackend(lambda request: 'YES')
+    SimpleVerifier('unused', data, backend=backend, votes=3).process_outputs(output_dir)
+    assert len(backend.requests) == 3 * 2
+
+    store = VerdictStore(os.path.join(output_dir, VERDICTS_FILENAME))
+    assert [(entry['result'], entry['votes'], entry['confidence']) for entry in store.verdicts.values()] == \
+        [('win', {'yes': 2, 'no': 0}, 1.0)] * 3
+    store.close()
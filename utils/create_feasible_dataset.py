@@ -1,19 +1,29 @@
 import pandas as pd
-import openai
 import os
 from tqdm import tqdm
 from dotenv import load_dotenv
+from utils.llm_backend import OpenAIBackend
+from utils.llm_cache import ResponseCache
+from utils.prompt_budget import PromptBudget, Section
+from utils.rate_limiter import RateLimitExceeded
 
 # Load environment variables
 load_dotenv()
 
-# Set up OpenAI API key
-client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Default model backend: the OpenAI API, or any compatible server set in OPENAI_BASE_URL
+default_backend = OpenAIBackend(api_key=os.getenv('OPENAI_API_KEY'), base_url=os.getenv('OPENAI_BASE_URL'))
 
-def analyze_job_feasibility(title, description, sector, experience_level, projected_value, skills):
-    """Analyze if a job posting can be completed by an AI agent with attachments."""
+# Labels are a single word, so only the prompt needs budgeting
+prompt_budget = PromptBudget("gpt-4", max_output_tokens=10, min_output_tokens=10)
+
+def feasibility_request(title, description, sector, experience_level, projected_value, skills):
+    """
+    Build the chat request asking whether a job is feasible, with its description trimmed to fit the prompt budget.
+    
+    Returns a dict of keyword arguments for chat.completions.create.
+    """
     
-    prompt = f"""Analyze this job posting and determine if it describes a SPECIFIC TASK or PROJECT that an AI agent could complete. 
+    prompt_template = """Analyze this job posting and determine if it describes a SPECIFIC TASK or PROJECT that an AI agent could complete. 
 This should NOT be a general job description for hiring an employee, but rather a clear, specific task or project.
 
 Determine if the SPECIFIC TASK can be completed if the AI agent is given the attachments/files/specifications mentioned in the description. (Answer YES/NO)
@@ -41,24 +51,59 @@ Projected Value: {projected_value}
 Skills Required: {skills}
 
 Respond with just YES or NO."""
+    fields = dict(title=title, sector=sector, experience_level=experience_level,
+                  projected_value=projected_value, skills=skills)
+    system = {"role": "system", "content": "You are an expert at analyzing whether jobs can be completed by AI agents. Respond with just YES or NO."}
+    # Long descriptions are trimmed so the prompt fits the model's context window
+    fitted = prompt_budget.fit([system], [Section('description', str(description), priority=0)],
+                               fixed_text=prompt_template.format(description='', **fields))
+    prompt = prompt_template.format(description=fitted.texts['description'], **fields)
+
+    return dict(
+        model="gpt-4",
+        messages=[system, {"role": "user", "content": prompt}],
+        temperature=0.3,
+        max_tokens=fitted.max_tokens
+    )
 
+def analyze_job_feasibility(title, description, sector, experience_level, projected_value, skills, cache=None,
+                            backend=None):
+    """
+    Analyze if a job posting can be completed by an AI agent with attachments.
+    
+    Returns True or False, or None if the request was still throttled after all retries
+    so the job can be labeled on a later run instead of being marked infeasible.
+    """
+    backend = backend or default_backend
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert at analyzing whether jobs can be completed by AI agents. Respond with just YES or NO."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=10
-        )
+        response = backend.complete(cache=cache, **feasibility_request(title, description, sector, experience_level,
+                                                                       projected_value, skills))
         result = response.choices[0].message.content.strip()
         return result == "YES"
+    except RateLimitExceeded as e:
+        print(f"Rate limited, leaving job unlabeled: {e}")
+        return None
     except Exception as e:
         print(f"Error analyzing job: {e}")
         return False
 
-def filter_csv_for_feasible_jobs(input_csv_path, output_csv_path=None):
+def label_feasibility_batch(df, batch):
+    """
+    Label every row's feasibility through the batch API; rows without an answer yet are left as None.
+    
+    Custom IDs are taken from the ID column, or the row index if there is none, so
+    running again with the same batch work directory resumes where it stopped.
+    """
+    ids = df['ID'] if 'ID' in df.columns else df.index
+    requests = ((f"feasible-{job_id}", feasibility_request(row['TITLE'], row['DESCRIPTION'], row['SECTOR'],
+                                                           row['EXPERIENCE_LEVEL'], row['PROJECTED_VALUE'],
+                                                           row['SKILLS_AND_EXPERTISE']))
+                for job_id, (_, row) in zip(ids, df.iterrows()))
+    answers = batch.run(requests)
+    return pd.Series([answers[f"feasible-{job_id}"].choices[0].message.content.strip() == "YES"
+                      if f"feasible-{job_id}" in answers else None for job_id in ids], index=df.index, dtype=object)
+
+def filter_csv_for_feasible_jobs(input_csv_path, output_csv_path=None, cache=None, backend=None, batch=None):
     """
     Filter a CSV file to find jobs that can be completed by an AI agent with attachments.
     
@@ -66,6 +111,10 @@ def filter_csv_for_feasible_jobs(input_csv_path, output_csv_path=None):
         input_csv_path (str): Path to the input CSV file
         output_csv_path (str, optional): Path to save the filtered CSV. If None, will save in same directory
             as input with '_feasible' appended to the filename.
+        cache (ResponseCache, optional): Reuse labels from this cache, so a re-run only pays for new jobs
+        backend (ModelBackend, optional): Where completions come from; defaults to default_backend
+        batch (BatchRunner, optional): Label through the batch API with this runner instead of
+            interactive calls; jobs whose batches have not answered are left unlabeled
     """
     # Generate output path if not provided
     if output_csv_path is None:
@@ -76,30 +125,40 @@ def filter_csv_for_feasible_jobs(input_csv_path, output_csv_path=None):
     print("Reading CSV file...")
     df = pd.read_csv(input_csv_path)
     
-    # Add feasible column
-    df['IS_FEASIBLE'] = False
+    # Add feasible column; None marks jobs that could not be labeled
+    df['IS_FEASIBLE'] = None
     
-    # Process each row
+    # Process each row, through the batch API if given, or one call at a time
     print("Analyzing job descriptions...")
-    for idx in tqdm(df.index):
-        row = df.iloc[idx]
-        is_feasible = analyze_job_feasibility(
-            row['TITLE'],
-            row['DESCRIPTION'],
-            row['SECTOR'],
-            row['EXPERIENCE_LEVEL'],
-            row['PROJECTED_VALUE'],
-            row['SKILLS_AND_EXPERTISE']
-        )
-        df.at[idx, 'IS_FEASIBLE'] = is_feasible
+    if batch is not None:
+        df['IS_FEASIBLE'] = label_feasibility_batch(df, batch)
+    else:
+        for idx in tqdm(df.index):
+            row = df.iloc[idx]
+            is_feasible = analyze_job_feasibility(
+                row['TITLE'],
+                row['DESCRIPTION'],
+                row['SECTOR'],
+                row['EXPERIENCE_LEVEL'],
+                row['PROJECTED_VALUE'],
+                row['SKILLS_AND_EXPERTISE'],
+                cache=cache,
+                backend=backend
+            )
+            df.at[idx, 'IS_FEASIBLE'] = is_feasible
     
     # Filter and save results
     print("Saving results...")
-    feasible_df = df[df['IS_FEASIBLE']]
+    feasible_df = df[df['IS_FEASIBLE'] == True]
     feasible_df.to_csv(output_csv_path, index=False)
     
     print(f"Done! Found {len(feasible_df)} feasible jobs out of {len(df)} total jobs analyzed.")
+    unlabeled = df['IS_FEASIBLE'].isna().sum()
+    if unlabeled:
+        print(f"Warning: {unlabeled} jobs could not be labeled because of rate limiting or unfinished batches.")
     print(f"Results saved to: {output_csv_path}")
+    if cache is not None:
+        print(f"LLM cache: {cache.stats()}")
 
 if __name__ == "__main__":
-    filter_csv_for_feasible_jobs('data/df_randomized.csv')
+    filter_csv_for_feasible_jobs('data/df_randomized.csv', cache=ResponseCache())
@@ -0,0 +1,97 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+import openai
+from utils.llm_cache import ResponseCache
+from utils.rate_limiter import chat_completion
+
+class ModelBackend(ABC):
+    """
+    Source of chat completions for the agent, the verifier and the labeling scripts.
+
+    Subclasses implement create with the keyword arguments and return type of
+    OpenAI's chat.completions.create, including stream=True, and set supports_n when
+    create returns n choices for a request with n. Backends that can also run batches
+    derive from BatchBackend.
+    """
+
+    # Whether one request can return several sampled choices
+    supports_n = False
+
+    @abstractmethod
+    def create(self, **request) -> Any:
+        """Make one chat completion call."""
+
+    def complete(self, cache: Optional[ResponseCache] = None, **request) -> Any:
+        """
+        Make a call through the shared rate limiter, see utils.rate_limiter.chat_completion.
+
+        Args:
+            cache (ResponseCache, optional): Answer from and store into this cache
+            **request: Arguments for create; must include model and messages
+        """
+        return chat_completion(self.create, cache=cache, **request)
+
+class BatchBackend(ModelBackend):
+    """A ModelBackend that can also run requests through a batch API, as used by utils.llm_batch.BatchRunner."""
+
+    @abstractmethod
+    def submit_batch(self, path: str, completion_window: str = '24h') -> str:
+        """
+        Upload a JSONL file of chat completion requests and start a batch over it.
+
+        Args:
+            path (str): Request file, one {"custom_id", "method", "url", "body"} object per line
+            completion_window (str): Time the batch may take
+
+        Returns:
+            str: ID of the batch
+        """
+
+    @abstractmethod
+    def retrieve_batch(self, batch_id: str) -> Any:
+        """Returns a batch with the fields of OpenAI's Batch: status, output_file_id, error_file_id, request_counts."""
+
+    @abstractmethod
+    def download_file(self, file_id: str) -> bytes:
+        """Returns the content of a file, e.g. a batch's output file."""
+
+class OpenAIBackend(BatchBackend):
+    supports_n = True
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: Optional[float] = None):
+        """
+        Backend for the OpenAI API or any OpenAI-compatible server.
+
+        Retries are left to the shared rate limiter, which honors Retry-After.
+
+        Args:
+            api_key (str, optional): API key; defaults to OPENAI_API_KEY
+            base_url (str, optional): API base URL, e.g. a utils.stub_llm_server at
+                http://127.0.0.1:8766/v1; defaults to OPENAI_BASE_URL or the OpenAI API
+            timeout (float, optional): Request timeout in seconds
+        """
+        kwargs = {'max_retries': 0}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        # The stub server needs no key, but the client insists on one
+        if api_key is None and base_url is not None and not os.getenv('OPENAI_API_KEY'):
+            api_key = 'local'
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url, **kwargs)
+
+    def create(self, **request) -> Any:
+        return self.client.chat.completions.create(**request)
+
+    def submit_batch(self, path: str, completion_window: str = '24h') -> str:
+        with open(path, 'rb') as f:
+            uploaded = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(input_file_id=uploaded.id, endpoint='/v1/chat/completions',
+                                           completion_window=completion_window)
+        return batch.id
+
+    def retrieve_batch(self, batch_id: str) -> Any:
+        return self.client.batches.retrieve(batch_id)
+
+    def download_file(self, file_id: str) -> bytes:
+        return self.client.files.content(file_id).content
@@ -0,0 +1,236 @@
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from openai.types.chat import ChatCompletion
+from utils.llm_backend import BatchBackend, OpenAIBackend
+from utils.llm_cache import ResponseCache
+
+# Batch states after which a batch's files no longer change
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+# Record of the request files and batches in a work directory
+STATE_FILENAME = 'batches.json'
+
+# Limits of a single OpenAI batch input file
+MAX_REQUESTS_PER_FILE = 50_000
+MAX_BYTES_PER_FILE = 190 * 1024 * 1024
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class BatchRunner:
+    def __init__(self, work_dir: str, backend: Optional[BatchBackend] = None, poll_interval: float = 60.0,
+                 completion_window: str = '24h', max_requests_per_file: int = MAX_REQUESTS_PER_FILE,
+                 max_bytes_per_file: int = MAX_BYTES_PER_FILE, cache: Optional[ResponseCache] = None):
+        """
+        Runs chat completion requests through the batch API instead of interactive calls.
+
+        Requests are written to JSONL files in work_dir, each line tagged with the
+        caller's custom ID, and every file is submitted as a batch. Finished batches'
+        output files are downloaded next to the requests. Everything is recorded in
+        work_dir, so run can be called again after an interruption, or later to pick
+        up batches left running overnight: requests already submitted or answered
+        are not sent again, and answers are read back from the downloaded files.
+        Requests whose batch failed or expired without answering them are sent again
+        on the next run.
+
+        Args:
+            work_dir (str): Directory for request files, output files and state
+            backend (BatchBackend, optional): Batch service; defaults to OpenAIBackend(),
+                which honors OPENAI_BASE_URL, e.g. a utils.stub_llm_server
+            poll_interval (float): Seconds between status checks while waiting
+            completion_window (str): Time each batch may take
+            max_requests_per_file (int): Most requests per batch
+            max_bytes_per_file (int): Largest request file per batch
+            cache (ResponseCache, optional): Answer requests from this cache without
+                batching them, and store batch answers in it
+
+        Raises:
+            TypeError: If backend cannot run batches
+        """
+        if backend is not None and not isinstance(backend, BatchBackend):
+            raise TypeError(f"{type(backend).__name__} does not support the batch API")
+        self.work_dir = work_dir
+        self.backend = backend if backend is not None else OpenAIBackend()
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.max_requests_per_file = max_requests_per_file
+        self.max_bytes_per_file = max_bytes_per_file
+        self.cache = cache
+        self.errors: Dict[str, str] = {}
+        self._answers: Dict[str, ChatCompletion] = {}
+        self._ingested: Set[str] = set()
+
+        os.makedirs(work_dir, exist_ok=True)
+        self.state_path = os.path.join(work_dir, STATE_FILENAME)
+        self.batches: List[Dict[str, Any]] = []
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.batches = json.load(f)['batches']
+
+    def _save_state(self) -> None:
+        _write_atomic(self.state_path, json.dumps({'batches': self.batches}, indent=1).encode('utf-8'))
+
+    def _write_requests(self, requests: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Write requests to new request files of at most max_requests_per_file and max_bytes_per_file."""
+        lines: List[bytes] = []
+        custom_ids: List[str] = []
+        size = 0
+
+        def flush():
+            nonlocal lines, custom_ids, size
+            if not lines:
+                return
+            name = f"requests-{len(self.batches):05d}"
+            request_path = os.path.join(self.work_dir, name + '.jsonl')
+            _write_atomic(request_path, b''.join(lines))
+            self.batches.append({'name': name, 'request_path': request_path, 'custom_ids': custom_ids,
+                                 'batch_id': None, 'status': 'pending', 'output_path': None, 'error_path': None})
+            self._save_state()
+            lines, custom_ids, size = [], [], 0
+
+        for custom_id, request in requests:
+            line = (json.dumps({'custom_id': custom_id, 'method': 'POST', 'url': '/v1/chat/completions',
+                                'body': request}) + '\n').encode('utf-8')
+            if lines and (len(lines) >= self.max_requests_per_file or size + len(line) > self.max_bytes_per_file):
+                flush()
+            lines.append(line)
+            custom_ids.append(custom_id)
+            size += len(line)
+        flush()
+
+    def _submit_pending(self) -> None:
+        for entry in self.batches:
+            if entry['batch_id'] is None:
+                entry['batch_id'] = self.backend.submit_batch(entry['request_path'], self.completion_window)
+                entry['status'] = 'validating'
+                self._save_state()
+                print(f"Submitted batch {entry['batch_id']} with {len(entry['custom_ids']):,} requests")
+
+    def _download(self, entry: Dict[str, Any], file_id: Optional[str], suffix: str) -> Optional[str]:
+        if not file_id:
+            return None
+        path = os.path.join(self.work_dir, f"{entry['name']}.{suffix}.jsonl")
+        _write_atomic(path, self.backend.download_file(file_id))
+        return path
+
+    def refresh(self) -> bool:
+        """
+        Check every unfinished batch once, downloading the files of those that finished.
+
+        Returns:
+            bool: Whether every batch has finished
+        """
+        finished = True
+        for entry in self.batches:
+            if entry['status'] in TERMINAL_STATUSES:
+                continue
+            batch = self.backend.retrieve_batch(entry['batch_id'])
+            counts = batch.request_counts
+            progress = f" {counts.completed + counts.failed:,}/{counts.total:,}" if counts is not None and counts.total else ''
+            print(f"Batch {entry['batch_id']}: {batch.status}{progress}")
+            if batch.status in TERMINAL_STATUSES:
+                # Files are downloaded before the status is saved, so an interrupted download is repeated
+                entry['output_path'] = self._download(entry, batch.output_file_id, 'output')
+                entry['error_path'] = self._download(entry, batch.error_file_id, 'errors')
+                entry['status'] = batch.status
+                self._save_state()
+            else:
+                finished = False
+        return finished
+
+    def _cache_answers(self, entry: Dict[str, Any], answers: Dict[str, ChatCompletion]) -> None:
+        """Store a batch's answers in the cache under the requests they answer."""
+        with open(entry['request_path'], 'r', encoding='utf-8') as f:
+            for line in f:
+                request = json.loads(line)
+                answer = answers.get(request['custom_id'])
+                if answer is not None:
+                    self.cache.put(request['body'], answer)
+
+    def _ingest(self) -> None:
+        """Read the answers and errors of finished batches not read yet."""
+        for entry in self.batches:
+            if entry['status'] not in TERMINAL_STATUSES or entry['name'] in self._ingested:
+                continue
+            answers = {}
+            for path in (entry['output_path'], entry['error_path']):
+                if path is None:
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        result = json.loads(line)
+                        custom_id, response = result['custom_id'], result.get('response') or {}
+                        if response.get('status_code') == 200:
+                            answers[custom_id] = ChatCompletion.model_validate(response['body'])
+                            self.errors.pop(custom_id, None)
+                        elif custom_id not in answers:
+                            error = result.get('error') or (response.get('body') or {}).get('error') or {}
+                            self.errors[custom_id] = error.get('message', f"status {response.get('status_code')}")
+            for custom_id in entry['custom_ids']:
+                if custom_id not in answers and custom_id not in self.errors:
+                    self.errors[custom_id] = f"Batch {entry['status']} without answering the request"
+            if self.cache is not None:
+                self._cache_answers(entry, answers)
+            self._answers.update(answers)
+            self._ingested.add(entry['name'])
+
+    def run(self, requests: Iterable[Tuple[str, Dict[str, Any]]], wait: bool = True) -> Dict[str, ChatCompletion]:
+        """
+        Answer requests through batches.
+
+        Args:
+            requests (Iterable[Tuple[str, Dict]]): (custom ID, request) pairs, where each
+                request has the keyword arguments of chat.completions.create. A custom ID
+                must stand for the same request on every run.
+            wait (bool): Wait until every batch has finished. If False, new requests are
+                submitted, finished batches are collected, and run returns; call it
+                again later for the rest.
+
+        Returns:
+            Dict[str, ChatCompletion]: Answers by custom ID. Requests without an answer are
+                still running, or failed with the reason in self.errors.
+        """
+        self._ingest()
+        in_flight = {custom_id for entry in self.batches if entry['status'] not in TERMINAL_STATUSES
+                     for custom_id in entry['custom_ids']}
+        wanted: List[str] = []
+        cached: Dict[str, ChatCompletion] = {}
+
+        def pending():
+            seen = set()
+            for custom_id, request in requests:
+                if custom_id in seen:
+                    continue
+                seen.add(custom_id)
+                wanted.append(custom_id)
+                if custom_id in self._answers or custom_id in in_flight:
+                    continue
+                answer = self.cache.get(request) if self.cache is not None else None
+                if answer is not None:
+                    cached[custom_id] = answer
+                    continue
+                yield custom_id, request
+
+        self._write_requests(pending())
+        self._submit_pending()
+        while not self.refresh() and wait:
+            time.sleep(self.poll_interval)
+        self._ingest()
+
+        answers = {custom_id: self._answers[custom_id] for custom_id in wanted if custom_id in self._answers}
+        answers.update(cached)
+        running = {custom_id for entry in self.batches if entry['status'] not in TERMINAL_STATUSES
+                   for custom_id in entry['custom_ids']}
+        still_running = sum(custom_id in running for custom_id in wanted)
+        failed = sum(custom_id in self.errors and custom_id not in answers and custom_id not in running
+                     for custom_id in wanted)
+        print(f"Batch answers: {len(answers):,} of {len(wanted):,} requests, {still_running:,} still running, "
+              f"{failed:,} failed")
+        return answers
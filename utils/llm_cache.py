@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from openai.types.chat import ChatCompletion
+
+# Default location of the shared cache, relative to the working directory
+DEFAULT_CACHE_PATH = os.path.join('cache', 'llm_responses.sqlite')
+
+# Set to 1 to ignore cached responses everywhere (fresh responses are still stored)
+BYPASS_ENV_VAR = 'ARENA_LLM_CACHE_BYPASS'
+
+def request_key(request: Dict[str, Any]) -> str:
+    """
+    Returns the cache key of a chat request: a hash of the model, messages and
+    every sampling parameter.
+
+    Args:
+        request (Dict[str, Any]): Keyword arguments of chat.completions.create
+    """
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = 1024 * 1024 * 1024,
+                 bypass: bool = False):
+        """
+        Persistent chat completion cache backed by SQLite.
+
+        Entries are evicted least-recently-used first once the stored responses
+        exceed max_bytes. The database runs in WAL mode so several processes can
+        share one cache file.
+
+        Args:
+            path (str): Path to the SQLite file
+            max_bytes (int): Maximum total size of stored responses
+            bypass (bool): Ignore cached entries (fresh responses are still stored).
+                Also enabled by setting ARENA_LLM_CACHE_BYPASS=1.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.bypass = bypass or os.getenv(BYPASS_ENV_VAR) == '1'
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.evictions = 0
+
+    def get(self, request: Dict[str, Any]) -> Optional[ChatCompletion]:
+        """
+        Returns the cached response for a request, or None on a miss or when bypassed.
+
+        Args:
+            request (Dict[str, Any]): Keyword arguments of chat.completions.create
+        """
+        if self.bypass:
+            self.misses += 1
+            return None
+        key = request_key(request)
+        with self._lock:
+            row = self._conn.execute('SELECT response FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            self.bytes_read += len(row[0])
+        return ChatCompletion.model_validate_json(row[0])
+
+    def put(self, request: Dict[str, Any], response: ChatCompletion) -> None:
+        """
+        Store a response, evicting least recently used entries if over max_bytes.
+
+        Args:
+            request (Dict[str, Any]): Keyword arguments of chat.completions.create
+            response (ChatCompletion): The response returned for it
+        """
+        payload = response.model_dump_json()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, model, response, size, created, last_access) VALUES (?, ?, ?, ?, ?, ?)',
+                (request_key(request), request.get('model', ''), payload, len(payload), now, now))
+            self.bytes_written += len(payload)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache is back under 90% of max_bytes; called with _lock held."""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        evicted = []
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            evicted.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+        self.evictions += len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss/byte counters for this process and the current size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'evictions': self.evictions,
+            'entries': entries,
+            'size_bytes': size,
+        }
+
+    def clear(self) -> None:
+        """Delete every cached response."""
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
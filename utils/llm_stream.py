@@ -0,0 +1,115 @@
+import time
+from typing import Any, Iterator, List, Optional
+
+class StreamStalled(Exception):
+    """Raised when a streamed completion is too slow, stalls, or ends without finishing."""
+
+class CompletionStream:
+    def __init__(self, stream: Any, chunk_size: int = 4096, flush_interval: float = 0.5,
+                 first_byte_timeout: Optional[float] = None, stall_timeout: Optional[float] = None,
+                 min_chars_per_second: Optional[float] = None, grace_period: float = 5.0):
+        """
+        Iterate a streamed chat completion as UTF-8 chunks suitable for submit_job.
+
+        Token deltas are coalesced into chunks of about chunk_size bytes, or whatever
+        has arrived after flush_interval seconds, so the submission grows steadily
+        without a write per token. Iteration raises StreamStalled, after closing the
+        stream, if the first token is too slow, the gap between tokens grows too long,
+        throughput drops below min_chars_per_second after the grace period, or the
+        stream ends without a finish_reason. Since the submission stores only publish
+        an output once its iterator is exhausted, an abandoned stream never leaves a
+        partial submission behind.
+
+        Gaps are measured when a chunk arrives; pass the same stall_timeout as the
+        request timeout so a connection that goes silent is cut off by the client.
+
+        Args:
+            stream (Any): Stream returned by chat.completions.create(stream=True)
+            chunk_size (int): Bytes to buffer before yielding a chunk
+            flush_interval (float): Seconds after which buffered text is yielded anyway
+            first_byte_timeout (float, optional): Longest wait for the first token
+            stall_timeout (float, optional): Longest gap between stream chunks
+            min_chars_per_second (float, optional): Lowest acceptable throughput
+            grace_period (float): Seconds after the first token before throughput is checked
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.first_byte_timeout = first_byte_timeout
+        self.stall_timeout = stall_timeout
+        self.min_chars_per_second = min_chars_per_second
+        self.grace_period = grace_period
+
+        self.ttfb: Optional[float] = None
+        self.elapsed = 0.0
+        self.chars = 0
+        self.completion_tokens: Optional[int] = None
+        self.finish_reason: Optional[str] = None
+        self.completed = False
+
+    @property
+    def chars_per_second(self) -> float:
+        """Generation throughput after the first token."""
+        generating = self.elapsed - (self.ttfb or 0.0)
+        return self.chars / generating if generating > 0 else 0.0
+
+    def _abort(self, reason: str) -> None:
+        close = getattr(self.stream, 'close', None)
+        if close is not None:
+            close()
+        raise StreamStalled(reason)
+
+    def _check(self, now: float, last: float, start: float) -> None:
+        if self.ttfb is None:
+            if self.first_byte_timeout is not None and now - start > self.first_byte_timeout:
+                self._abort(f"No output after {now - start:.1f}s")
+            return
+        if self.stall_timeout is not None and now - last > self.stall_timeout:
+            self._abort(f"Stream stalled for {now - last:.1f}s after {self.chars} characters")
+        if (self.min_chars_per_second is not None and self.elapsed - self.ttfb > self.grace_period
+                and self.chars_per_second < self.min_chars_per_second):
+            self._abort(f"Throughput {self.chars_per_second:.0f} chars/s is below {self.min_chars_per_second:.0f}")
+
+    def __iter__(self) -> Iterator[bytes]:
+        start = last = flushed = time.monotonic()
+        pending: List[str] = []
+        pending_bytes = 0
+        for chunk in self.stream:
+            now = time.monotonic()
+            self.elapsed = now - start
+            self._check(now, last, start)
+            last = now
+
+            usage = getattr(chunk, 'usage', None)
+            if usage is not None:
+                self.completion_tokens = usage.completion_tokens
+            if not chunk.choices:
+                # The usage chunk at the end of the stream has no choices
+                continue
+            choice = chunk.choices[0]
+            if choice.finish_reason is not None:
+                self.finish_reason = choice.finish_reason
+            text = choice.delta.content
+            if not text:
+                continue
+            if self.ttfb is None:
+                self.ttfb = now - start
+            self.chars += len(text)
+            pending.append(text)
+            pending_bytes += len(text)
+            if pending_bytes >= self.chunk_size or now - flushed >= self.flush_interval:
+                yield ''.join(pending).encode('utf-8')
+                pending, pending_bytes, flushed = [], 0, now
+
+        self.elapsed = time.monotonic() - start
+        if self.finish_reason is None:
+            raise StreamStalled(f"Stream ended without finishing after {self.chars} characters")
+        if pending:
+            yield ''.join(pending).encode('utf-8')
+        self.completed = True
+
+    def summary(self) -> str:
+        """One-line description of the stream's timing for logs."""
+        ttfb = f"{self.ttfb:.2f}s" if self.ttfb is not None else "n/a"
+        return (f"TTFB {ttfb}, {self.chars} chars in {self.elapsed:.2f}s "
+                f"({self.chars_per_second:.0f} chars/s), finish reason {self.finish_reason}")
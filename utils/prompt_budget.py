@@ -0,0 +1,194 @@
+import functools
+import re
+import threading
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Context windows of the models used in this repo, in tokens
+CONTEXT_WINDOWS = {'gpt-4o': 128_000, 'gpt-4o-mini': 128_000, 'gpt-4': 8_192}
+
+# Tokens charged per chat message on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Marker left where a section was trimmed
+TRIM_MARKER = "\n[... {omitted} tokens omitted ...]\n"
+
+# Offline approximation of BPE tokens: runs of up to four word characters, or single symbols
+_APPROX_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    """Returns the tiktoken encoding for a model, or None to use the offline approximation."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # Unknown model, or the encoding file can't be downloaded
+        try:
+            return tiktoken.get_encoding('o200k_base')
+        except Exception:
+            return None
+
+class TokenCounter:
+    def __init__(self, model: str = 'gpt-4o', max_entries: int = 200_000):
+        """
+        Counts tokens for a model with tiktoken when installed and its encoding is
+        cached locally, and a regex approximation otherwise.
+
+        Counts are memoized by key when one is given, e.g. (job_id, 'DESCRIPTION'),
+        so a description is tokenized once however many stages count it, and by
+        text otherwise.
+
+        Args:
+            model (str): Model whose tokenizer to use
+            max_entries (int): Memoized counts to keep before the memo is cleared
+        """
+        self.model = model
+        self.encoding = _encoding(model)
+        self.max_entries = max_entries
+        self._memo: Dict[Hashable, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return len(_APPROX_TOKEN.findall(text))
+
+    def count(self, text: str, key: Optional[Hashable] = None, memoize: bool = True) -> int:
+        """
+        Returns the number of tokens in text.
+
+        Args:
+            text (str): Text to count
+            key (Hashable, optional): Stable identity of the text, e.g. (job_id, 'DESCRIPTION')
+            memoize (bool): Remember the count; pass False for one-off text such as a whole
+                prompt, which would otherwise be kept as a memo key
+        """
+        if not memoize and key is None:
+            return self._count(text)
+        memo_key = key if key is not None else text
+        with self._lock:
+            entry = self._memo.get(memo_key)
+        # The length guards against a key being reused for different text
+        if entry is not None and entry[0] == len(text):
+            return entry[1]
+        tokens = self._count(text)
+        with self._lock:
+            if len(self._memo) >= self.max_entries:
+                self._memo.clear()
+            self._memo[memo_key] = (len(text), tokens)
+        return tokens
+
+    def count_messages(self, messages: Sequence[Dict[str, Any]], memoize: bool = True) -> int:
+        """Returns the prompt tokens of chat messages."""
+        return sum(self.count(str(message.get('content', '')), memoize=memoize) + MESSAGE_OVERHEAD_TOKENS
+                   for message in messages)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Trim text to about max_tokens, keeping its beginning and end around a marker.
+
+        Returns text unchanged if it already fits.
+        """
+        total = self.count(text)
+        if total <= max_tokens:
+            return text
+        keep = max(0, max_tokens - 16)
+        head, tail = keep * 2 // 3, keep - keep * 2 // 3
+        marker = TRIM_MARKER.format(omitted=total - keep)
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return self.encoding.decode(tokens[:head]) + marker + (self.encoding.decode(tokens[-tail:]) if tail else '')
+        spans = [match.span() for match in _APPROX_TOKEN.finditer(text)]
+        head_end = spans[head - 1][1] if head else 0
+        tail_start = spans[-tail][0] if tail else len(text)
+        return text[:head_end] + marker + text[tail_start:]
+
+@functools.lru_cache(maxsize=None)
+def get_token_counter(model: str) -> TokenCounter:
+    """Returns the process-wide TokenCounter for a model, shared by every stage."""
+    return TokenCounter(model)
+
+class Section(NamedTuple):
+    """A trimmable part of a prompt. Lower priority sections are trimmed first, never below min_tokens."""
+    name: str
+    text: str
+    priority: int
+    min_tokens: int = 256
+    key: Optional[Hashable] = None
+
+class BudgetedPrompt(NamedTuple):
+    """Section texts after budgeting, and the completion size that fits beside them."""
+    texts: Dict[str, str]
+    prompt_tokens: int
+    max_tokens: int
+    trimmed: List[str]
+
+class PromptBudget:
+    def __init__(self, model: str, max_total_tokens: Optional[int] = None, max_output_tokens: int = 1000,
+                 min_output_tokens: int = 256):
+        """
+        Fits prompts into a per-request token budget.
+
+        Sections are only trimmed when the prompt plus max_output_tokens would exceed
+        the budget, lowest priority first, until min_output_tokens fit. The completion
+        then gets whatever is left, up to max_output_tokens, so prompts that already
+        fit are sent unchanged with the full max_output_tokens.
+
+        Args:
+            model (str): Model the prompt is for
+            max_total_tokens (int, optional): Prompt plus completion budget; defaults to
+                the model's context window
+            max_output_tokens (int): Largest completion to allow
+            min_output_tokens (int): Completion space to keep free, trimming the prompt if needed
+        """
+        self.model = model
+        self.counter = get_token_counter(model)
+        context = CONTEXT_WINDOWS.get(model, 8_192)
+        self.max_total_tokens = min(max_total_tokens or context, context)
+        self.max_output_tokens = max_output_tokens
+        self.min_output_tokens = min_output_tokens
+
+    def fit(self, fixed_messages: Sequence[Dict[str, Any]], sections: Sequence[Section],
+            fixed_text: str = '') -> BudgetedPrompt:
+        """
+        Budget the sections of a prompt.
+
+        Args:
+            fixed_messages (Sequence[Dict]): Messages sent as-is, e.g. the system prompt
+            sections (Sequence[Section]): Trimmable parts of the remaining message
+            fixed_text (str): Untrimmable text of the remaining message, e.g. its template
+
+        Returns:
+            BudgetedPrompt: The possibly trimmed sections and the max_tokens to request
+        """
+        fixed = (self.counter.count_messages(fixed_messages) + self.counter.count(fixed_text)
+                 + MESSAGE_OVERHEAD_TOKENS)
+        counts = {section.name: self.counter.count(section.text, section.key) for section in sections}
+        texts = {section.name: section.text for section in sections}
+        trimmed = []
+
+        prompt_tokens = fixed + sum(counts.values())
+        if prompt_tokens + self.max_output_tokens > self.max_total_tokens:
+            excess = prompt_tokens + self.min_output_tokens - self.max_total_tokens
+            for section in sorted(sections, key=lambda section: section.priority):
+                if excess <= 0:
+                    break
+                room = counts[section.name] - section.min_tokens
+                if room <= 0:
+                    continue
+                target = counts[section.name] - min(room, excess)
+                texts[section.name] = self.counter.truncate(section.text, target)
+                new_count = self.counter.count(texts[section.name])
+                excess -= counts[section.name] - new_count
+                counts[section.name] = new_count
+                trimmed.append(section.name)
+            prompt_tokens = fixed + sum(counts.values())
+
+        max_tokens = max(1, min(self.max_output_tokens, self.max_total_tokens - prompt_tokens))
+        return BudgetedPrompt(texts, prompt_tokens, max_tokens, trimmed)
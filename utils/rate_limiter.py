@@ -0,0 +1,368 @@
+import email.utils
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional
+import openai
+from utils.prompt_budget import get_token_counter
+
+if TYPE_CHECKING:
+    from utils.llm_cache import ResponseCache
+
+# Default per-model limits; override with configure_limiter to match your account tier
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200_000
+
+class RateLimitExceeded(Exception):
+    """Raised when a call is still throttled after all retries; callers should not treat it as an answer."""
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        """
+        Token bucket refilled continuously at per_minute / 60 per second.
+
+        Args:
+            per_minute (float): Capacity and refill rate per minute
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float) -> None:
+        """Block until amount tokens are available, then take them. Larger requests wait for a full bucket."""
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, delta: float) -> None:
+        """Take (positive) or return (negative) tokens after the fact, e.g. to reconcile an estimate."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE, max_concurrency: int = 32,
+                 min_concurrency: int = 1, max_retries: int = 8, base_delay: float = 1.0,
+                 max_delay: float = 60.0, latency_tolerance: float = 2.0):
+        """
+        Shared limiter for calls to one model.
+
+        Calls wait for both the request and token buckets. Throttled or transient
+        failures are retried after the server's Retry-After, or else a jittered
+        exponential backoff, and pause every caller sharing the limiter. The number
+        of concurrent calls adapts AIMD-style: it grows by one per window of
+        successes, halves on throttling, and shrinks when latency rises well above
+        the best observed.
+
+        Args:
+            requests_per_minute (float): Request budget per minute
+            tokens_per_minute (float): Token budget per minute (prompt plus completion)
+            max_concurrency (int): Upper bound on concurrent calls
+            min_concurrency (int): Lower bound on concurrent calls
+            max_retries (int): Retries for throttled or transient failures before giving up
+            base_delay (float): First backoff delay in seconds
+            max_delay (float): Largest backoff delay in seconds
+            latency_tolerance (float): Latency over this multiple of the baseline counts as congestion
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency_tolerance = latency_tolerance
+
+        self._cond = threading.Condition()
+        self._limit = float(max(min_concurrency, min(4, max_concurrency)))
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._latency_ewma: Optional[float] = None
+        self._latency_baseline: Optional[float] = None
+
+        # Counters for reporting
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Current adaptive limit on concurrent calls."""
+        return int(self._limit)
+
+    def _acquire_slot(self) -> None:
+        with self._cond:
+            while True:
+                wait = self._blocked_until - time.monotonic()
+                if wait <= 0 and self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_success(self, latency: float) -> None:
+        with self._cond:
+            self._latency_ewma = latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+            if self._latency_baseline is None or self._latency_ewma < self._latency_baseline:
+                self._latency_baseline = self._latency_ewma
+            if self._latency_ewma > self.latency_tolerance * self._latency_baseline:
+                # Congestion: back off gently and let the baseline drift up
+                self._limit = max(self.min_concurrency, self._limit * 0.9)
+                self._latency_baseline *= 1.05
+            else:
+                self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+    def _on_throttle(self, delay: float) -> None:
+        with self._cond:
+            self._limit = max(self.min_concurrency, self._limit / 2)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying callers from synchronizing
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn: Callable[..., Any], *args, estimated_tokens: int = 0, **kwargs) -> Any:
+        """
+        Call fn within the limits, retrying throttled and transient failures.
+
+        Args:
+            fn (Callable): The API call
+            estimated_tokens (int): Tokens to reserve up front; reconciled against
+                response.usage.total_tokens when the response reports it
+
+        Returns:
+            Any: What fn returns
+
+        A call made with stream=True returns its stream wrapped in a LimitedStream, which
+        holds the concurrency slot until the stream ends.
+
+        Raises:
+            RateLimitExceeded: If the call is still throttled or failing transiently after max_retries
+            Exception: Any non-retryable error from fn
+        """
+        for attempt in range(self.max_retries + 1):
+            self._acquire_slot()
+            streaming = False
+            try:
+                self.requests.acquire(1)
+                self.tokens.acquire(estimated_tokens)
+                start = time.monotonic()
+                with self._cond:
+                    self.calls += 1
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                if is_rate_limit(e):
+                    with self._cond:
+                        self.throttled += 1
+                    self._on_throttle(delay)
+                if attempt == self.max_retries:
+                    raise RateLimitExceeded(f"Gave up after {self.max_retries} retries: {e}") from e
+                with self._cond:
+                    self.retries += 1
+            else:
+                if kwargs.get('stream'):
+                    # The slot is held, and latency measured, until the stream is consumed or closed
+                    streaming = True
+                    return LimitedStream(result, self, start, estimated_tokens)
+                self._on_success(time.monotonic() - start)
+                self._reconcile_tokens(result, estimated_tokens)
+                return result
+            finally:
+                if not streaming:
+                    self._release_slot()
+            time.sleep(delay)
+
+    def _reconcile_tokens(self, result: Any, estimated_tokens: int) -> None:
+        """Correct the token bucket by the usage a response reports, if any."""
+        usage = getattr(result, 'usage', None)
+        actual = getattr(usage, 'total_tokens', None)
+        if isinstance(actual, (int, float)):
+            self.tokens.adjust(actual - min(estimated_tokens, self.tokens.capacity))
+
+class LimitedStream:
+    def __init__(self, stream: Any, limiter: RateLimiter, start: float, estimated_tokens: int):
+        """
+        A streamed response that keeps its call's concurrency slot until it ends.
+
+        Iterates like the wrapped stream. The slot is released once the stream is
+        exhausted, fails, is closed, or is garbage collected; only a stream read to the
+        end reports its total time as the call's latency, and its usage chunk, if any,
+        reconciles the token estimate. Other attributes are those of the wrapped stream.
+        """
+        self.stream = stream
+        self.limiter = limiter
+        self.start = start
+        self.estimated_tokens = estimated_tokens
+        self._usage_chunk = None
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def _finish(self, completed: bool) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        if completed:
+            self.limiter._on_success(time.monotonic() - self.start)
+            self.limiter._reconcile_tokens(self._usage_chunk, self.estimated_tokens)
+        self.limiter._release_slot()
+
+    def __iter__(self) -> Iterator[Any]:
+        completed = False
+        try:
+            for chunk in self.stream:
+                if getattr(chunk, 'usage', None) is not None:
+                    self._usage_chunk = chunk
+                yield chunk
+            completed = True
+        finally:
+            self._finish(completed)
+
+    def close(self) -> None:
+        try:
+            close = getattr(self.stream, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._finish(False)
+
+    def __enter__(self) -> 'LimitedStream':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'stream' or name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.stream, name)
+
+    def __del__(self) -> None:
+        # A stream dropped without being read or closed must not hold its slot forever
+        if not getattr(self, '_finished', True):
+            self._finish(False)
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+def is_rate_limit(error: Exception) -> bool:
+    """Returns whether an error is a 429 / rate limit response."""
+    return isinstance(error, openai.RateLimitError) or _status_code(error) == 429
+
+def is_retryable(error: Exception) -> bool:
+    """Returns whether an error is throttling or transient (timeouts, connection errors, 408/409/5xx)."""
+    if is_rate_limit(error) or isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    status = _status_code(error)
+    return status is not None and (status in (408, 409) or status >= 500)
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Returns the delay in seconds requested by Retry-After headers on an error, if any."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(model: str) -> RateLimiter:
+    """
+    Returns the process-wide limiter for a model, creating it with default limits.
+
+    Args:
+        model (str): Model name, e.g. "gpt-4o"
+    """
+    with _limiters_lock:
+        if model not in _limiters:
+            _limiters[model] = RateLimiter()
+        return _limiters[model]
+
+def configure_limiter(model: str, **limits) -> RateLimiter:
+    """
+    Replace the process-wide limiter for a model, e.g.
+    configure_limiter("gpt-4o", requests_per_minute=5000, tokens_per_minute=800_000).
+
+    Args:
+        model (str): Model name
+        **limits: Arguments for RateLimiter
+    """
+    with _limiters_lock:
+        _limiters[model] = RateLimiter(**limits)
+        return _limiters[model]
+
+def estimate_tokens(messages: list, max_tokens: Optional[int] = None, model: str = 'gpt-4o', n: int = 1) -> int:
+    """
+    Tokens to reserve for a chat request: its prompt, counted with the model's shared
+    TokenCounter so the limiter agrees with the prompt budget, plus n completions.
+    """
+    # Prompts are counted once here, so they are not memoized
+    return get_token_counter(model).count_messages(messages, memoize=False) + n * (max_tokens or 256)
+
+def chat_completion(create: Callable[..., Any], cache: Optional['ResponseCache'] = None, **request) -> Any:
+    """
+    Make a chat completion call through the limiter for its model.
+
+    Args:
+        create (Callable): The client's chat.completions.create
+        cache (ResponseCache, optional): Answer from and store into this cache;
+            cache hits do not count against the rate limits. Streamed requests are not cached.
+        **request: Arguments for create; must include model and messages
+
+    Returns:
+        Any: The completion response
+
+    Raises:
+        RateLimitExceeded: If the request is still throttled after all retries
+    """
+    if request.get('stream'):
+        cache = None
+    if cache is not None:
+        cached = cache.get(request)
+        if cached is not None:
+            return cached
+    limiter = get_limiter(request['model'])
+    estimated = estimate_tokens(request['messages'], request.get('max_tokens'), request['model'], request.get('n') or 1)
+    response = limiter.call(create, estimated_tokens=estimated, **request)
+    if cache is not None:
+        cache.put(request, response)
+    return response
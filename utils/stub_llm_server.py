@@ -0,0 +1,417 @@
+import argparse
+import asyncio
+import email.parser
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import time
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 429: 'Too Many Requests',
+            500: 'Internal Server Error'}
+
+_WORDS = ("the project deliverable includes a detailed plan with clear milestones requirements analysis "
+          "implementation testing documentation and final review for the client based on the job description").split()
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution into a sampler returning seconds.
+
+    Args:
+        spec (str): One of "fixed:S", "uniform:LOW,HIGH", "exponential:MEAN" or
+            "lognormal:MEDIAN,SIGMA", all in seconds
+
+    Raises:
+        ValueError: If the spec is not recognized
+    """
+    kind, _, args = spec.partition(':')
+    try:
+        params = [float(value) for value in args.split(',')] if args else []
+        if kind == 'fixed' and len(params) == 1:
+            return lambda rng: params[0]
+        if kind == 'uniform' and len(params) == 2:
+            return lambda rng: rng.uniform(params[0], params[1])
+        if kind == 'exponential' and len(params) == 1:
+            return lambda rng: rng.expovariate(1.0 / params[0]) if params[0] > 0 else 0.0
+        if kind == 'lognormal' and len(params) == 2:
+            return lambda rng: params[0] * rng.lognormvariate(0.0, params[1])
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency distribution: {spec}")
+
+def canned_response(request: Mapping[str, Any], responses: Optional[Mapping[str, str]] = None,
+                    sample: int = 0) -> str:
+    """
+    Deterministic reply for a chat request: the same messages always get the same answer.
+
+    A reply from responses is used when its key occurs in the last message. Otherwise
+    prompts listing candidates get a hash-chosen "A: YES" line per candidate, prompts
+    asking for YES/NO or a job version get a hash-chosen answer of that form, and
+    anything else gets filler text sized by max_tokens.
+
+    YES/NO answers of seeded requests, and choices after the first when n is set, are
+    sampled: the hash-chosen answer comes up with the probability its logprobs report,
+    and the other one otherwise, so repeated samples of borderline prompts disagree.
+
+    Args:
+        request (Mapping[str, Any]): The chat completion request body
+        responses (Mapping[str, str], optional): Substring to reply overrides
+        sample (int): Index of the choice being answered
+    """
+    messages = request.get('messages', [])
+    text = str(messages[-1].get('content', '')) if messages else ''
+    for key, reply in (responses or {}).items():
+        if key in text:
+            return reply
+
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode('utf-8')).digest()
+    prompt = ' '.join(str(message.get('content', '')) for message in messages)
+    labels = re.findall(r'^Candidate ([A-Z]):$', prompt, re.MULTILINE)
+    if labels:
+        return '\n'.join(f"{label}: {'YES' if digest[i % len(digest)] % 2 == 0 else 'NO'}" for i, label in enumerate(labels))
+    if re.search(r'\bYES\b.*\bNO\b', prompt):
+        answer, other = ('YES', 'NO') if digest[0] % 2 == 0 else ('NO', 'YES')
+        if sample == 0 and request.get('seed') is None:
+            return answer
+        probability = 0.5 + 0.5 * digest[1] / 256
+        draw = random.Random(f"{digest.hex()}:{request.get('seed')}:{sample}").random()
+        return answer if draw < probability else other
+    if 'version number' in prompt:
+        return f"v{digest[0] % 5 + 1}"
+    rng = random.Random(digest)
+    length = min(request.get('max_tokens') or 256, 400)
+    return ' '.join(rng.choice(_WORDS) for _ in range(length))
+
+class StubLLMServer:
+    def __init__(self, latency: str = 'fixed:0', token_delay: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 0.1, seed: int = 0,
+                 responses: Optional[Mapping[str, str]] = None, batch_delay: float = 0.0):
+        """
+        Local OpenAI-compatible chat completions server for offline runs and load tests.
+
+        Serves POST /v1/chat/completions, streamed or not, with deterministic canned
+        replies, and GET /stats with request counters. Each request waits for a
+        latency drawn from the configured distribution before its first byte; streamed
+        replies then wait token_delay per word. A seeded fraction of requests fails
+        with 500 or is throttled with 429 and a Retry-After. Requests asking for
+        logprobs get first-token logprobs with a hash-chosen confidence.
+        
+        It also stands in for the batch API: POST /v1/files uploads a request file,
+        POST /v1/batches starts a batch over it, GET /v1/batches/{id} reports its
+        status and GET /v1/files/{id}/content downloads its output and error files.
+        Batches finish batch_delay seconds after they are created, with error_rate of
+        their requests failing.
+
+        Args:
+            latency (str): Time-to-first-byte distribution, see parse_latency
+            token_delay (float): Seconds between streamed words
+            error_rate (float): Fraction of requests answered with 500
+            rate_limit_rate (float): Fraction of requests answered with 429
+            retry_after (float): Seconds advertised in the Retry-After of 429 responses
+            seed (int): Seed for latency and fault injection
+            responses (Mapping[str, str], optional): Reply overrides, see canned_response
+            batch_delay (float): Seconds a batch takes to finish
+        """
+        self.sample_latency = parse_latency(latency)
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.responses = responses
+        self.rng = random.Random(seed)
+        self.batch_delay = batch_delay
+        self.stats = {'requests': 0, 'completions': 0, 'streams': 0, 'errors': 0, 'rate_limited': 0,
+                      'completion_tokens': 0, 'batches': 0, 'batch_requests': 0}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+
+    def _logprobs(self, request: Dict[str, Any], content: str) -> Dict[str, Any]:
+        """First-token logprobs: a YES/NO answer gets a hash-chosen probability between 0.5 and 1."""
+        token = content.split(' ', 1)[0]
+        if token not in ('YES', 'NO'):
+            return {'content': [{'token': token, 'logprob': 0.0, 'bytes': None,
+                                 'top_logprobs': [{'token': token, 'logprob': 0.0, 'bytes': None}]}]}
+        digest = hashlib.sha256(json.dumps(request.get('messages', []), sort_keys=True).encode('utf-8')).digest()
+        probability = 0.5 + 0.5 * digest[1] / 256
+        other = 'NO' if token == 'YES' else 'YES'
+        top = [{'token': token, 'logprob': math.log(probability), 'bytes': None},
+               {'token': other, 'logprob': math.log(1 - probability), 'bytes': None}]
+        return {'content': [{**top[0], 'top_logprobs': top[:request.get('top_logprobs') or 1]}]}
+
+    def _completion(self, request: Dict[str, Any], content: str, completion_id: str) -> Dict[str, Any]:
+        prompt_tokens = sum(len(str(message.get('content', ''))) for message in request.get('messages', [])) // 4
+        # With n, later choices are sampled answers to the same request
+        contents = [content] + [canned_response(request, self.responses, sample=i)
+                                for i in range(1, request.get('n') or 1)]
+        completion_tokens = sum(len(text.split()) for text in contents)
+        return {
+            'id': completion_id, 'object': 'chat.completion', 'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{'index': i, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': text},
+                         'logprobs': self._logprobs(request, text) if request.get('logprobs') else None}
+                        for i, text in enumerate(contents)],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }
+
+    def _chunk(self, request: Dict[str, Any], completion_id: str, delta: Dict[str, Any],
+               finish_reason: Optional[str] = None) -> bytes:
+        chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                 'model': request.get('model', 'stub'),
+                 'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]}
+        return b'data: ' + json.dumps(chunk).encode('utf-8') + b'\n\n'
+
+    async def _write_chunked(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(f"{len(data):x}\r\n".encode('latin-1') + data + b'\r\n')
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, request: Dict[str, Any], content: str,
+                      completion_id: str) -> None:
+        await self._write_chunked(writer, self._chunk(request, completion_id, {'role': 'assistant', 'content': ''}))
+        for i, word in enumerate(content.split(' ')):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            await self._write_chunked(writer, self._chunk(request, completion_id, {'content': word if i == 0 else ' ' + word}))
+        await self._write_chunked(writer, self._chunk(request, completion_id, {}, 'stop'))
+        if (request.get('stream_options') or {}).get('include_usage'):
+            usage = self._completion(request, content, completion_id)['usage']
+            chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': request.get('model', 'stub'), 'choices': [], 'usage': usage}
+            await self._write_chunked(writer, b'data: ' + json.dumps(chunk).encode('utf-8') + b'\n\n')
+        await self._write_chunked(writer, b'data: [DONE]\n\n')
+        await self._write_chunked(writer, b'')
+
+    def _write_head(self, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str]) -> None:
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"] + [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+    def _write_json(self, writer: asyncio.StreamWriter, status: int, payload: Any,
+                    headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self._write_head(writer, status, {'Content-Type': 'application/json', 'Content-Length': str(len(body)),
+                                          **(headers or {})})
+        writer.write(body)
+
+    def _store_file(self, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        file_id = f"file-stub-{next(self._ids)}"
+        self.files[file_id] = {'id': file_id, 'object': 'file', 'bytes': len(content), 'created_at': int(time.time()),
+                               'filename': filename, 'purpose': purpose, 'status': 'processed', 'content': content}
+        return {key: value for key, value in self.files[file_id].items() if key != 'content'}
+
+    def _upload_file(self, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, Any]]:
+        message = email.parser.BytesParser().parsebytes(
+            b'Content-Type: ' + headers.get('content-type', '').encode('latin-1') + b'\r\n\r\n' + body)
+        fields, filename, content = {}, 'upload.jsonl', None
+        for part in message.get_payload() if message.is_multipart() else []:
+            name = part.get_param('name', header='content-disposition')
+            if part.get_filename() is not None:
+                filename, content = part.get_filename(), part.get_payload(decode=True)
+            elif name:
+                fields[name] = part.get_payload(decode=True).decode('utf-8')
+        if content is None:
+            return 400, {'error': {'message': 'Missing file', 'type': 'invalid_request_error'}}
+        return 200, self._store_file(content, filename, fields.get('purpose', 'batch'))
+
+    async def _run_batch(self, batch: Dict[str, Any]) -> None:
+        """Answer every request of a batch after batch_delay, splitting answers into output and error files."""
+        batch['status'] = 'in_progress'
+        batch['in_progress_at'] = int(time.time())
+        await asyncio.sleep(self.batch_delay)
+        outputs, errors = [], []
+        for line in self.files[batch['input_file_id']]['content'].decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            self.stats['batch_requests'] += 1
+            request_id = f"req-stub-{next(self._ids)}"
+            if self.rng.random() < self.error_rate:
+                errors.append({'id': request_id, 'custom_id': request['custom_id'], 'error': None,
+                               'response': {'status_code': 500, 'request_id': request_id, 'body': {
+                                   'error': {'message': 'Injected server error', 'type': 'server_error'}}}})
+                continue
+            body = request['body']
+            content = canned_response(body, self.responses)
+            completion_id = 'chatcmpl-stub-' + hashlib.sha1(line.encode('utf-8')).hexdigest()[:16]
+            outputs.append({'id': request_id, 'custom_id': request['custom_id'], 'error': None,
+                            'response': {'status_code': 200, 'request_id': request_id,
+                                         'body': self._completion(body, content, completion_id)}})
+        for key, results in (('output_file_id', outputs), ('error_file_id', errors)):
+            if results:
+                content = ''.join(json.dumps(result) + '\n' for result in results).encode('utf-8')
+                batch[key] = self._store_file(content, f"{batch['id']}_{key}.jsonl", 'batch_output')['id']
+        batch['request_counts'] = {'total': len(outputs) + len(errors), 'completed': len(outputs),
+                                   'failed': len(errors)}
+        batch['status'] = 'completed'
+        batch['completed_at'] = int(time.time())
+
+    def _create_batch(self, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return 400, {'error': {'message': 'Invalid JSON body', 'type': 'invalid_request_error'}}
+        if request.get('input_file_id') not in self.files:
+            return 404, {'error': {'message': f"No such file: {request.get('input_file_id')}", 'type': 'invalid_request_error'}}
+        batch_id = f"batch-stub-{next(self._ids)}"
+        batch = self.batches[batch_id] = {
+            'id': batch_id, 'object': 'batch', 'endpoint': request.get('endpoint', '/v1/chat/completions'),
+            'input_file_id': request['input_file_id'], 'completion_window': request.get('completion_window', '24h'),
+            'status': 'validating', 'created_at': int(time.time()), 'output_file_id': None, 'error_file_id': None,
+            'request_counts': {'total': 0, 'completed': 0, 'failed': 0}, 'metadata': request.get('metadata'),
+        }
+        self.stats['batches'] += 1
+        asyncio.get_running_loop().create_task(self._run_batch(batch))
+        return 200, batch
+
+    def _handle_batch_api(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Optional[Tuple[int, Any]]:
+        """Route a files or batches request; returns None for other paths."""
+        parts = path.strip('/').split('/')
+        if parts[:1] == ['v1']:
+            parts = parts[1:]
+        if method == 'POST' and parts == ['files']:
+            return self._upload_file(headers, body)
+        if method == 'POST' and parts == ['batches']:
+            return self._create_batch(body)
+        if method == 'GET' and len(parts) == 2 and parts[0] == 'batches':
+            if parts[1] not in self.batches:
+                return 404, {'error': {'message': f"No such batch: {parts[1]}", 'type': 'invalid_request_error'}}
+            return 200, self.batches[parts[1]]
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'files' and parts[2] == 'content':
+            if parts[1] not in self.files:
+                return 404, {'error': {'message': f"No such file: {parts[1]}", 'type': 'invalid_request_error'}}
+            return 200, self.files[parts[1]]['content']
+        return None
+
+    async def _handle_request(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes,
+                              headers: Optional[Dict[str, str]] = None) -> None:
+        if method == 'GET' and path == '/stats':
+            self._write_json(writer, 200, self.stats)
+            return
+        routed = self._handle_batch_api(method, path, headers or {}, body)
+        if routed is not None:
+            status, payload = routed
+            if isinstance(payload, bytes):
+                self._write_head(writer, status, {'Content-Type': 'application/octet-stream',
+                                                  'Content-Length': str(len(payload))})
+                writer.write(payload)
+            else:
+                self._write_json(writer, status, payload)
+            return
+        if method != 'POST' or path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self._write_json(writer, 404, {'error': {'message': f"No route for {method} {path}", 'type': 'not_found'}})
+            return
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._write_json(writer, 400, {'error': {'message': 'Invalid JSON body', 'type': 'invalid_request_error'}})
+            return
+
+        self.stats['requests'] += 1
+        roll = self.rng.random()
+        latency = self.sample_latency(self.rng)
+        if roll < self.rate_limit_rate:
+            self.stats['rate_limited'] += 1
+            self._write_json(writer, 429, {'error': {'message': 'Rate limit reached', 'type': 'requests',
+                                                     'code': 'rate_limit_exceeded'}},
+                             {'retry-after-ms': str(int(self.retry_after * 1000))})
+            return
+        await asyncio.sleep(latency)
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.stats['errors'] += 1
+            self._write_json(writer, 500, {'error': {'message': 'Injected server error', 'type': 'server_error'}})
+            return
+
+        content = canned_response(request, self.responses)
+        completion_id = 'chatcmpl-stub-' + hashlib.sha1(body).hexdigest()[:16]
+        self.stats['completion_tokens'] += len(content.split())
+        if request.get('stream'):
+            self.stats['streams'] += 1
+            self._write_head(writer, 200, {'Content-Type': 'text/event-stream', 'Transfer-Encoding': 'chunked',
+                                           'Cache-Control': 'no-cache'})
+            await self._stream(writer, request, content, completion_id)
+        else:
+            self.stats['completions'] += 1
+            self._write_json(writer, 200, self._completion(request, content, completion_id))
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, _ = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = headers.get('content-length', '') or '0'
+                if not length.isdigit():
+                    # The body can't be delimited, so answer and drop the connection
+                    self._write_json(writer, 400, {'error': {'message': f"Invalid Content-Length: {length!r}",
+                                                             'type': 'invalid_request_error'}},
+                                     {'Connection': 'close'})
+                    await writer.drain()
+                    break
+                length = int(length)
+                body = await reader.readexactly(length) if length else b''
+                await self._handle_request(writer, method, target.split('?', 1)[0], body, headers)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8766, ready: Optional[asyncio.Event] = None) -> None:
+        """
+        Serve until cancelled.
+
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind; 0 picks a free port, available as self.port once ready
+            ready (asyncio.Event, optional): Set once the server is listening
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port, limit=16 * 1024 * 1024)
+        self.port = server.sockets[0].getsockname()[1]
+        print(f"Stub LLM server on http://{host}:{self.port}/v1")
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve canned OpenAI-compatible chat completions locally")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', default='fixed:0',
+                        help="Time to first byte: fixed:S, uniform:LOW,HIGH, exponential:MEAN or lognormal:MEDIAN,SIGMA")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="Seconds between streamed words")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction of requests throttled with 429")
+    parser.add_argument('--retry-after', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-delay', type=float, default=0.0, help="Seconds a batch takes to finish")
+    parser.add_argument('--responses', help="JSON file mapping prompt substrings to replies")
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+    server = StubLLMServer(args.latency, args.token_delay, args.error_rate, args.rate_limit_rate,
+                           args.retry_after, args.seed, responses, args.batch_delay)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass